@@ -0,0 +1,228 @@
+"""
+Mai Shan Yun - Analytics Export
+Writes monthly ingredient usage, per-item summaries and the supply vs usage comparison for
+finance and purchasing tools, as partitioned Parquet plus uncompressed Arrow IPC streams
+
+    <out>/parquet/<dataset>/period=YYYY-MM/part-0.parquet    columnar, compressed, for warehouses
+    <out>/arrow/<dataset>/period=YYYY-MM.arrows              IPC stream, memory-map without parsing
+    <out>/manifest.json                                      data version + digest per partition
+
+Each run hashes every partition and rewrites only the ones whose contents changed since the
+manifest was written, so a new month file touches one monthly_usage and one item_summary partition.
+
+Usage:
+    python analyticsExport.py --out export
+    python analyticsExport.py --data-dir store1 --out export/store1 --watch 300
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import pipeline
+import refresher
+import sharedCache
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+DATASETS = ['monthly_usage', 'item_summary', 'comparison']
+PARTITION_COL = 'period'
+# datasets that depend on every month live in one partition
+ALL_PERIODS = 'all'
+MANIFEST = 'manifest.json'
+
+
+# ============================================
+# DATASETS
+# ============================================
+def period_key(month):
+    start = pipeline.period_start(month)
+    return str(month) if pd.isna(start) else f"{start:%Y-%m}"
+
+
+def monthly_usage_frame(snapshot):
+    """Long usage table: one row per month x ingredient"""
+    usage = snapshot.monthly_usage.rename_axis(index='month', columns='Ingredient')
+    return usage.stack().rename('Usage').reset_index()
+
+
+def item_summary_frame(snapshot):
+    """Count and revenue per item and month, with food cost and margin when prices are known"""
+    if snapshot.margin_df is not None:
+        margin_df = snapshot.margin_df
+        # the margin frame is item x every month; keep the months an item actually sold in
+        summary = margin_df[(margin_df['Count'] != 0) | (margin_df['Amount'] != 0)]
+    else:
+        summary = snapshot.sales_df.groupby(['Category', 'month'], as_index=False, sort=False)[['Count', 'Amount']].sum()
+    return summary.rename(columns={'Category': 'Item'})
+
+
+def export_frames(snapshot):
+    """{dataset: {partition: frame}} for one snapshot"""
+    datasets = {}
+    for name, df in (('monthly_usage', monthly_usage_frame(snapshot)), ('item_summary', item_summary_frame(snapshot))):
+        periods = df['month'].map(period_key)
+        datasets[name] = {period: part.reset_index(drop=True) for period, part in df.groupby(periods, sort=True)}
+    datasets['comparison'] = {ALL_PERIODS: snapshot.comparison_df.reset_index(drop=True)}
+    return datasets
+
+
+def frame_digest(df):
+    """Content hash of a partition, including its column names and dtypes"""
+    digest = hashlib.sha1(' '.join(f'{col}:{dtype}' for col, dtype in df.dtypes.items()).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+# ============================================
+# WRITERS
+# ============================================
+def _replace_atomically(path, write):
+    """Write through a temp file in the same directory so readers never map a half-written file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmpPath)
+        os.replace(tmpPath, path)
+    except BaseException:
+        os.unlink(tmpPath)
+        raise
+
+
+def _write_ipc_stream(table, path):
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def partition_paths(outDir, dataset, partition):
+    return (
+        os.path.join(outDir, 'parquet', dataset, f'{PARTITION_COL}={partition}', 'part-0.parquet'),
+        os.path.join(outDir, 'arrow', dataset, f'{PARTITION_COL}={partition}.arrows'),
+    )
+
+
+def write_partition(outDir, dataset, partition, df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    parquetPath, arrowPath = partition_paths(outDir, dataset, partition)
+    _replace_atomically(parquetPath, lambda path: pq.write_table(table, path))
+    _replace_atomically(arrowPath, lambda path: _write_ipc_stream(table, path))
+
+
+def remove_partition(outDir, dataset, partition):
+    for path in partition_paths(outDir, dataset, partition):
+        if os.path.exists(path):
+            os.unlink(path)
+    parquetDir = os.path.dirname(partition_paths(outDir, dataset, partition)[0])
+    if os.path.isdir(parquetDir) and not os.listdir(parquetDir):
+        os.rmdir(parquetDir)
+
+
+def load_manifest(outDir):
+    path = os.path.join(outDir, MANIFEST)
+    if not os.path.exists(path):
+        return {'data_version': None, 'datasets': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def export_snapshot(snapshot, outDir):
+    """Rewrite only the partitions whose digest differs from the manifest; returns (dataset, partition) written"""
+    if pa is None:
+        raise ImportError("pyarrow is required for analytics export (pip install pyarrow)")
+    manifest = load_manifest(outDir)
+    written = []
+    datasets = {}
+    for dataset, partitions in export_frames(snapshot).items():
+        previous = manifest['datasets'].get(dataset, {})
+        digests = {}
+        for partition, df in partitions.items():
+            digests[partition] = frame_digest(df)
+            if previous.get(partition) != digests[partition] or not os.path.exists(partition_paths(outDir, dataset, partition)[1]):
+                write_partition(outDir, dataset, partition, df)
+                written.append((dataset, partition))
+        for partition in set(previous) - set(digests):
+            remove_partition(outDir, dataset, partition)
+            written.append((dataset, partition))
+        datasets[dataset] = digests
+
+    # the manifest goes last: a crash mid-export just rewrites the same partitions next time
+    manifest = {'data_version': snapshot.version, 'months': list(snapshot.months), 'datasets': datasets}
+    _replace_atomically(os.path.join(outDir, MANIFEST), lambda path: _write_json(manifest, path))
+    return written
+
+
+def _write_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f, indent=2)
+
+
+# ============================================
+# READERS
+# ============================================
+def read_dataset(outDir, dataset):
+    """Memory-map every IPC partition of a dataset into one Arrow table (no copies, no parsing)"""
+    if pa is None:
+        raise ImportError("pyarrow is required to read analytics exports (pip install pyarrow)")
+    manifest = load_manifest(outDir)
+    tables = []
+    for partition in sorted(manifest['datasets'].get(dataset, {})):
+        path = partition_paths(outDir, dataset, partition)[1]
+        tables.append(pa.ipc.open_stream(pa.memory_map(path, 'r')).read_all())
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+
+# ============================================
+# MAIN
+# ============================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Export usage, item summaries and supply comparison as Parquet / Arrow IPC')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR, help='Store data directory')
+    parser.add_argument('--out', default='export', help='Export directory')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Poll interval; re-export only when input files change')
+    return parser.parse_args(argv)
+
+
+def run_once(builder, outDir):
+    try:
+        snapshot = builder.build()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error exporting {builder.dataDir}: {e}", file=sys.stderr)
+        return
+    if snapshot is None:
+        return
+    written = export_snapshot(snapshot, outDir)
+    print(f"{snapshot.version}: {len(written)} partition(s) rewritten"
+          + ''.join(f"\n  {dataset}/{PARTITION_COL}={partition}" for dataset, partition in written))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # the builder keeps per-file state, so watch mode only re-reads changed month files;
+    # a version already in the shared cache (see warmCache.py) is mapped, not rebuilt
+    builder = refresher.SnapshotBuilder(args.dataDir, sharedCache.SharedCache())
+    run_once(builder, args.out)
+    while args.watch:
+        time.sleep(args.watch)
+        run_once(builder, args.out)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,93 @@
+"""
+Mai Shan Yun - Online Anomaly Detection
+Flags item sales collapses/spikes and ingredient burn anomalies as each new period arrives
+
+Every series keeps three numbers: an EWMA of its level, an EWMA of its absolute deviation (a robust
+spread estimate) and how many periods it has seen. A new period is scored against the state from
+before it and then folded in, so checking thousands of series costs O(1) each, with no history.
+Outliers are clipped before they update the state, so one bad month does not hide the next.
+"""
+
+import numpy as np
+import pandas as pd
+
+ALPHA = 0.3
+THRESHOLD = 3.5
+# periods a series needs before it is scored
+MIN_PERIODS = 3
+# spread floor as a fraction of the level, so near-constant series do not flag ordinary wobbles
+MIN_SCALE_FRACTION = 0.25
+# low-volume series (a few units a period) are too noisy to score
+MIN_VOLUME = 20
+# MAD -> standard deviation for normal data
+MAD_SCALE = 1.4826
+ANOMALY_COLS = ['Series', 'Name', 'Period', 'Value', 'Expected', 'Z-Score', 'Direction']
+
+
+class EwmaDetector:
+    """Robust EWMA z-scores for a set of named series, updated one period at a time"""
+
+    def __init__(self, kind, alpha=ALPHA, threshold=THRESHOLD, minPeriods=MIN_PERIODS, minVolume=MIN_VOLUME):
+        self.kind = kind
+        self.alpha = alpha
+        self.threshold = threshold
+        self.minPeriods = minPeriods
+        self.minVolume = minVolume
+        self.names = pd.Index([])
+        self.level = np.zeros(0)
+        self.deviation = np.zeros(0)
+        self.seen = np.zeros(0, dtype=int)
+
+    def _grow(self, names):
+        """Add state for series seen for the first time"""
+        new = names.difference(self.names)
+        if len(new):
+            self.names = self.names.append(new)
+            self.level = np.concatenate([self.level, np.zeros(len(new))])
+            self.deviation = np.concatenate([self.deviation, np.zeros(len(new))])
+            self.seen = np.concatenate([self.seen, np.zeros(len(new), dtype=int)])
+
+    def update(self, period, values):
+        """Score one period of values (Series by name), fold it into the state, return the anomalies
+
+        Known series missing from values count as 0, which is how a collapsed item shows up.
+        """
+        self._grow(values.index)
+        x = values.reindex(self.names, fill_value=0).to_numpy(dtype=float)
+
+        scale = np.maximum(MAD_SCALE * self.deviation, MIN_SCALE_FRACTION * np.abs(self.level))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(scale > 0, (x - self.level) / scale, 0)
+        flagged = (self.seen >= self.minPeriods) & (np.abs(z) > self.threshold) \
+            & (np.maximum(x, self.level) >= self.minVolume)
+        expected = self.level
+
+        # first observation seeds the level; later ones move it by alpha, outliers clipped to the threshold
+        first = self.seen == 0
+        step = np.where(scale > 0, np.clip(x - self.level, -self.threshold * scale, self.threshold * scale), x - self.level)
+        self.level = np.where(first, x, self.level + self.alpha * step)
+        self.deviation = np.where(first, 0, (1 - self.alpha) * self.deviation + self.alpha * np.abs(step))
+        self.seen += 1
+
+        return pd.DataFrame({
+            'Series': self.kind,
+            'Name': self.names[flagged],
+            'Period': period,
+            'Value': x[flagged],
+            'Expected': expected[flagged],
+            'Z-Score': z[flagged],
+            'Direction': np.where(z[flagged] > 0, 'spike', 'drop'),
+        }, columns=ANOMALY_COLS)
+
+    def state(self):
+        """Compact per-series state, name x (level, deviation, seen)"""
+        return pd.DataFrame({'level': self.level, 'deviation': self.deviation, 'seen': self.seen}, index=self.names)
+
+
+def item_counts(month_df):
+    """Units sold per menu item in one month"""
+    return month_df.groupby('Category')['Count'].sum()
+
+
+def empty_anomalies():
+    return pd.DataFrame(columns=ANOMALY_COLS)
@@ -5,12 +5,19 @@ Integrates: Inventory Analysis, Shipment Tracking, and Cost Optimization
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import glob
-import os
+
+import demandForecast
+import figures
+import ingestion
+import inventoryLedger
+import margins
+import orderStream
+import pipeline
+import profiling
+import refresher
+import rollupCube
+import sharedCache
 
 # Page config
 st.set_page_config(
@@ -20,6 +27,13 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Opt-in profile of this rerun: ?profile=sample|cprofile on the URL, or MSY_PROFILE for every rerun
+try:
+    profile = profiling.start('dash2', st.query_params.get('profile'))
+except ValueError as e:
+    st.warning(str(e))
+    profile = None
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -36,133 +50,33 @@ st.markdown("""
 # ============================================
 # DATA LOADING FUNCTIONS
 # ============================================
-@st.cache_data
-def load_all_data():
-    """Load all CSV files"""
-    
-    # Load monthly sales files from csv_files folder
-    monthlySalesFiles = glob.glob('csv_files/*.csv')
-    dfs = []
-    for file in monthlySalesFiles:
-        df = pd.read_csv(file)
-        monthName = file.split('/')[-1].replace('.csv', '')
-        if len(monthName) > 10:
-            monthName = monthName[10:]
-        df['month'] = monthName
-        dfs.append(df)
-    
-    sales_df = pd.concat(dfs, ignore_index=True)
-    sales_df['Count'] = pd.to_numeric(sales_df['Count'], errors='coerce').fillna(0)
-    sales_df['Amount'] = sales_df['Amount'].astype(str).str.replace(',', '').astype(float)
-    sales_df.rename(columns={'Item Name': 'Category'}, inplace=True)
-    
-    # Load ingredients
-    ingredients_df = pd.read_csv('Ingredient.csv')
-    if 'Boychoy(g)' in ingredients_df.columns:
-        ingredients_df.rename(columns={'Boychoy(g)': 'Bokchoy(g)'}, inplace=True)
-    ingredients_df.rename(columns={'Item name': 'Category'}, inplace=True)
-    
-    # Load shipments
-    shipments_df = pd.read_csv('Shipment.csv')
-    
-    # Calculate monthly quantities for shipments
-    def monthlyFreq(freq):
-        if pd.isna(freq):
-            return np.nan
-        freq = str(freq).lower().strip()
-        return 4 if freq == "weekly" else 2 if freq == "biweekly" else 1 if freq == "monthly" else np.nan
-    
-    shipments_df['Shipments per Month'] = shipments_df['frequency'].apply(monthlyFreq) * shipments_df['Number of shipments']
-    shipments_df['Monthly Quantity (g)'] = shipments_df['Quantity per shipment'] * shipments_df['Shipments per Month']
-    
-    # Convert lbs to grams
-    lbs_mask = shipments_df['Unit of shipment'].str.lower().str.strip() == 'lbs'
-    shipments_df.loc[lbs_mask, 'Monthly Quantity (g)'] = shipments_df.loc[lbs_mask, 'Monthly Quantity (g)'] * 453.59237
-    
-    return sales_df, ingredients_df, shipments_df
+@st.cache_resource
+def get_refresher():
+    """One background refresher per server process, shared by every session"""
+    return refresher.DataRefresher(cache=sharedCache.SharedCache()).start()
 
-@st.cache_data
-def calculate_ingredient_usage(_sales_df, _ingredients_df):
-    """Calculate ingredient usage from sales data"""
-    
-    usage = _sales_df.merge(_ingredients_df, on='Category', how='left')
-    ingredientCols = [col for col in _ingredients_df.columns if col != 'Category']
-    
-    # Convert and multiply by count
-    for col in ingredientCols:
-        usage[col] = pd.to_numeric(usage[col], errors='coerce').fillna(0)
-        usage[col] = usage[col] * usage['Count']
-    
-    # Monthly aggregation
-    monthlyUsage = usage.groupby('month')[ingredientCols].sum()
-    avgUsage = monthlyUsage.mean(axis=0)
-    
-    return avgUsage, monthlyUsage
+@st.cache_resource(max_entries=4)
+def cached_cube(version, _cube_df):
+    """Rollup cube lookups for one snapshot, shared by every session"""
+    return rollupCube.RollupCube.from_frame(_cube_df)
 
 @st.cache_data
-def calculate_shipment_comparison(_shipments_df, _avg_usage):
-    """Calculate supply vs usage comparison"""
-    
-    ingredientNameMap = {
-        'Beef': 'braised beef used (g)',
-        'Chicken': 'Braised Chicken(g)',
-        'Ramen': 'Ramen (count)',
-        'Rice Noodles': 'Rice Noodles(g)',
-        'Flour': 'flour (g)',
-        'Tapioca Starch': 'Tapioca Starch',
-        'Rice': 'Rice(g)',
-        'Green Onion': 'Green Onion',
-        'White Onion': 'White onion',
-        'Cilantro': 'Cilantro',
-        'Egg': 'Egg(count)',
-        'Peas + Carrot': 'Peas(g)',
-        'Bokchoy': 'Bokchoy(g)',
-        'Chicken Wings': 'Chicken Wings (pcs)'
-    }
-    
-    comparisonData = []
-    
-    for idx, row in _shipments_df.iterrows():
-        ingredientName = row['Ingredient']
-        monthlySupply = row['Monthly Quantity (g)']
-        
-        usageCol = ingredientNameMap.get(ingredientName)
-        
-        if usageCol and usageCol in _avg_usage.index:
-            avgUsage = _avg_usage[usageCol]
-        else:
-            avgUsage = 0
-        
-        difference = monthlySupply - avgUsage
-        
-        if avgUsage > 0:
-            utilization = (avgUsage / monthlySupply) * 100 if monthlySupply > 0 else 0
-            daysOfSupply = (monthlySupply / (avgUsage / 30)) if avgUsage > 0 else 999
-        else:
-            utilization = 0
-            daysOfSupply = 999
-        
-        comparisonData.append({
-            'Ingredient': ingredientName,
-            'Monthly Supply': monthlySupply,
-            'Unit': row['Unit of shipment'],
-            'Avg Monthly Usage': avgUsage,
-            'Difference': difference,
-            'Utilization %': utilization,
-            'Days of Supply': daysOfSupply,
-            'Status': 'CRITICAL' if daysOfSupply < 5 else 'LOW' if daysOfSupply < 10 else 'GOOD' if daysOfSupply < 45 else 'OVERSTOCKED'
-        })
-    
-    return pd.DataFrame(comparisonData)
+def cached_margin_summary(version, month, _margin_df):
+    """Per-item margin totals for one period"""
+    return margins.summarize_margins(_margin_df, month)
 
 # ============================================
 # LOAD DATA
 # ============================================
 try:
     with st.spinner("Loading data..."):
-        sales_df, ingredients_df, shipments_df = load_all_data()
-        avg_usage, monthly_usage = calculate_ingredient_usage(sales_df, ingredients_df)
-        comparison_df = calculate_shipment_comparison(shipments_df, avg_usage)
+        # sessions read the latest complete snapshot and never wait on a rebuild
+        snapshot = get_refresher().current()
+        sales_df, ingredients_df, shipments_df = snapshot.sales_df, snapshot.ingredients_df, snapshot.shipments_df
+        avg_usage, monthly_usage = snapshot.avg_usage, snapshot.monthly_usage
+        comparison_df = snapshot.comparison_df
+        months_list = list(snapshot.months)
+        profiling.note_version(snapshot.version)
 except Exception as e:
     st.error(f"Error loading data: {e}")
     st.stop()
@@ -177,6 +91,8 @@ with st.sidebar:
         "Select Analysis:",
         ["Overview", "Inventory Analysis", "Shipment Tracking", "Cost Optimization"]
     )
+    if profile is not None:
+        profile.label = f"dash2 {page}"
     
     st.markdown("---")
     
@@ -229,30 +145,82 @@ if page == "Overview":
     
     st.markdown("---")
     
+    # Intraday numbers from orderStream.py, when it is running for this store
+    live = sharedCache.SharedCache().read_published(orderStream.live_name(pipeline.DATA_DIR))
+    if live is not None:
+        live_df, totals = live
+        st.subheader(f"Live Orders (as of {totals['as_of']})")
+        col1, col2, col3 = st.columns(3)
+        live_warnings = live_df[live_df['Status'].isin(['CRITICAL', 'LOW'])].sort_values('Days of Supply')
+        
+        with col1:
+            st.metric("🧾 Orders Today", f"{totals['orders_today']:,}")
+        
+        with col2:
+            st.metric("💵 Revenue Today", f"${totals['revenue_today']:,.0f}")
+        
+        with col3:
+            st.metric("⏱️ Intraday Stock Warnings", len(live_warnings))
+        
+        if not live_warnings.empty:
+            st.dataframe(
+                live_warnings[['Ingredient', 'Usage Today', 'On Hand', 'Days of Supply', 'Status']].style.format({
+                    'Usage Today': '{:.1f}',
+                    'On Hand': '{:.1f}',
+                    'Days of Supply': '{:.1f}'
+                }),
+                use_container_width=True
+            )
+        st.caption(f"Streaming since {totals['since']}: on hand = last count + scheduled deliveries - streamed orders")
+        
+        st.markdown("---")
+    
     # Top items and trends
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Top 10 Revenue Drivers")
-        top_items = sales_df.groupby('Category')['Amount'].sum().sort_values(ascending=False).head(10).reset_index()
-        fig = px.bar(top_items, x='Amount', y='Category', orientation='h', color='Amount', color_continuous_scale='Blues')
-        fig.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.top_revenue_figure(snapshot.version, sales_df))
     
     with col2:
         st.subheader("Critical Inventory Items")
         critical_items = comparison_df[comparison_df['Status'].isin(['CRITICAL', 'LOW'])].sort_values('Days of Supply')
         
         if not critical_items.empty:
-            fig = px.bar(critical_items, y='Ingredient', x='Days of Supply', orientation='h',
-                        color='Status', color_discrete_map={'CRITICAL': '#ef4444', 'LOW': '#f97316'})
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            figures.show(figures.critical_items_figure(snapshot.version, critical_items))
         else:
             st.success("All inventory levels are good!")
     
     st.markdown("---")
     
+    # Online EWMA detector over item counts and ingredient usage, latest month only
+    latest_month = months_list[-1]
+    anomalies = snapshot.anomaly_df[snapshot.anomaly_df['Period'] == latest_month]
+    st.subheader(f"Sales & Usage Anomalies - {latest_month.capitalize()}")
+    if not anomalies.empty:
+        st.dataframe(
+            anomalies.sort_values('Z-Score', key=abs, ascending=False)[
+                ['Series', 'Name', 'Value', 'Expected', 'Z-Score', 'Direction']
+            ].style.format({
+                'Value': '{:,.1f}',
+                'Expected': '{:,.1f}',
+                'Z-Score': '{:+.1f}'
+            }),
+            use_container_width=True
+        )
+        st.caption("Drops can mean a menu or POS mapping break; spikes in ingredient burn are worth a stock check.")
+    else:
+        st.success("No unusual item sales or ingredient usage this month")
+    
+    # Rows the ingestion checks flagged (unparseable or missing numbers count as 0)
+    if not snapshot.quality_df.empty:
+        st.subheader("Data Quality")
+        st.dataframe(ingestion.summarize_issues(snapshot.quality_df), use_container_width=True, hide_index=True)
+        with st.expander("Flagged rows"):
+            st.dataframe(snapshot.quality_df, use_container_width=True, hide_index=True)
+    
+    st.markdown("---")
+    
     # Key insights
     st.subheader("Key Insights")
     
@@ -268,8 +236,8 @@ if page == "Overview":
             st.success("**✅ No Critical Items**")
     
     with col2:
-        top_item = sales_df.groupby('Category')['Amount'].sum().sort_values(ascending=False).head(1)
-        st.info(f"**💰 Top Revenue Driver**\n\n{top_item.index[0]}\n\n${top_item.values[0]:,.0f}")
+        top_item = snapshot.ranking_df.iloc[0]
+        st.info(f"**💰 Top Revenue Driver**\n\n{top_item['Item Name']}\n\n${top_item['Amount']:,.0f}")
     
     with col3:
         avg_util = comparison_df['Utilization %'].mean()
@@ -283,7 +251,7 @@ elif page == "Inventory Analysis":
     st.subheader("Ingredient Usage Analysis")
     
     # Prepare data for inventory analysis
-    months = ['may', 'june', 'july', 'august', 'september', 'october']
+    months = months_list
     
     # Filters
     col1, col2 = st.columns([1, 3])
@@ -305,46 +273,19 @@ elif page == "Inventory Analysis":
     
     with col1:
         st.subheader(f"Top {n_ingredients} Used Ingredients")
-        top_ingredients = month_data.sort_values(ascending=False).head(n_ingredients)
-        
-        fig = px.bar(
-            x=top_ingredients.index,
-            y=top_ingredients.values,
-            labels={'x': 'Ingredient', 'y': 'Usage (g)'},
-            color=top_ingredients.values,
-            color_continuous_scale='Greens'
-        )
-        fig.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.ingredient_usage_figure(snapshot.version, selected_month, n_ingredients, False, month_data))
     
     with col2:
         st.subheader(f"Least {n_ingredients} Used Ingredients")
-        bottom_ingredients = month_data[month_data > 0].sort_values(ascending=True).head(n_ingredients)
-        
-        fig = px.bar(
-            x=bottom_ingredients.index,
-            y=bottom_ingredients.values,
-            labels={'x': 'Ingredient', 'y': 'Usage (g)'},
-            color=bottom_ingredients.values,
-            color_continuous_scale='Reds'
-        )
-        fig.update_layout(height=400, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.ingredient_usage_figure(snapshot.version, selected_month, n_ingredients, True, month_data))
     
     st.markdown("---")
     
     # Monthly trends
     st.subheader("Ingredient Usage Trends Over Time")
     
-    # Get top 5 ingredients overall
-    top_5_ingredients = monthly_usage.sum().sort_values(ascending=False).head(5).index
-    
-    trend_data = monthly_usage[top_5_ingredients].reset_index()
-    trend_data = trend_data.melt(id_vars='month', var_name='Ingredient', value_name='Usage')
-    
-    fig = px.line(trend_data, x='month', y='Usage', color='Ingredient', markers=True)
-    fig.update_layout(height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    # Top 5 ingredients overall
+    figures.show(figures.usage_trend_figure(snapshot.version, monthly_usage))
 
 # ============================================
 # PAGE: SHIPMENT TRACKING
@@ -401,28 +342,111 @@ elif page == "Shipment Tracking":
     
     with col1:
         st.subheader("Supply Gap Analysis")
-        comparison_sorted = comparison_df.sort_values('Difference')
-        colors = ['#ef4444' if x < 0 else '#22c55e' for x in comparison_sorted['Difference']]
-        
-        fig = go.Figure(go.Bar(
-            y=comparison_sorted['Ingredient'],
-            x=comparison_sorted['Difference'],
-            orientation='h',
-            marker=dict(color=colors)
-        ))
-        fig.add_vline(x=0, line_dash="dash", line_color="black", line_width=2)
-        fig.update_layout(height=500, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.supply_gap_figure(snapshot.version, comparison_df))
     
     with col2:
         st.subheader("Utilization Rate")
-        comparison_sorted = comparison_df.sort_values('Utilization %', ascending=False)
+        figures.show(figures.utilization_figure(snapshot.version, comparison_df))
+    
+    st.markdown("---")
+    
+    # Reverse BOM: which menu items consume each ingredient (precomputed in the snapshot)
+    st.subheader("What Drives Each Ingredient")
+    
+    tracked = comparison_df.sort_values('Days of Supply')
+    tracked = tracked[tracked['Ingredient'].isin(list(pipeline.INGREDIENT_NAME_MAP))]
+    status_of = dict(zip(tracked['Ingredient'], tracked['Status']))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        driven_ingredient = st.selectbox("Ingredient", tracked['Ingredient'].tolist(),
+                                         format_func=lambda name: f"{name} ({status_of[name]})")
+    with col2:
+        driver_month = st.selectbox("Period", [pipeline.ALL_MONTHS] + months_list,
+                                    format_func=lambda month: 'All months' if month == pipeline.ALL_MONTHS else month.capitalize())
+    
+    if driven_ingredient:
+        usage_col = pipeline.INGREDIENT_NAME_MAP[driven_ingredient]
+        contributors = pipeline.ingredient_contributors(snapshot.contributor_df, usage_col, driver_month)
+        if contributors.empty:
+            st.info(f"No menu item used {driven_ingredient} in this period")
+        else:
+            col1, col2 = st.columns([3, 2])
+            with col1:
+                figures.show(figures.contributor_figure(snapshot.version, driven_ingredient, driver_month, contributors))
+            with col2:
+                # units sold and recipe quantity are looked up in the shared read-only matrices
+                counts = snapshot.monthly_counts.sum() if driver_month == pipeline.ALL_MONTHS \
+                    else snapshot.monthly_counts.loc[driver_month]
+                drivers = contributors.assign(
+                    Sold=contributors['Category'].map(counts),
+                    **{'Per Item': contributors['Category'].map(snapshot.recipe_matrix[usage_col])}
+                )
+                st.dataframe(
+                    drivers[['Rank', 'Category', 'Sold', 'Per Item', 'Usage', 'Share %']].rename(columns={'Category': 'Menu Item'})
+                    .style.format({'Sold': '{:,.0f}', 'Per Item': '{:,.1f}', 'Usage': '{:,.1f}', 'Share %': '{:.1f}%'}),
+                    hide_index=True,
+                    use_container_width=True,
+                    height=450
+                )
+    
+    st.markdown("---")
+    
+    # Daily ledger
+    st.subheader("Stock On Hand (history and forecast)")
+    
+    ledger_df = snapshot.ledger_df
+    stockout_df = snapshot.stockout_df
+    
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        default_ingredients = list(stockout_df['Ingredient'][:5]) or list(ledger_df.columns[:3])
+        selected_ingredients = st.multiselect("Ingredients", list(ledger_df.columns), default=default_ingredients)
+        if selected_ingredients:
+            figures.show(figures.on_hand_figure(snapshot.version, tuple(selected_ingredients), ledger_df))
+    
+    with col2:
+        st.write("**Stockouts**")
+        if stockout_df.empty:
+            st.success("No stockouts, past or projected")
+        else:
+            st.dataframe(
+                stockout_df.assign(
+                    Date=stockout_df['Date'].dt.strftime('%b %d %Y'),
+                    When=stockout_df['Projected'].map({True: 'Projected', False: 'Past'})
+                )[['Ingredient', 'Date', 'When']],
+                hide_index=True,
+                height=300
+            )
+    
+    st.caption("Receipts follow each ingredient's shipment cadence, and usage is spread evenly over each month. "
+               "After the last sales month, usage comes from the demand forecast. Without an OpeningStock.csv count, "
+               "an ingredient starts with just enough stock to cover its usage until its first delivery.")
+    
+    # Perishables
+    spoilage_df = snapshot.spoilage_df
+    if not spoilage_df.empty:
+        st.subheader("Expected Spoilage (FIFO)")
         
-        fig = px.bar(comparison_sorted, y='Ingredient', x='Utilization %', orientation='h',
-                     color='Utilization %', color_continuous_scale='RdYlGn')
-        fig.add_vline(x=100, line_dash="dash", line_color="red", line_width=2)
-        fig.update_layout(height=500)
-        st.plotly_chart(fig, use_container_width=True)
+        col1, col2 = st.columns([1, 3])
+        
+        with col1:
+            st.metric("🗑️ Expected Waste Cost", f"${spoilage_df['Waste Cost'].sum():,.0f}")
+        
+        with col2:
+            st.dataframe(
+                spoilage_df.style.format({
+                    'Received': '{:,.0f}',
+                    'Used': '{:,.0f}',
+                    'Spoiled': '{:,.0f}',
+                    'Spoiled %': '{:.1f}%',
+                    'Unmet Demand': '{:,.0f}',
+                    'Waste Cost': '${:,.2f}'
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
     
     st.markdown("---")
     
@@ -454,20 +478,9 @@ elif page == "Cost Optimization":
     
     st.subheader("Cost Optimization Analysis")
     
-    # Prepare combined data
-    combined_df = sales_df.copy()
-    combined_df['Item Name'] = combined_df['Category']
-    
-    # Summary by item
-    summary_df = (
-        combined_df
-        .groupby('Item Name', as_index=False)
-        .agg({'Count': 'sum', 'Amount': 'sum'})
-        .sort_values('Amount', ascending=False)
-    )
-    
-    # Remove items with 0 amount
-    summary_df = summary_df[summary_df['Amount'] > 0]
+    # Items with revenue, ranked, with revenue share (built with the snapshot from the rollup cube)
+    cube = cached_cube(snapshot.version, snapshot.cube_df)
+    summary_df = snapshot.ranking_df
     
     # KPIs
     col1, col2, col3 = st.columns(3)
@@ -489,64 +502,28 @@ elif page == "Cost Optimization":
     
     with col1:
         st.subheader("Top 20 Items by Revenue")
-        top_20_revenue = summary_df.head(20)
-        
-        fig = px.bar(
-            top_20_revenue,
-            y='Amount',
-            x='Item Name',
-            color='Amount',
-            color_continuous_scale='Oranges'
-        )
-        fig.update_layout(height=500, showlegend=False)
-        fig.update_xaxes(tickangle=-45)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.top_items_figure(snapshot.version, 'Amount', 'Oranges', summary_df))
     
     with col2:
         st.subheader("Top 20 Items by Count Sold")
-        top_20_count = summary_df.nlargest(20, 'Count')
-        
-        fig = px.bar(
-            top_20_count,
-            y='Count',
-            x='Item Name',
-            color='Count',
-            color_continuous_scale='Purples'
-        )
-        fig.update_layout(height=500, showlegend=False)
-        fig.update_xaxes(tickangle=-45)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.top_items_figure(snapshot.version, 'Count', 'Purples', summary_df))
     
     st.markdown("---")
     
     # Revenue distribution
     st.subheader("Revenue Distribution Analysis")
     
-    # Calculate percentage contribution
-    summary_df['Revenue %'] = (summary_df['Amount'] / summary_df['Amount'].sum() * 100)
-    summary_df['Cumulative %'] = summary_df['Revenue %'].cumsum()
-    
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Top 10 Items Revenue Share")
-        top_10 = summary_df.head(10)
-        
-        fig = px.pie(
-            top_10,
-            values='Amount',
-            names='Item Name',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        figures.show(figures.revenue_share_figure(snapshot.version, summary_df))
     
     with col2:
         st.subheader("Pareto Analysis (80/20 Rule)")
         
         # Find how many items contribute to 80% of revenue
-        items_80_percent = len(summary_df[summary_df['Cumulative %'] <= 80])
+        items_80_percent = len(pipeline.pareto_items(summary_df))
         
         st.metric(
             "Items Contributing 80% of Revenue",
@@ -565,6 +542,112 @@ elif page == "Cost Optimization":
     
     st.markdown("---")
     
+    # Every item fitted in one batch when the snapshot was built (demandForecast.py)
+    st.subheader("Demand Forecast")
+    
+    if snapshot.demand_forecast.empty:
+        st.info("No forecast: none of the month files can be dated.")
+    else:
+        forecast_periods = list(snapshot.demand_forecast.index)
+        forecast_period = st.selectbox("Forecast Month", forecast_periods, format_func=str.capitalize)
+    
+        col1, col2 = st.columns(2)
+    
+        with col1:
+            st.write(f"**Top 20 Items - {forecast_period.capitalize()}**")
+            period_forecast = snapshot.forecast_df[snapshot.forecast_df['Period'] == forecast_period]
+            figures.show(figures.forecast_items_figure(snapshot.version, forecast_period, period_forecast))
+    
+        with col2:
+            st.write(f"**Ingredient Demand vs Supply - {forecast_period.capitalize()}**")
+            outlook = demandForecast.supply_outlook(snapshot.demand_forecast.loc[[forecast_period]], comparison_df)
+            st.dataframe(
+                outlook.drop(columns='Period').sort_values('Gap').style.format({
+                    'Forecast Usage': '{:,.1f}',
+                    'Monthly Supply': '{:,.1f}',
+                    'Gap': '{:,.1f}'
+                }),
+                hide_index=True,
+                use_container_width=True,
+                height=450
+            )
+    
+    st.caption("Level plus trend per item fitted on the month history (annual seasonality once two years exist); bars show the 80% range.")
+    
+    st.markdown("---")
+    
+    # Drill-down: menu category -> item at any time grain, all cube lookups
+    st.subheader("Sales Rollup by Menu Category")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        categories = sorted(cube.rollup('category', 'all', 'all')['Menu'])
+        drill = st.selectbox("Menu Category", ["All categories"] + categories)
+    
+    with col2:
+        time_grain = st.selectbox("Time Grain", rollupCube.TIME_GRAINS, format_func=str.capitalize)
+    
+    with col3:
+        measures = ['Amount', 'Count'] + [m for m in cube.measures if m not in ('Amount', 'Count')]
+        measure = st.selectbox("Measure", measures, format_func=lambda m: 'Revenue' if m == 'Amount' else m)
+    
+    menu_level = 'category' if drill == "All categories" else 'item'
+    within = None if drill == "All categories" else {'category': drill}
+    rollup_df = cube.rollup(menu_level, 'all', time_grain, within=within)
+    
+    figures.show(figures.rollup_figure(snapshot.version, menu_level, time_grain, measure, drill, rollup_df))
+    st.caption("Menu categories come from MenuCategory.csv; items not listed there are Uncategorized.")
+    
+    st.markdown("---")
+    
+    # Food cost & margin
+    st.subheader("Food Cost & Gross Margin")
+    
+    if snapshot.margin_df is None:
+        st.info("Add IngredientPrice.csv to see theoretical food cost and margins per item.")
+    else:
+        margin_month = st.selectbox("Margin Period", ["All months"] + months_list)
+        month_filter = None if margin_month == "All months" else margin_month
+        margin_summary = cached_margin_summary(snapshot.version, month_filter, snapshot.margin_df)
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Costed Revenue", f"${margin_summary['Amount'].sum():,.0f}")
+        
+        with col2:
+            st.metric("Theoretical Food Cost", f"${margin_summary['Food Cost'].sum():,.0f}")
+        
+        with col3:
+            total_margin_pct = margin_summary['Gross Margin'].sum() / margin_summary['Amount'].sum() * 100
+            st.metric("Gross Margin", f"{total_margin_pct:.1f}%")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("Top 20 Items by Gross Margin")
+            figures.show(figures.margin_figure(snapshot.version, month_filter, margin_summary))
+        
+        with col2:
+            st.subheader("Margin by Item")
+            st.dataframe(
+                margin_summary[['Category', 'Amount', 'Food Cost', 'Gross Margin', 'Margin %', 'Margin Share %']]
+                .rename(columns={'Category': 'Item Name'})
+                .style.format({
+                    'Amount': '${:,.2f}',
+                    'Food Cost': '${:,.2f}',
+                    'Gross Margin': '${:,.2f}',
+                    'Margin %': '{:.1f}%',
+                    'Margin Share %': '{:.1f}%'
+                }),
+                height=500
+            )
+        
+        st.caption("Only items with a recipe in Ingredient.csv are costed; ingredients without a price count as free.")
+    
+    st.markdown("---")
+    
     # Recommendations
     st.subheader("Cost Optimization Recommendations")
     
@@ -600,4 +683,7 @@ st.markdown("""
     <p><strong>🍜 Mai Shan Yun Inventory Intelligence Dashboard</strong></p>
     <p>Built for Datathon Challenge</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+if profile is not None:
+    st.caption(f"Profile of this rerun written to {profile.finish()}")
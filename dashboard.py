@@ -4,8 +4,9 @@ import streamlit as st
 import plotly.express as px
 import matplotlib.pyplot as plt
 import seaborn as sns
-from glob import glob
-import os
+
+import refresher
+import sharedCache
 
 # Set page config
 st.set_page_config(
@@ -18,63 +19,37 @@ st.sidebar.title("Navigation")
 page = st.sidebar.radio("Select Analysis", ["Inventory Analysis", "Shipment Analysis", "Sales Analysis"])
 
 # Load common data
-@st.cache_data
+@st.cache_resource
+def get_refresher():
+    # background thread picks up new month files without a restart
+    return refresher.DataRefresher(cache=sharedCache.SharedCache()).start()
+
 def load_data():
-    # Load ingredients data
-    ingredients = pd.read_csv('Ingredient.csv')
-    
-    # Load monthly sales data
-    monthly_data = []
-    months = ['may', 'june', 'july', 'august', 'september', 'october']
-    
-    for month in months:
-        file_path = f'csv_files/{month}.csv'
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            df['Month'] = month.capitalize()
-            monthly_data.append(df)
-    
-    sales_data = pd.concat(monthly_data, ignore_index=True)
-    
-    # Load shipment data
-    shipments = pd.read_csv('Shipment.csv')
-    
-    return ingredients, sales_data, shipments, months
+    snapshot = get_refresher().current()
+
+    # Months in calendar order of whatever month files exist
+    months = list(snapshot.months)
+
+    # Load shipment data (pages add columns to it, so keep the snapshot untouched)
+    shipments = snapshot.shipments_df.copy()
+
+    # Ingredient usage per month and its average: read-only views over the shared snapshot arrays
+    monthly_usage, avg_monthly_usage = snapshot.monthly_usage, snapshot.avg_usage
+
+    # Per-item sales totals, ranked by revenue when the snapshot was built
+    item_totals = snapshot.ranking_df
+
+    # Per-item demand forecast for the coming months, fitted with the snapshot
+    item_forecast = snapshot.forecast_df
+
+    return shipments, months, monthly_usage, avg_monthly_usage, item_totals, item_forecast
 
 # Load all data
-ingredients, sales_data, shipments, months = load_data()
+shipments, months, monthly_usage, avg_monthly_usage, item_totals, item_forecast = load_data()
 
 if page == "Inventory Analysis":
     st.title("Inventory Analysis Dashboard")
     
-    # Merge ingredients with sales data
-    merged = pd.merge(
-        ingredients,
-        sales_data,
-        left_on='Item name',
-        right_on='Item Name',
-        how='right'
-    )
-
-    # Calculate ingredient usage
-    ingredient_cols = [col for col in ingredients.columns if col != 'Item name']
-    
-    # Convert to numeric and handle missing values
-    for col in ingredient_cols:
-        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
-    merged['Count'] = pd.to_numeric(merged['Count'], errors='coerce').fillna(0)
-    
-    # Calculate totals
-    for col in ingredient_cols:
-        merged[f'{col}_total'] = merged[col] * merged['Count']
-    
-    # Group by month
-    monthly_usage = merged.groupby('Month')[
-        [f'{col}_total' for col in ingredient_cols]
-    ].sum()
-    
-    monthly_usage.columns = [col.replace('_total', '') for col in monthly_usage.columns]
-    
     # Filters
     selected_month = st.sidebar.selectbox("Select Month", months)
     n_ingredients = st.sidebar.slider("Number of ingredients to show", 5, 15, 10)
@@ -83,7 +58,7 @@ if page == "Inventory Analysis":
     
     with col1:
         st.subheader(f"Top {n_ingredients} Used Ingredients - {selected_month.capitalize()}")
-        month_data = monthly_usage.loc[selected_month.capitalize()]
+        month_data = monthly_usage.loc[selected_month]
         top_ingredients = month_data.sort_values(ascending=False).head(n_ingredients)
         
         fig1 = px.bar(
@@ -109,44 +84,7 @@ if page == "Inventory Analysis":
 elif page == "Shipment Analysis":
     st.title("Shipment Analysis Dashboard")
     
-    # Calculate monthly frequency
-    def monthlyFreq(freqType):
-        if pd.isna(freqType):
-            return np.nan
-        freqType = str(freqType).lower().strip()
-        if freqType == "weekly":
-            return 4
-        elif freqType == "biweekly":
-            return 2
-        elif freqType == "monthly":
-            return 1
-        else:
-            return np.nan
-    
-    # Process shipment data
-    shipments['Number of shipments'] = pd.to_numeric(shipments['Number of shipments'], errors='coerce').fillna(0)
-    shipments['Quantity per shipment'] = pd.to_numeric(shipments['Quantity per shipment'], errors='coerce').fillna(0)
-    shipments['Shipments per Month'] = shipments['frequency'].apply(monthlyFreq) * shipments['Number of shipments']
-    shipments['Monthly Quantity (g)'] = shipments['Quantity per shipment'] * shipments['Shipments per Month']
-    
-    # Convert lbs to grams
-    lbs_mask = shipments['Unit of shipment'].str.lower().str.strip() == 'lbs'
-    shipments.loc[lbs_mask, 'Monthly Quantity (g)'] = shipments.loc[lbs_mask, 'Monthly Quantity (g)'] * 453.59237
-    
-    # Calculate average monthly usage
-    merged = pd.merge(ingredients, sales_data, left_on='Item name', right_on='Item Name', how='right')
-    ingredient_cols = [col for col in ingredients.columns if col != 'Item name']
-    
-    # Calculate monthly usage
-    for col in ingredient_cols:
-        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
-    merged['Count'] = pd.to_numeric(merged['Count'], errors='coerce').fillna(0)
-    
-    for col in ingredient_cols:
-        merged[f'{col}_total'] = merged[col] * merged['Count']
-    
-    monthly_usage = merged.groupby('Month')[[f'{col}_total' for col in ingredient_cols]].sum()
-    avg_monthly_usage = monthly_usage.mean(axis=0)
+    # Shipments per Month and Monthly Quantity (g) come from the shipment calendar (pipeline.load_shipments)
     
     # Map ingredient names
     ingredient_name_map = {
@@ -161,7 +99,7 @@ elif page == "Shipment Analysis":
         'Cilantro': 'Cilantro',
         'Egg': 'Egg(count)',
         'Peas + Carrot': 'Peas(g)',
-        'Bokchoy': 'Boychoy(g)',
+        'Bokchoy': 'Bokchoy(g)',
         'Chicken Wings': 'Chicken Wings (pcs)'
     }
     
@@ -235,29 +173,6 @@ elif page == "Shipment Analysis":
         )
         st.plotly_chart(fig, width='stretch')
     
-    # Calculate average monthly usage
-    merged = pd.merge(
-        ingredients,
-        sales_data,
-        left_on='Item name',
-        right_on='Item Name',
-        how='right'
-    )
-    
-    # Calculate ingredient usage
-    ingredient_cols = [col for col in ingredients.columns if col != 'Item name']
-    for col in ingredient_cols:
-        merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
-    merged['Count'] = pd.to_numeric(merged['Count'], errors='coerce').fillna(0)
-    
-    # Calculate monthly usage
-    for col in ingredient_cols:
-        merged[f'{col}_total'] = merged[col] * merged['Count']
-    
-    # Calculate average monthly usage per ingredient
-    monthly_usage = merged.groupby('Month')[[f'{col}_total' for col in ingredient_cols]].sum()
-    avg_monthly_usage = monthly_usage.mean(axis=0)
-    
     # Calculate supply status
     def calculate_status(supply, usage):
         if usage == 0:
@@ -285,7 +200,7 @@ elif page == "Shipment Analysis":
         'Cilantro': 'Cilantro',
         'Egg': 'Egg(count)',
         'Peas + Carrot': 'Peas(g)',
-        'Bokchoy': 'Boychoy(g)',
+        'Bokchoy': 'Bokchoy(g)',
         'Chicken Wings': 'Chicken Wings (pcs)'
     }
     
@@ -368,40 +283,15 @@ elif page == "Shipment Analysis":
 elif page == "Sales Analysis":
     st.title("Sales Analysis Dashboard")
     
-    # Load and process monthly data exactly as in items_most_bought.py
-    may = pd.read_csv('csv_files/may.csv')
-    jun = pd.read_csv('csv_files/june.csv')
-    jul = pd.read_csv('csv_files/july.csv')
-    aug = pd.read_csv('csv_files/august.csv')
-    sep = pd.read_csv('csv_files/september.csv')
-    oct = pd.read_csv('csv_files/october.csv')
-    
-    # Drop unnecessary columns
-    for df in [may, jun, jul, aug, sep, oct]:
-        df.drop(['source_page', 'source_table'], axis=1, inplace=True)
-    
-    # Combine all months
-    months_df = pd.concat([may, jun, jul, aug, sep, oct], axis=0)
-    months_df['Count'] = months_df['Count'].replace(',', '', regex=True).astype(float)
-    months_df['Amount'] = months_df['Amount'].replace(',', '', regex=True).astype(float)
-    months_df['Item Name'] = months_df['Item Name'].replace(' ', '\n', regex=True)
-    
-    # Create summary dataframes
-    summary_amount_df = (
-        months_df
-        .groupby('Item Name', as_index=False)
-        .agg({'Count': 'sum', 'Amount': 'sum'})
-        .sort_values('Amount', ascending=False)
-    )
-    
-    summary_count_df = summary_amount_df.copy()
-    summary_count_df = summary_count_df[summary_count_df['Amount'] != 0]
+    # Top 20 by revenue and by count; only the plotted rows are copied (names wrapped for the axis)
+    def top_20(by):
+        top = item_totals.nlargest(20, by)[['Item Name', 'Count', 'Amount']]
+        return top.assign(**{'Item Name': top['Item Name'].str.replace(' ', '\n')})
     
-    # Get top 20
-    t20_spending = summary_amount_df.head(20)
-    t20_count = summary_count_df.sort_values('Count', ascending=False).head(20)
+    t20_spending = top_20('Amount')
+    t20_count = top_20('Count')
     
-    tab1, tab2 = st.tabs(["Revenue Analysis", "Sales Count Analysis"])
+    tab1, tab2, tab3 = st.tabs(["Revenue Analysis", "Sales Count Analysis", "Demand Forecast"])
     
     with tab1:
         st.subheader("All Time Spending for Top 20 Items")
@@ -437,4 +327,27 @@ elif page == "Sales Analysis":
             xaxis_title_font=dict(size=12, weight='bold'),
             yaxis_title_font=dict(size=12, weight='bold')
         )
-        st.plotly_chart(fig, width='stretch')
\ No newline at end of file
+        st.plotly_chart(fig, width='stretch')
+    
+    with tab3:
+        if item_forecast.empty:
+            st.info("No forecast: none of the month files can be dated.")
+        else:
+            next_month = item_forecast['Period'].iat[0]
+            st.subheader(f"Forecast Count for Top 20 Items - {next_month.capitalize()}")
+            t20_forecast = item_forecast[item_forecast['Period'] == next_month].nlargest(20, 'Forecast')
+            fig = px.bar(
+                t20_forecast,
+                y='Forecast',
+                x='Item Name',
+                title=f'Forecast Count Sold for Top 20 Items ({next_month.capitalize()})',
+                labels={'Forecast': 'Forecast Count', 'Item Name': 'Item Name'},
+                color_discrete_sequence=['teal'] * len(t20_forecast)
+            )
+            fig.update_layout(
+                xaxis_tickangle=45,
+                title_font=dict(size=16, weight='bold'),
+                xaxis_title_font=dict(size=12, weight='bold'),
+                yaxis_title_font=dict(size=12, weight='bold')
+            )
+            st.plotly_chart(fig, width='stretch')
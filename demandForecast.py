@@ -0,0 +1,189 @@
+"""
+Mai Shan Yun - Menu Demand Forecast
+Forecasts units sold for every menu item over the next months and turns them into forecast
+ingredient demand through the recipe matrix
+
+All items are fitted at once: one design matrix over the month history and a single ridge
+least-squares solve against the month x item count matrix, so the whole menu costs the same
+handful of matrix products as one item. The model is a level plus a ridge-shrunk linear trend, with an
+annual seasonal term (one sine / cosine pair) once there are SEASONAL_MIN_MONTHS of history.
+Forecasts are built with the snapshot, so they are cached and shared per data version.
+
+Usage:
+    python demandForecast.py                           # current directory, next FORECAST_HORIZON months
+    python demandForecast.py --data-dir store1 --horizon 1 --top 30
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import profiling
+
+FORECAST_HORIZON = int(os.environ.get('MSY_FORECAST_HORIZON', '3'))
+# months of history before a trend / an annual seasonal term is fitted
+TREND_MIN_MONTHS = 3
+SEASONAL_MIN_MONTHS = 24
+# ridge penalty on the trend and seasonal coefficients (the level is not penalized)
+RIDGE = 1.0
+# two-sided 80% interval for normal residuals
+INTERVAL_Z = 1.2816
+FORECAST_COLS = ['Period', 'Item Name', 'Forecast', 'Lower', 'Upper']
+
+
+# ============================================
+# CALENDAR
+# ============================================
+def month_positions(months):
+    """Calendar month number (year * 12 + month - 1) per month name; NaN for undatable names"""
+    starts = [pipeline.period_start(month) for month in months]
+    return np.array([np.nan if pd.isna(start) else start.year * 12 + start.month - 1 for start in starts])
+
+
+def future_periods(lastPosition, horizon):
+    """(month label, period start) of the horizon months after lastPosition"""
+    positions = int(lastPosition) + np.arange(1, horizon + 1)
+    return [(pipeline.month_label(position // 12, position % 12 + 1),
+             pd.Timestamp(year=position // 12, month=position % 12 + 1, day=1)) for position in positions]
+
+
+# ============================================
+# MODEL
+# ============================================
+def design_matrix(positions, center, history):
+    """Regressors for calendar positions: level, trend and (with enough history) annual seasonality"""
+    columns = [np.ones(len(positions))]
+    if history >= TREND_MIN_MONTHS:
+        columns.append(positions - center)
+    if history >= SEASONAL_MIN_MONTHS:
+        angle = 2 * np.pi * (positions % 12) / 12
+        columns += [np.sin(angle), np.cos(angle)]
+    return np.column_stack(columns)
+
+
+def fit(counts):
+    """Fit every item (column of a month x item count matrix) in one solve
+
+    Returns (coefficients: regressors x items, residual standard deviation per item, center, last position,
+    number of dated months the regressors were chosen for).
+    """
+    positions = month_positions(counts.index)
+    known = ~np.isnan(positions)
+    positions, y = positions[known], counts.to_numpy(dtype=float)[known]
+    if not len(positions):
+        raise ValueError("No dated months to fit a forecast on")
+    center = positions.mean()
+    x = design_matrix(positions, center, len(positions))
+    penalty = RIDGE * np.eye(x.shape[1])
+    penalty[0, 0] = 0
+    coefficients = np.linalg.solve(x.T @ x + penalty, x.T @ y)
+    residuals = y - x @ coefficients
+    dof = max(len(positions) - x.shape[1], 1)
+    return coefficients, np.sqrt((residuals ** 2).sum(axis=0) / dof), center, positions.max(), len(positions)
+
+
+def forecast_items(counts, horizon=FORECAST_HORIZON):
+    """Long (Period, Item Name, Forecast, Lower, Upper) frame plus the period starts, for every item"""
+    if horizon < 1:
+        raise ValueError("Forecast horizon must be at least 1 month")
+    coefficients, spread, center, last, history = fit(counts)
+    periods = future_periods(last, horizon)
+    positions = np.array([start.year * 12 + start.month - 1 for _, start in periods], dtype=float)
+    # same regressors as the fit, which only saw the dated months
+    x = design_matrix(positions, center, history)
+    # counts cannot go below zero; the interval is clipped the same way
+    forecast = np.clip(x @ coefficients, 0, None)
+    items = counts.columns.to_numpy()
+    forecast_df = pd.DataFrame({
+        'Period': np.repeat([name for name, _ in periods], len(items)),
+        'Item Name': np.tile(items, len(periods)),
+        'Forecast': forecast.ravel(),
+        'Lower': np.clip(forecast - INTERVAL_Z * spread, 0, None).ravel(),
+        'Upper': (forecast + INTERVAL_Z * spread).ravel(),
+    }, columns=FORECAST_COLS)
+    return forecast_df, dict(periods)
+
+
+def ingredient_demand(forecast_df, recipe_for):
+    """Period x ingredient demand: forecast counts through the recipe in effect for each period
+
+    recipe_for(period) returns the item x ingredient matrix for a forecast period (RecipeBook.matrix_for).
+    """
+    rows = {}
+    for period, block in forecast_df.groupby('Period', sort=False):
+        recipe = recipe_for(period)
+        counts = block.set_index('Item Name')['Forecast'].reindex(recipe.index, fill_value=0)
+        rows[period] = pd.Series(counts.to_numpy() @ recipe.to_numpy(dtype=float), index=recipe.columns)
+    return pd.DataFrame.from_dict(rows, orient='index').rename_axis('Period').fillna(0).astype(float)
+
+
+@profiling.stage('build_forecast')
+def build_forecast(monthly_counts, book, horizon=FORECAST_HORIZON):
+    """(item forecast frame, period x ingredient demand) for a snapshot's counts and recipe book
+
+    Without a single dated month there is nothing to fit; both are empty rather than failing the snapshot.
+    """
+    if np.isnan(month_positions(monthly_counts.index)).all():
+        return pd.DataFrame(columns=FORECAST_COLS), pd.DataFrame(columns=pipeline.ingredient_columns(book.base),
+                                                                 index=pd.Index([], name='Period'), dtype=float)
+    forecast_df, starts = forecast_items(monthly_counts, horizon)
+    demand = ingredient_demand(forecast_df, lambda period: book.matrix_for(starts[period]))
+    return forecast_df, demand
+
+
+def supply_outlook(demand, comparison_df):
+    """Forecast demand per shipped ingredient against its monthly supply, one row per period"""
+    usageCols = comparison_df['Ingredient'].map(pipeline.INGREDIENT_NAME_MAP)
+    frames = []
+    for period, row in demand.iterrows():
+        forecast = usageCols.map(row).fillna(0).to_numpy(dtype=float)
+        supply = comparison_df['Monthly Supply'].to_numpy(dtype=float)
+        frames.append(pd.DataFrame({
+            'Period': period,
+            'Ingredient': comparison_df['Ingredient'].to_numpy(),
+            'Unit': comparison_df['Unit'].to_numpy(),
+            'Forecast Usage': forecast,
+            'Monthly Supply': supply,
+            'Gap': supply - forecast,
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['Period', 'Ingredient', 'Unit', 'Forecast Usage', 'Monthly Supply', 'Gap'])
+
+
+# ============================================
+# MAIN
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Forecast menu item demand and ingredient usage')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR)
+    parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON, help='Months to forecast')
+    parser.add_argument('--top', type=int, default=20, help='Items to list per period')
+    args = parser.parse_args(argv)
+
+    try:
+        # MSY_PROFILE=sample|cprofile captures the fit under .cache/profiles/
+        with profiling.capture('demandForecast'):
+            profiling.note_version(pipeline.data_version(args.dataDir))
+            sales_df = pipeline.load_sales(args.dataDir)
+            months = sorted(sales_df['month'].unique(), key=pipeline.month_sort_key)
+            forecast_df, demand = build_forecast(pipeline.monthly_counts(sales_df, months),
+                                                 pipeline.load_recipe_book(args.dataDir), args.horizon)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error forecasting {args.dataDir}: {e}", file=sys.stderr)
+        return 1
+
+    with pd.option_context('display.width', 120, 'display.max_columns', 20):
+        for period, block in forecast_df.groupby('Period', sort=False):
+            print(f"\n{period.capitalize()}: top {args.top} items")
+            print(block.nlargest(args.top, 'Forecast').drop(columns='Period').round(1).to_string(index=False))
+        print("\nForecast ingredient usage")
+        print(demand.T.round(1).to_string())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
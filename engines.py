@@ -0,0 +1,197 @@
+"""
+Mai Shan Yun - Pipeline Engines
+Interchangeable backends for the ingest -> usage step: month sales files in, typed month
+frames, their data-quality issues (see ingestion.py) and per-month ingredient usage out
+
+    pandas   eager, one file at a time (the reference path)
+    duckdb   one parallel scan over every file: the CSV reader parses only the columns the plan
+             uses, with number cleaning fused into the scan, and the recipe join and both
+             aggregations run as one multi-threaded plan inside DuckDB
+
+Select with MSY_ENGINE=duckdb (MSY_ENGINE_THREADS caps its threads, default: all cores).
+The comparison step runs on the few-row usage result and stays in pandas for every engine.
+
+Usage:
+    python engines.py --data-dir . --engine duckdb      # check an engine against the pandas path
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+import ingestion
+import pipeline
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+ENGINE = os.environ.get('MSY_ENGINE', 'pandas')
+ENGINE_THREADS = int(os.environ.get('MSY_ENGINE_THREADS', '0')) or None
+MONTH_COLS = ['Category', 'Count', 'Amount', 'month']
+
+
+def _recipe_for(book, path):
+    return book.matrix_for(pipeline.period_start(pipeline.month_from_path(path)))
+
+
+# ============================================
+# PANDAS
+# ============================================
+class PandasEngine:
+    """Reference engine: pipeline.load_month_checked + month_usage per file"""
+
+    name = 'pandas'
+
+    def load_months(self, paths, book):
+        """{path: (month frame, month usage, issues)} for month sales files"""
+        months = {}
+        for path in paths:
+            month_df, issues = pipeline.load_month_checked(path)
+            months[path] = (month_df, pipeline.month_usage(month_df, _recipe_for(book, path)), issues)
+        return months
+
+
+# ============================================
+# DUCKDB
+# ============================================
+# month files -> typed rows in the ingestion.read_month_raw layout: NULL where a cell is not a
+# number, with the text of cells that failed to parse kept for the quality report
+SALES_SQL = r"""
+SELECT
+    filename AS path,
+    "Item Name" AS Category,
+    TRY_CAST(REPLACE("Count", ',', '') AS DOUBLE) AS Count,
+    TRY_CAST(REPLACE("Amount", ',', '') AS DOUBLE) AS Amount,
+    CASE WHEN TRY_CAST(REPLACE("Count", ',', '') AS DOUBLE) IS NULL THEN NULLIF(TRIM("Count"), '') END AS "Count raw",
+    CASE WHEN TRY_CAST(REPLACE("Amount", ',', '') AS DOUBLE) IS NULL THEN NULLIF(TRIM("Amount"), '') END AS "Amount raw"
+FROM read_csv($paths, all_varchar = true, filename = true, union_by_name = true)
+"""
+
+# counts per item first, then quantity x count summed per ingredient (the pandas order of operations)
+USAGE_SQL = """
+WITH counts AS (
+    SELECT path, Category, SUM(COALESCE(Count, 0)) AS Count FROM sales GROUP BY path, Category
+)
+SELECT counts.path, recipe.Ingredient, SUM(recipe.Quantity * counts.Count) AS Usage
+FROM counts
+JOIN files ON counts.path = files.path
+JOIN recipe ON files.version = recipe.version AND counts.Category = recipe.Category
+GROUP BY counts.path, recipe.Ingredient
+"""
+
+
+class DuckDbEngine:
+    """Lazy engine: one DuckDB plan per batch of month files"""
+
+    name = 'duckdb'
+
+    def __init__(self, threads=ENGINE_THREADS):
+        if duckdb is None:
+            raise ImportError("duckdb is required for MSY_ENGINE=duckdb (pip install duckdb)")
+        self.threads = threads
+
+    def _recipe_long(self, paths, book):
+        """(path, version) per file plus (version, Category, Ingredient, Quantity) once per recipe version"""
+        versions = [book.active_versions(pipeline.period_start(pipeline.month_from_path(path))) for path in paths]
+        ids = {version: i for i, version in enumerate(dict.fromkeys(versions))}
+        frames = []
+        for version, i in ids.items():
+            recipe = _recipe_for(book, paths[versions.index(version)])
+            long = recipe.rename_axis(index='Category', columns='Ingredient').stack().rename('Quantity').reset_index()
+            frames.append(long[long['Quantity'] != 0].assign(version=i))
+        files = pd.DataFrame({'path': paths, 'version': [ids[version] for version in versions]})
+        return files, pd.concat(frames, ignore_index=True)
+
+    def load_months(self, paths, book):
+        """{path: (month frame, month usage, issues)}, every file in one scan"""
+        paths = list(paths)
+        if not paths:
+            return {}
+        con = duckdb.connect(config={'threads': self.threads} if self.threads else {})
+        try:
+            files, recipe = self._recipe_long(paths, book)
+            con.register('files', files)
+            con.register('recipe', recipe)
+            # one parallel scan with the number parsing fused in; usage aggregates over the scanned rows
+            con.execute(f'CREATE TEMP TABLE sales AS {SALES_SQL}', {'paths': paths})
+            usage = con.sql(USAGE_SQL).df()
+            sales_df = con.sql('SELECT * FROM sales').df()
+        finally:
+            con.close()
+
+        months = {}
+        salesByPath = dict(tuple(sales_df.groupby('path', sort=False)))
+        usageByPath = dict(tuple(usage.groupby('path', sort=False)))
+        for path in paths:
+            raw_df = salesByPath.get(path, pd.DataFrame(columns=sales_df.columns))
+            month_df, issues = ingestion.validate_month(raw_df.drop(columns='path').reset_index(drop=True),
+                                                        os.path.basename(path))
+            month_df['month'] = pipeline.month_from_path(path)
+            ingredientCols = _recipe_for(book, path).columns
+            rows = usageByPath.get(path)
+            monthUsage = pd.Series(0.0, index=ingredientCols) if rows is None else \
+                rows.set_index('Ingredient')['Usage'].reindex(ingredientCols).fillna(0)
+            months[path] = (month_df[MONTH_COLS], monthUsage.rename_axis(None).rename(None), issues)
+        return months
+
+
+ENGINES = {'pandas': PandasEngine, 'duckdb': DuckDbEngine}
+
+
+def get_engine(name=None):
+    """Engine instance by name (default: MSY_ENGINE)"""
+    name = (name or ENGINE).lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name!r}; choose from {', '.join(ENGINES)}")
+    return ENGINES[name]()
+
+
+# ============================================
+# PARITY CHECK
+# ============================================
+def compare_engines(dataDir, engine):
+    """Differences between an engine's output and the pandas path (empty list when they match)"""
+    book = pipeline.load_recipe_book(dataDir)
+    paths = pipeline.sales_files(dataDir)
+    expected = PandasEngine().load_months(paths, book)
+    actual = engine.load_months(paths, book)
+    problems = []
+    for path in paths:
+        (wantDf, wantUsage, wantIssues), (gotDf, gotUsage, gotIssues) = expected[path], actual[path]
+        try:
+            pd.testing.assert_frame_equal(gotDf, wantDf, check_dtype=False)
+            pd.testing.assert_series_equal(gotUsage, wantUsage, check_dtype=False, check_names=False, rtol=1e-12)
+            pd.testing.assert_frame_equal(gotIssues, wantIssues, check_dtype=False)
+        except AssertionError as e:
+            problems.append(f"{path}: {str(e).splitlines()[0]}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time an engine and check it against the pandas path')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR)
+    parser.add_argument('--engine', default=ENGINE, choices=list(ENGINES))
+    args = parser.parse_args(argv)
+
+    engine = get_engine(args.engine)
+    book = pipeline.load_recipe_book(args.dataDir)
+    paths = pipeline.sales_files(args.dataDir)
+    for candidate in (PandasEngine(), engine):
+        start = time.perf_counter()
+        candidate.load_months(paths, book)
+        print(f"{candidate.name}: {len(paths)} files in {time.perf_counter() - start:.3f}s")
+
+    problems = compare_engines(args.dataDir, engine)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print("outputs match" if not problems else f"{len(problems)} file(s) differ")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Mai Shan Yun - Dashboard Figures
+Plotly figure specs cached by (data version, widget state), with compact payloads
+
+Every builder takes the snapshot version plus the widget values that shape the figure; the
+underscore-prefixed data arguments are not hashed. A builder returns the figure's JSON spec,
+serialized once per version and widget combination, and show() hands that spec to Streamlit
+without rebuilding or re-validating a Figure on each rerun.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+# decimals kept in figure data; nothing on these charts is read more precisely than this
+DECIMALS = 2
+# above this many points per figure, scatter/line traces switch to WebGL
+WEBGL_THRESHOLD = 1000
+# per-trace cap for line charts; longer series are min/max downsampled server-side
+MAX_POINTS = 2000
+# plotly >= 6 ships numeric arrays as base64 typed arrays, so float32 halves their payload
+TYPED_ARRAYS = int(plotly.__version__.split('.')[0]) >= 6
+
+cached_spec = st.cache_data(max_entries=256, show_spinner=False)
+# trace attributes holding numeric data that is drawn or shown on hover
+NUMERIC_ATTRS = ('x', 'y', 'z', 'values', 'customdata')
+
+
+# ============================================
+# PAYLOAD REDUCTION
+# ============================================
+def to_float32(values):
+    """float32 copy of rounded values when it keeps every value to DECIMALS, else the float64 values
+
+    float32 holds ~7 significant digits, so dollar totals or gram usage above ~1e5 would show
+    the wrong cents / units in hover text.
+    """
+    narrow = values.astype(np.float32)
+    finite = np.isfinite(values)
+    if np.array_equal(narrow[finite].astype(np.float64).round(DECIMALS), values[finite]):
+        return narrow
+    return values
+
+
+def compact_values(values):
+    """values rounded to DECIMALS (float32 where that is exact), or None if they are not numeric
+
+    Object arrays (customdata mixing labels and numbers) have their numeric columns rounded.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        values = values.round(DECIMALS)
+        return to_float32(values) if TYPED_ARRAYS else values
+    if values.dtype != object or values.ndim != 2:
+        return None
+    values = values.copy()
+    for j in range(values.shape[1]):
+        column = pd.to_numeric(pd.Series(values[:, j]), errors='coerce')
+        if column.notna().all():
+            values[:, j] = column.round(DECIMALS).to_numpy(dtype=object)
+    return values
+
+
+def compact(fig):
+    """Round numeric trace, hover and error-bar arrays in place and drop unused precision"""
+    for trace in fig.data:
+        for attr in NUMERIC_ATTRS:
+            values = getattr(trace, attr, None)
+            if values is not None and (values := compact_values(values)) is not None:
+                trace[attr] = values
+        color = getattr(getattr(trace, 'marker', None), 'color', None)
+        if color is not None and np.asarray(color).dtype.kind == 'f':
+            trace.marker.color = np.asarray(color).round(DECIMALS)
+        for error in ('error_x', 'error_y'):
+            bars = getattr(trace, error, None)
+            for attr in ('array', 'arrayminus'):
+                values = None if bars is None else bars[attr]
+                if values is not None and (values := compact_values(values)) is not None:
+                    bars[attr] = values
+    return fig
+
+
+def to_spec(fig):
+    """Compact JSON spec of a figure (plain dicts and lists, typed arrays as base64)"""
+    return json.loads(compact(fig).to_json())
+
+
+class SpecFigure(go.Figure):
+    """A cached spec dressed as a Figure: st.plotly_chart serializes it as-is instead of
+    validating the dict into a new Figure and copying it on every rerun"""
+
+    def __init__(self, spec):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return self._spec
+
+    def to_plotly_json(self):
+        return self._spec
+
+    def to_json(self, *args, **kwargs):
+        return json.dumps(self._spec)
+
+
+def show(spec):
+    """Render a cached figure spec at container width"""
+    st.plotly_chart(SpecFigure(spec), use_container_width=True)
+
+
+def minmax_downsample(x, y, maxPoints=MAX_POINTS):
+    """Keep the min and max of each bucket so peaks and dips survive downsampling"""
+    n = len(y)
+    if n <= maxPoints:
+        return x, y
+    values = pd.Series(np.asarray(y, dtype=float))
+    buckets = np.arange(n) * (maxPoints // 2) // n
+    grouped = values.groupby(buckets)
+    idx = np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+    return np.asarray(x)[idx], values.to_numpy()[idx]
+
+
+def line_figure(df, x, y, color, markers=True):
+    """Line chart that downsamples long series and switches to WebGL for large point counts"""
+    traces = []
+    for name, group in df.groupby(color, sort=False):
+        xs, ys = minmax_downsample(group[x].to_numpy(), group[y].to_numpy())
+        traces.append((name, xs, ys))
+    total = sum(len(ys) for _, _, ys in traces)
+    Scatter = go.Scattergl if total > WEBGL_THRESHOLD else go.Scatter
+    mode = 'lines+markers' if markers and total <= WEBGL_THRESHOLD else 'lines'
+    fig = go.Figure([Scatter(x=xs, y=ys, name=str(name), mode=mode) for name, xs, ys in traces])
+    fig.update_layout(xaxis_title=x, yaxis_title=y, legend_title_text=color)
+    return fig
+
+
+# ============================================
+# OVERVIEW
+# ============================================
+@cached_spec
+def top_revenue_figure(version, _sales_df):
+    top_items = _sales_df.groupby('Category')['Amount'].sum().sort_values(ascending=False).head(10).reset_index()
+    fig = px.bar(top_items, x='Amount', y='Category', orientation='h', color='Amount', color_continuous_scale='Blues')
+    fig.update_layout(height=400, showlegend=False)
+    return to_spec(fig)
+
+
+@cached_spec
+def critical_items_figure(version, _critical_items):
+    fig = px.bar(_critical_items, y='Ingredient', x='Days of Supply', orientation='h',
+                 color='Status', color_discrete_map={'CRITICAL': '#ef4444', 'LOW': '#f97316'})
+    fig.update_layout(height=400)
+    return to_spec(fig)
+
+
+# ============================================
+# INVENTORY ANALYSIS
+# ============================================
+@cached_spec
+def ingredient_usage_figure(version, month, n_ingredients, least, _month_data):
+    if least:
+        data = _month_data[_month_data > 0].sort_values(ascending=True).head(n_ingredients)
+    else:
+        data = _month_data.sort_values(ascending=False).head(n_ingredients)
+    fig = px.bar(
+        x=data.index,
+        y=data.values,
+        labels={'x': 'Ingredient', 'y': 'Usage (g)'},
+        color=data.values,
+        color_continuous_scale='Reds' if least else 'Greens'
+    )
+    fig.update_layout(height=400, showlegend=False)
+    return to_spec(fig)
+
+
+@cached_spec
+def usage_trend_figure(version, _monthly_usage):
+    top_5_ingredients = _monthly_usage.sum().sort_values(ascending=False).head(5).index
+    trend_data = _monthly_usage[top_5_ingredients].reset_index()
+    trend_data = trend_data.melt(id_vars='month', var_name='Ingredient', value_name='Usage')
+    fig = line_figure(trend_data, x='month', y='Usage', color='Ingredient')
+    fig.update_layout(height=400)
+    return to_spec(fig)
+
+
+# ============================================
+# SHIPMENT TRACKING
+# ============================================
+@cached_spec
+def supply_gap_figure(version, _comparison_df):
+    comparison_sorted = _comparison_df.sort_values('Difference')
+    colors = np.where(comparison_sorted['Difference'].to_numpy() < 0, '#ef4444', '#22c55e')
+    fig = go.Figure(go.Bar(
+        y=comparison_sorted['Ingredient'],
+        x=comparison_sorted['Difference'],
+        orientation='h',
+        marker=dict(color=colors)
+    ))
+    fig.add_vline(x=0, line_dash="dash", line_color="black", line_width=2)
+    fig.update_layout(height=500, showlegend=False)
+    return to_spec(fig)
+
+
+@cached_spec
+def utilization_figure(version, _comparison_df):
+    comparison_sorted = _comparison_df.sort_values('Utilization %', ascending=False)
+    fig = px.bar(comparison_sorted, y='Ingredient', x='Utilization %', orientation='h',
+                 color='Utilization %', color_continuous_scale='RdYlGn')
+    fig.add_vline(x=100, line_dash="dash", line_color="red", line_width=2)
+    fig.update_layout(height=500)
+    return to_spec(fig)
+
+
+@cached_spec
+def on_hand_figure(version, ingredients, _ledger_df):
+    on_hand = _ledger_df[list(ingredients)].rename_axis('Date').reset_index()
+    on_hand = on_hand.melt(id_vars='Date', var_name='Ingredient', value_name='On Hand')
+    fig = line_figure(on_hand, x='Date', y='On Hand', color='Ingredient', markers=False)
+    fig.add_hline(y=0, line_dash="dash", line_color="red", line_width=1)
+    fig.update_layout(height=400)
+    return to_spec(fig)
+
+
+@cached_spec
+def contributor_figure(version, ingredient, month, _contributors):
+    top = _contributors.head(15).sort_values('Share %')
+    fig = px.bar(top, x='Share %', y='Category', orientation='h', color='Share %', color_continuous_scale='Reds',
+                 hover_data={'Usage': ':,.1f', 'Rank': True}, labels={'Category': 'Menu Item'})
+    fig.update_layout(height=450, coloraxis_showscale=False)
+    return to_spec(fig)
+
+
+# ============================================
+# COST OPTIMIZATION
+# ============================================
+@cached_spec
+def top_items_figure(version, metric, scale, _summary_df):
+    top_20 = _summary_df.nlargest(20, metric)
+    fig = px.bar(top_20, y=metric, x='Item Name', color=metric, color_continuous_scale=scale)
+    fig.update_layout(height=500, showlegend=False)
+    fig.update_xaxes(tickangle=-45)
+    return to_spec(fig)
+
+
+@cached_spec
+def revenue_share_figure(version, _summary_df):
+    fig = px.pie(
+        _summary_df.head(10),
+        values='Amount',
+        names='Item Name',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(height=400)
+    return to_spec(fig)
+
+
+@cached_spec
+def forecast_items_figure(version, period, _forecast_df):
+    top_20 = _forecast_df.nlargest(20, 'Forecast')
+    fig = go.Figure(go.Bar(
+        x=top_20['Item Name'],
+        y=top_20['Forecast'],
+        error_y=dict(type='data', symmetric=False,
+                     array=top_20['Upper'] - top_20['Forecast'], arrayminus=top_20['Forecast'] - top_20['Lower']),
+        marker=dict(color='#6366f1')
+    ))
+    fig.update_layout(height=450, yaxis_title='Forecast Count')
+    fig.update_xaxes(tickangle=-45)
+    return to_spec(fig)
+
+
+@cached_spec
+def margin_figure(version, month, _margin_summary):
+    top_20 = _margin_summary.head(20).rename(columns={'Category': 'Item Name'})
+    fig = px.bar(top_20, y='Gross Margin', x='Item Name', color='Margin %', color_continuous_scale='Greens',
+                 hover_data={'Food Cost': ':.2f', 'Amount': ':.2f'})
+    fig.update_layout(height=500)
+    fig.update_xaxes(tickangle=-45)
+    return to_spec(fig)
+
+
+@cached_spec
+def rollup_figure(version, menu, time, measure, drill, _rollup_df):
+    fig = px.bar(_rollup_df.sort_values('Period'), x='Period', y=measure, color='Menu',
+                 labels={'Menu': menu.capitalize(), 'Period': time.capitalize()})
+    fig.update_layout(height=450, barmode='stack')
+    return to_spec(fig)
@@ -0,0 +1,115 @@
+"""
+Mai Shan Yun - Ingestion Checks
+One parse / validate / type pass for the sales and recipe files, with every data-quality
+violation collected into a compact report instead of silently becoming 0
+
+Month files go through pandas' C reader with thousands=',', so "6,921.26" and "1,234.00" are
+numbers straight out of the parser. Only a column that still holds text after that is coerced,
+once, and the cells that failed are kept for the report. Downstream stages receive float
+columns and never coerce again.
+"""
+
+import pandas as pd
+
+SALES_COLS = ['Item Name', 'Count', 'Amount']
+MEASURES = ['Count', 'Amount']
+ISSUE_COLS = ['File', 'Item', 'Column', 'Value', 'Issue']
+# text of cells that failed to parse, next to their column, e.g. 'Count raw'
+RAW_SUFFIX = ' raw'
+
+
+def empty_issues():
+    return pd.DataFrame(columns=ISSUE_COLS)
+
+
+def _issues(source, items, column, values, issue):
+    return pd.DataFrame({'File': source, 'Item': items, 'Column': column, 'Value': values, 'Issue': issue},
+                        columns=ISSUE_COLS)
+
+
+def _coerce(df, col):
+    """Parse a text column to float once, keeping the text of unparseable cells in '<col> raw'"""
+    if pd.api.types.is_numeric_dtype(df[col]):
+        return
+    # the reader leaves separators in place once a column holds any text
+    values = pd.to_numeric(df[col].astype(str).str.replace(',', '', regex=False).where(df[col].notna()), errors='coerce')
+    df[col + RAW_SUFFIX] = df[col].where(values.isna() & df[col].notna())
+    df[col] = values
+
+
+# ============================================
+# SALES
+# ============================================
+def read_month_raw(path):
+    """Native read of one month file: Category plus float Count / Amount (NaN where not a number)"""
+    # only blank cells are missing; text such as 'n/a' is reported as unparseable
+    df = pd.read_csv(path, usecols=SALES_COLS, thousands=',', dtype={'Item Name': object},
+                     keep_default_na=False, na_values=[''])
+    df.rename(columns={'Item Name': 'Category'}, inplace=True)
+    for col in MEASURES:
+        _coerce(df, col)
+    return df
+
+
+def validate_month(df, source):
+    """(typed month frame, issues) for a frame from read_month_raw (or an engine with the same layout)
+
+    Unparseable and missing Count / Amount cells are reported and counted as 0; negative values
+    and fractional counts are reported and kept.
+    """
+    found = []
+    blank = df['Category'].isna() | (df['Category'].astype(str).str.strip() == '')
+    names = df['Category'].where(~blank)
+    if blank.any():
+        found.append(_issues(source, names[blank], 'Item Name', '', 'missing item name'))
+
+    for col in MEASURES:
+        values = df[col]
+        raw = df.get(col + RAW_SUFFIX, pd.Series(None, index=df.index, dtype=object))
+        unparseable = raw.notna()
+        missing = values.isna() & ~unparseable
+        negative = values < 0
+        if unparseable.any():
+            found.append(_issues(source, names[unparseable], col, raw[unparseable], 'unparseable'))
+        if missing.any():
+            found.append(_issues(source, names[missing], col, '', 'missing'))
+        if negative.any():
+            found.append(_issues(source, names[negative], col, values[negative].astype(str), 'negative'))
+
+    fractional = df['Count'].notna() & (df['Count'] % 1 != 0)
+    if fractional.any():
+        found.append(_issues(source, names[fractional], 'Count', df['Count'][fractional].astype(str), 'fractional count'))
+
+    month_df = df[MEASURES].fillna(0).astype(float)
+    month_df.insert(0, 'Category', names)
+    return month_df, concat_issues(found)
+
+
+# ============================================
+# RECIPES
+# ============================================
+def type_table(df, keyCols, source):
+    """(copy with every non-key column as float, issues for non-numeric text); blanks stay NaN = not used"""
+    df = df.copy()
+    found = []
+    for col in df.columns.drop(keyCols, errors='ignore'):
+        _coerce(df, col)
+        raw = df.pop(col + RAW_SUFFIX) if col + RAW_SUFFIX in df.columns else None
+        if raw is not None and raw.notna().any():
+            bad = raw.notna()
+            found.append(_issues(source, df[keyCols[0]][bad], col, raw[bad].astype(str), 'unparseable'))
+        df[col] = df[col].astype(float)
+    return df, concat_issues(found)
+
+
+def concat_issues(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else empty_issues()
+
+
+def summarize_issues(issues):
+    """Issue counts per file, column and kind, most frequent first"""
+    if issues.empty:
+        return pd.DataFrame(columns=['File', 'Column', 'Issue', 'Rows'])
+    return (issues.groupby(['File', 'Column', 'Issue'], as_index=False).size()
+            .rename(columns={'size': 'Rows'}).sort_values('Rows', ascending=False, ignore_index=True))
@@ -1,28 +1,26 @@
 import pandas as pd
 import streamlit as st
 import plotly.express as px
-from glob import glob
-import os
+import pipeline
 
 st.title("Mai Shan Yun Inventory Dashboard")
 
 # Load Base Ingredient Data
-# Ingredient.csv file contains ingredient usage per menu item.
-ingredients = pd.read_csv('Ingredient.csv')
+# Ingredient.csv file contains ingredient usage per menu item (quantities typed as floats at ingestion).
+ingredients = pipeline.load_ingredients('.').rename(columns={'Category': 'Item name'})
 
 # Load Monthly Sales Data for all months
-# Each month has a csv and combine it into a single Dataframe
+# Each month file (csv_files/ or the year/month archive) is combined into a single Dataframe
 monthly_data = []
-months = ['may', 'june', 'july', 'august', 'september', 'october']
+months = []
 
-for month in months:
-    file_path = f'csv_files/{month}.csv'
-    
-    # Check if the monthly CSV exists before loading
-    if os.path.exists(file_path):
-        df = pd.read_csv(file_path)
-        df['Month'] = month.capitalize()  # Add a column for the month name
-        monthly_data.append(df)
+for file_path in sorted(pipeline.sales_files('.'), key=lambda path: pipeline.month_sort_key(pipeline.month_from_path(path))):
+    month = pipeline.month_from_path(file_path)
+    # Count / Amount are parsed once, "1,234" included
+    df = pipeline.load_month(file_path).rename(columns={'Category': 'Item Name'})
+    df['Month'] = month.capitalize()  # Add a column for the month name
+    monthly_data.append(df)
+    months.append(month)
 
 # Combine all months into one DataFrame
 sales_data = pd.concat(monthly_data, ignore_index=True)
@@ -44,10 +42,8 @@ merged = pd.merge(
 # For each ingredient column, multiply ingredient amount by how many items were sold.
 ingredient_cols = [col for col in ingredients.columns if col != 'Item name']
 
-# Convert ingredient and count columns to numeric and replace invalids or blanks with 0
-for col in ingredient_cols:
-    merged[col] = pd.to_numeric(merged[col], errors='coerce').fillna(0)
-merged['Count'] = pd.to_numeric(merged['Count'], errors='coerce').fillna(0)
+# Items without a recipe use nothing (columns are already numeric)
+merged[ingredient_cols] = merged[ingredient_cols].fillna(0)
 
 # For each ingredient column, calculate total usage per item (basically multiplying it)
 # e.g. if each ramen uses 100g of flour and 20 sold → 2000g total.
@@ -0,0 +1,147 @@
+"""
+Mai Shan Yun - Daily Inventory Ledger
+On-hand stock per ingredient per day from dated shipment receipts minus daily usage
+
+Everything is a (days x ingredients) array and on-hand is one cumulative sum down the day axis,
+so several stores can be ledgered at once by placing their columns side by side.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import profiling
+
+
+# ============================================
+# USAGE
+# ============================================
+def daily_usage(monthly_usage):
+    """Spread each month's usage evenly over its days on a gap-free daily index
+
+    Months without a calendar date are dropped, and days in missing months get zero usage.
+    """
+    starts = pd.DatetimeIndex([pipeline.period_start(month) for month in monthly_usage.index])
+    known = ~starts.isna()
+    usage = monthly_usage[known]
+    starts = starts[known]
+    if not len(starts):
+        return pd.DataFrame(columns=monthly_usage.columns, index=pd.DatetimeIndex([]), dtype=float)
+    days = starts.days_in_month.to_numpy()
+    perDay = np.repeat(usage.to_numpy(dtype=float) / days[:, None], days, axis=0)
+    dates = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(start, periods=n, freq='D').to_numpy() for start, n in zip(starts, days)
+    ]))
+    usage = pd.DataFrame(perDay, index=dates, columns=monthly_usage.columns).sort_index()
+    return usage.reindex(pd.date_range(dates.min(), dates.max(), freq='D'), fill_value=0)
+
+
+def history_end(monthly_usage):
+    """Last day of the latest datable month; ledger days after it come from the forecast"""
+    starts = pd.DatetimeIndex([pipeline.period_start(month) for month in monthly_usage.index]).dropna()
+    return starts.max() + pd.offsets.MonthEnd(0) if len(starts) else pd.NaT
+
+
+# ============================================
+# LEDGER
+# ============================================
+def on_hand(receipts, usage, opening=None):
+    """Vectorized ledger: opening + running sum of (receipts - usage) along axis 0"""
+    level = np.cumsum(receipts - usage, axis=0)
+    if opening is not None:
+        level += opening
+    return level
+
+
+def first_receipts(receipts):
+    """Day index of each column's first receipt (len(receipts) if it never receives)"""
+    received = receipts > 0
+    if not len(received):
+        return np.zeros(received.shape[1], dtype=int)
+    return np.where(received.any(axis=0), received.argmax(axis=0), len(receipts))
+
+
+def estimate_opening(receipts, usage):
+    """Opening stock that exactly covers the usage before each ingredient's first receipt
+
+    Without a count the shelf cannot be known; assuming it ran down to zero right before the
+    first delivery is the smallest opening consistent with the sales that happened.
+    """
+    before = np.arange(len(usage))[:, None] < first_receipts(receipts)[None, :]
+    return np.where(before, usage, 0).sum(axis=0)
+
+
+def opening_stock(receipts_df, usage_df, opening=None):
+    """Ledger opening per ingredient: the count in opening where there is one, estimate_opening elsewhere"""
+    stock = pd.Series(estimate_opening(receipts_df.to_numpy(), usage_df.to_numpy()),
+                      index=receipts_df.columns, name='On Hand')
+    if opening is None:
+        return stock
+    return pd.Series(opening, dtype=float).reindex(stock.index).fillna(stock).rename('On Hand')
+
+
+def load_opening(dataDir='.'):
+    """Optional opening counts (Ingredient, On Hand) in recipe units"""
+    path = os.path.join(dataDir, pipeline.OPENING_FILE)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path).set_index('Ingredient')['On Hand']
+
+
+@profiling.stage('build_ledger')
+def build_ledger(shipments_df, monthly_usage, opening=None, holidays=None, forecast=None):
+    """Daily on-hand frame (date x shipment ingredient) plus the receipts and usage behind it
+
+    forecast (period x ingredient usage, e.g. demandForecast's) extends the ledger past the last
+    sales month, so stockouts are projected rather than only found in the past. Ingredients
+    missing from opening start from estimate_opening.
+    """
+    usage = daily_usage(monthly_usage)
+    if forecast is not None and not forecast.empty:
+        future = daily_usage(forecast.reindex(columns=monthly_usage.columns, fill_value=0))
+        future = future[future.index > usage.index[-1]] if len(usage) else future
+        usage = pd.concat([usage, future])
+        usage = usage.reindex(pd.date_range(usage.index[0], usage.index[-1], freq='D'), fill_value=0)
+    dates = usage.index
+    ingredients = shipments_df['Ingredient'].tolist()
+    if not len(dates):
+        # no datable month: nothing to ledger
+        empty = pd.DataFrame(columns=ingredients, index=dates, dtype=float)
+        return empty, empty.copy(), empty.copy()
+
+    # usage columns mapped onto shipment ingredients
+    usageCols = [pipeline.INGREDIENT_NAME_MAP.get(name) for name in ingredients]
+    usageMatrix = usage.reindex(columns=usageCols).fillna(0).to_numpy()
+
+    # receipts land on the delivery calendar's days
+    receipts = pipeline.shipment_calendar(shipments_df, holidays).daily_supply(dates[0], dates[-1]).to_numpy()
+    receipts_df = pd.DataFrame(receipts, index=dates, columns=ingredients)
+    usage_df = pd.DataFrame(usageMatrix, index=dates, columns=ingredients)
+
+    level = on_hand(receipts, usageMatrix, opening_stock(receipts_df, usage_df, opening).to_numpy())
+    return pd.DataFrame(level, index=dates, columns=ingredients), receipts_df, usage_df
+
+
+def stockout_dates(ledger_df, receipts_df=None):
+    """First day each ingredient's on-hand goes negative (NaT if it never does)
+
+    With receipts_df, days before an ingredient's first receipt are not counted.
+    """
+    if ledger_df.empty:
+        return pd.Series(pd.NaT, index=ledger_df.columns, name='Stockout Date', dtype='datetime64[ns]')
+    negative = ledger_df.to_numpy() < 0
+    if receipts_df is not None:
+        negative &= np.arange(len(ledger_df))[:, None] >= first_receipts(receipts_df.to_numpy())[None, :]
+    first = negative.argmax(axis=0)
+    dates = ledger_df.index[first].to_numpy()
+    return pd.Series(np.where(negative.any(axis=0), dates, np.datetime64('NaT')),
+                     index=ledger_df.columns, name='Stockout Date')
+
+
+def stockout_report(ledger_df, receipts_df, historyEnd):
+    """(Ingredient, Date, Projected) per stockout, soonest first; Projected = after the sales history"""
+    stockouts = stockout_dates(ledger_df, receipts_df).dropna().sort_values()
+    return pd.DataFrame({'Ingredient': stockouts.index.to_numpy(), 'Date': stockouts.to_numpy(),
+                         'Projected': stockouts.to_numpy() > historyEnd})
@@ -4,13 +4,13 @@ import glob
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-#each month's item and customer spending data
-may_df = pd.read_csv('td25-msy/csv_files/may.csv')
-jun_df = pd.read_csv('td25-msy/csv_files/june.csv')
-jul_df = pd.read_csv('td25-msy/csv_files/july.csv')
-aug_df = pd.read_csv('td25-msy/csv_files/august.csv')
-sep_df = pd.read_csv('td25-msy/csv_files/september.csv')
-oct_df = pd.read_csv('td25-msy/csv_files/october.csv')
+#each month's item and customer spending data ("1,234.00" is parsed as a number by the reader)
+may_df = pd.read_csv('td25-msy/csv_files/may.csv', thousands=',')
+jun_df = pd.read_csv('td25-msy/csv_files/june.csv', thousands=',')
+jul_df = pd.read_csv('td25-msy/csv_files/july.csv', thousands=',')
+aug_df = pd.read_csv('td25-msy/csv_files/august.csv', thousands=',')
+sep_df = pd.read_csv('td25-msy/csv_files/september.csv', thousands=',')
+oct_df = pd.read_csv('td25-msy/csv_files/october.csv', thousands=',')
 
 may = may_df.copy()
 jun = jun_df.copy()
@@ -28,8 +28,6 @@ oct = oct.drop(['source_page', 'source_table'], axis=1)
 
 #combine into 1 df for all time spending and count sold for each item
 months_df = pd.concat([may, jun, jul, aug, sep, oct], axis=0)
-months_df['Count'] = months_df['Count'].replace(',', '', regex=True).astype(float)
-months_df['Amount'] = months_df['Amount'].replace(',', '', regex=True).astype(float)
 months_df['Item Name'] = months_df['Item Name'].replace(' ', '\n', regex=True)
 
 #summary of total spending
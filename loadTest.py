@@ -0,0 +1,191 @@
+"""
+Mai Shan Yun - Dashboard Load Test
+Drives dash2.py / dashboard.py headlessly with many concurrent simulated sessions (Streamlit AppTest)
+and reports rerun latency percentiles per page plus peak process memory
+
+Usage:
+    python loadTest.py                                   # 50 sessions against the real data
+    python loadTest.py --sessions 50 --items 2000        # against a synthetic-scale dataset
+    python loadTest.py --script dash2.py --max-p95 1.5   # exit 1 if any page's p95 exceeds 1.5s
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+import pipeline
+import syntheticData
+
+SCRIPTS = ['dash2.py', 'dashboard.py']
+
+
+# ============================================
+# SIMULATED SESSION
+# ============================================
+def find_widget(elements, label):
+    """First widget in an AppTest element list whose label starts with label"""
+    for element in elements:
+        if element.label.startswith(label):
+            return element
+    return None
+
+
+def current_page(at):
+    return at.radio[0].value if len(at.radio) else 'main'
+
+
+def timed_run(at, samples, action=None):
+    """Apply action (a widget change) and rerun; any exception is recorded as a failed sample
+
+    AppTest raises from both widget lookups and reruns under load, and one broken session
+    must not abort the whole report. Returns False when the session needs a reload.
+    """
+    page = current_page(at)
+    start = time.perf_counter()
+    try:
+        if action is not None:
+            action()
+        at.run()
+        page = current_page(at)
+        # a rerun that rendered no navigation radio was interrupted; count it as an error
+        error = 'no page rendered' if not len(at.radio) else (
+            at.exception[0].message if len(at.exception) else None)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    samples.append((page, time.perf_counter() - start, error))
+    return error is None
+
+
+def run_session(script, actions, seed, timeout):
+    """One manager clicking around: switch pages, change month, move the top-N slider"""
+    rng = random.Random(seed)
+    samples = []
+
+    def reload():
+        at = AppTest.from_file(os.path.abspath(script), default_timeout=timeout)
+        return at, timed_run(at, samples)
+
+    at, healthy = reload()
+    for _ in range(actions):
+        if not healthy:
+            # reload the page, as a user would after a broken render
+            at, healthy = reload()
+            continue
+        action = rng.choice(['page', 'month', 'topn'])
+        month = find_widget(at.selectbox, 'Select Month')
+        slider = find_widget(at.slider, 'Number of ingredients')
+        if action == 'page' or (action == 'month' and month is None) or (action == 'topn' and slider is None):
+            radio = at.radio[0]
+            change = lambda: radio.set_value(rng.choice(radio.options))
+        elif action == 'month':
+            change = lambda: month.set_value(rng.choice(month.options))
+        else:
+            change = lambda: slider.set_value(rng.randint(slider.min, slider.max))
+        healthy = timed_run(at, samples, change)
+
+    return samples
+
+
+# ============================================
+# REPORT
+# ============================================
+def summarize(samples):
+    """Per-page latency percentiles in seconds, plus error counts by message"""
+    byPage = {}
+    for page, seconds, error in samples:
+        latencies, errors = byPage.setdefault(page, ([], collections.Counter()))
+        latencies.append(seconds)
+        if error is not None:
+            errors[error.splitlines()[0][:120]] += 1
+    report = {}
+    for page, (latencies, errors) in sorted(byPage.items()):
+        latencies = np.array(latencies)
+        report[page] = {
+            'runs': len(latencies),
+            'errors': sum(errors.values()),
+            'error_types': dict(errors.most_common()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99)),
+            'max': float(latencies.max()),
+        }
+    return report
+
+
+def peak_memory_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def print_report(script, report, wallSeconds):
+    print(f"\n{script}  ({wallSeconds:.1f}s wall, peak RSS {peak_memory_mb():.0f} MB)")
+    print(f"{'Page':<24}{'runs':>6}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for page, stats in report.items():
+        print(f"{page:<24}{stats['runs']:>6}{stats['errors']:>8}"
+              f"{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}{stats['max']:>9.3f}")
+    errors = collections.Counter()
+    for stats in report.values():
+        errors.update(stats['error_types'])
+    for error, count in errors.most_common(5):
+        print(f"  {count:>5} x {error}")
+
+
+# ============================================
+# MAIN
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent-session load test for the dashboards')
+    parser.add_argument('--script', action='append', dest='scripts', choices=SCRIPTS,
+                        help='Dashboard to test (repeatable, default: both)')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--actions', type=int, default=10, help='Widget interactions per session')
+    parser.add_argument('--data-dir', dest='dataDir', help='Dataset to serve (default: MSY_DATA_DIR or .)')
+    parser.add_argument('--items', type=int, help='Generate a synthetic dataset with this many menu items')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-rerun timeout in seconds')
+    parser.add_argument('--json', dest='jsonPath', help='Also write the report as JSON')
+    parser.add_argument('--max-p95', type=float, dest='maxP95', help='Fail if any page p95 exceeds this')
+    args = parser.parse_args(argv)
+
+    if args.items:
+        args.dataDir = syntheticData.generate(tempfile.mkdtemp(prefix='msy-synthetic-'), items=args.items)
+    if args.dataDir:
+        # the apps run in this process, so their refreshers read this directory
+        pipeline.DATA_DIR = args.dataDir
+
+    results = {}
+    for script in args.scripts or SCRIPTS:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(run_session, script, args.actions, seed, args.timeout)
+                       for seed in range(args.sessions)]
+            samples = [sample for future in futures for sample in future.result()]
+        results[script] = summarize(samples)
+        print_report(script, results[script], time.perf_counter() - start)
+
+    results['peak_rss_mb'] = peak_memory_mb()
+    if args.jsonPath:
+        with open(args.jsonPath, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.maxP95 is not None:
+        slow = [(script, page) for script in results if script in SCRIPTS
+                for page, stats in results[script].items() if stats['p95'] > args.maxP95]
+        if slow:
+            print(f"\np95 above {args.maxP95}s: {slow}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Mai Shan Yun - Perishable Lot Tracking
+FIFO lot simulation with shelf lives: expected spoilage and waste cost per ingredient
+
+Lots live in a (columns x shelf-life) ring buffer instead of per-lot objects. Each day expires
+the lot that turned too old, books the day's receipt into its slot, and consumes usage from the
+oldest slots first, for every ingredient (and store) column with that shelf life at once.
+Ingredients without a shelf life are durable and never spoil. Shelf lives are whole days of at
+least 1; fractional ones are rounded up (a lot good for 2.5 days is still usable on day 3).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import profiling
+
+
+def whole_days(shelfLife):
+    """Shelf lives rounded up to whole days; ValueError for any below 1 day (NaN is left as NaN)"""
+    life = np.ceil(np.asarray(shelfLife, dtype=float))
+    if (life < 1).any():
+        raise ValueError("Shelf lives must be at least 1 day")
+    return life
+
+
+def load_shelf_life(dataDir='.'):
+    """Shelf life in whole days per shipment ingredient (Ingredient, Shelf Life (days))"""
+    path = os.path.join(dataDir, pipeline.SHELF_LIFE_FILE)
+    if not os.path.exists(path):
+        return pd.Series(dtype=float, name='Shelf Life (days)')
+    shelf_life = pd.read_csv(path).set_index('Ingredient')['Shelf Life (days)'].astype(float)
+    tooShort = shelf_life.index[shelf_life < 1].tolist()
+    if tooShort:
+        raise ValueError(f"{pipeline.SHELF_LIFE_FILE}: shelf life below 1 day for {', '.join(map(str, tooShort))}")
+    return pd.Series(whole_days(shelf_life), index=shelf_life.index, name=shelf_life.name)
+
+
+def _simulate_window(receipts, usage, window, opening, out, cols):
+    """FIFO for columns sharing one shelf life; the ring slot of day t holds the lot received on t"""
+    days = receipts.shape[0]
+    ring = np.zeros((len(cols), window))
+    if opening is not None:
+        ring[:, 0] = opening
+    for t in range(days):
+        slot = t % window
+        # the lot in today's slot arrived `window` days ago and has expired
+        # (opening stock counts as received on day 0)
+        if t >= window:
+            out['spoiled'][t, cols] = ring[:, slot]
+            ring[:, slot] = 0
+        ring[:, slot] += receipts[t]
+
+        # FIFO: walk slots from oldest to newest, taking until the day's usage is met
+        order = (slot + 1 + np.arange(window)) % window
+        lots = ring[:, order]
+        cumulative = np.cumsum(lots, axis=1)
+        taken = np.clip(np.minimum(cumulative, usage[t][:, None]) - (cumulative - lots), 0, None)
+        ring[:, order] = lots - taken
+
+        consumed = taken.sum(axis=1)
+        out['consumed'][t, cols] = consumed
+        out['unmet'][t, cols] = np.maximum(usage[t] - consumed, 0)
+        out['on_hand'][t, cols] = ring.sum(axis=1)
+
+
+def simulate_fifo(receipts, usage, shelfLife, opening=None):
+    """Run the FIFO lot simulation
+
+    receipts, usage: (days x columns) arrays in the same units
+    shelfLife: (columns,) days a lot stays usable, including its receipt day (rounded up, >= 1)
+    Returns dict of (days x columns) arrays: on_hand, consumed, spoiled, unmet
+    """
+    life = whole_days(shelfLife).astype(int)
+    out = {name: np.zeros(receipts.shape) for name in ('on_hand', 'consumed', 'spoiled', 'unmet')}
+    # columns with the same shelf life share a ring exactly that wide
+    for window in np.unique(life):
+        cols = np.flatnonzero(life == window)
+        _simulate_window(
+            receipts[:, cols], usage[:, cols], int(window),
+            None if opening is None else np.asarray(opening)[cols],
+            out, cols
+        )
+    return out
+
+
+@profiling.stage('spoilage_report')
+def spoilage_report(receipts_df, usage_df, shelf_life, unit_cost=None, opening=None):
+    """Per-ingredient received, used, spoiled and waste cost for the perishable ingredients
+
+    opening should be the ledger's opening stock (inventoryLedger.opening_stock), so the lots
+    start from the same shelf as the on-hand ledger.
+    """
+    perishable = [col for col in receipts_df.columns if pd.notna(shelf_life.get(col))]
+    if not perishable:
+        return pd.DataFrame(columns=['Ingredient', 'Shelf Life (days)', 'Received', 'Used',
+                                     'Spoiled', 'Spoiled %', 'Unmet Demand', 'Waste Cost'])
+
+    life = whole_days(shelf_life.reindex(perishable))
+    openingVector = None if opening is None else pd.Series(opening).reindex(perishable).fillna(0).to_numpy(dtype=float)
+    result = simulate_fifo(
+        receipts_df[perishable].to_numpy(dtype=float),
+        usage_df[perishable].to_numpy(dtype=float),
+        life,
+        openingVector
+    )
+
+    received = receipts_df[perishable].sum().to_numpy()
+    spoiled = result['spoiled'].sum(axis=0)
+    cost = np.zeros(len(perishable)) if unit_cost is None else pd.Series(unit_cost).reindex(perishable).fillna(0).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spoiledPct = np.where(received > 0, spoiled / received * 100, 0)
+
+    return pd.DataFrame({
+        'Ingredient': perishable,
+        'Shelf Life (days)': life.astype(int),
+        'Received': received,
+        'Used': result['consumed'].sum(axis=0),
+        'Spoiled': spoiled,
+        'Spoiled %': spoiledPct,
+        'Unmet Demand': result['unmet'].sum(axis=0),
+        'Waste Cost': spoiled * cost,
+    }).sort_values('Waste Cost', ascending=False)
@@ -0,0 +1,115 @@
+"""
+Mai Shan Yun - Food Cost & Margin Engine
+Theoretical food cost, gross margin and margin share per menu item x month
+
+IngredientPrice.csv lists purchase prices in shipment units:
+    Ingredient,Price per unit,Unit,Supplier,effective_from
+Ingredient uses the Shipment.csv names; lbs prices are converted to per-gram to match the recipes.
+Supplier and effective_from are optional; each month uses the latest price effective on its first
+day (as-of join), averaged across suppliers unless one supplier is selected.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import profiling
+
+
+def load_prices(dataDir='.'):
+    """Ingredient price table, or None if the store has none"""
+    path = os.path.join(dataDir, pipeline.PRICE_FILE)
+    if not os.path.exists(path):
+        return None
+    prices_df = pd.read_csv(path)
+    if 'Supplier' not in prices_df.columns:
+        prices_df['Supplier'] = ''
+    if 'effective_from' not in prices_df.columns:
+        prices_df['effective_from'] = pd.NaT
+    return prices_df
+
+
+def price_matrix(prices_df, ingredientCols, months, supplier=None):
+    """Cost per recipe unit as an ingredient column x month frame"""
+    prices = prices_df if supplier is None else prices_df[prices_df['Supplier'] == supplier]
+    prices = prices.assign(
+        Supplier=prices['Supplier'].fillna(''),
+        effective_from=pd.to_datetime(prices['effective_from']).fillna(pd.Timestamp.min),
+        Column=prices['Ingredient'].map(pipeline.INGREDIENT_NAME_MAP),
+        unitCost=prices['Price per unit'] / np.where(
+            prices['Unit'].str.lower().str.strip() == 'lbs', pipeline.LBS_TO_GRAMS, 1
+        )
+    ).dropna(subset=['Column']).sort_values('effective_from')
+
+    # as-of join: every (ingredient, supplier) x month picks the latest price effective by then
+    periods = pd.DataFrame({'month': list(months)})
+    periods['date'] = [pipeline.period_start(month) for month in periods['month']]
+    periods['date'] = periods['date'].fillna(pd.Timestamp.max)
+    keys = prices[['Ingredient', 'Supplier', 'Column']].drop_duplicates()
+    left = keys.merge(periods, how='cross').sort_values('date')
+    asof = pd.merge_asof(
+        left, prices[['Ingredient', 'Supplier', 'effective_from', 'unitCost']],
+        left_on='date', right_on='effective_from', by=['Ingredient', 'Supplier']
+    )
+    matrix = asof.groupby(['Column', 'month'])['unitCost'].mean().unstack('month')
+    return matrix.reindex(index=ingredientCols, columns=list(months)).fillna(0)
+
+
+@profiling.stage('calculate_margins')
+def calculate_margins(sales_df, book, prices_df, months, supplier=None):
+    """Long frame of Count, Amount, Food Cost, Gross Margin, Margin % and Margin Share % per item x month"""
+    months = list(months)
+    counts = sales_df.pivot_table(index='Category', columns='month', values='Count', aggfunc='sum', fill_value=0)
+    revenue = sales_df.pivot_table(index='Category', columns='month', values='Amount', aggfunc='sum', fill_value=0)
+    counts = counts.reindex(columns=months, fill_value=0)
+    revenue = revenue.reindex(index=counts.index, columns=months, fill_value=0)
+
+    ingredientCols = pipeline.ingredient_columns(book.base)
+    prices = price_matrix(prices_df, ingredientCols, months, supplier)
+
+    # months sharing a recipe version are costed with one matrix product
+    unitCost = np.full(counts.shape, np.nan)
+    byVersion = {}
+    for j, month in enumerate(months):
+        byVersion.setdefault(book.active_versions(pipeline.period_start(month)), []).append(j)
+    for cols in byVersion.values():
+        recipe = book.matrix_for(pipeline.period_start(months[cols[0]]))
+        costed = counts.index.isin(recipe.index)
+        quantities = recipe.reindex(index=counts.index[costed], columns=ingredientCols, fill_value=0).to_numpy()
+        unitCost[np.ix_(costed, cols)] = quantities @ prices.iloc[:, cols].to_numpy()
+
+    foodCost = counts.to_numpy() * unitCost
+    margin = revenue.to_numpy() - foodCost
+    with np.errstate(divide='ignore', invalid='ignore'):
+        marginPct = np.where(revenue.to_numpy() > 0, margin / revenue.to_numpy() * 100, np.nan)
+        marginShare = margin / np.nansum(margin, axis=0) * 100
+
+    index = pd.MultiIndex.from_product([counts.index, months], names=['Category', 'month'])
+    return pd.DataFrame({
+        'Count': counts.to_numpy().ravel(),
+        'Amount': revenue.to_numpy().ravel(),
+        'Food Cost': foodCost.ravel(),
+        'Gross Margin': margin.ravel(),
+        'Margin %': marginPct.ravel(),
+        'Margin Share %': marginShare.ravel(),
+    }, index=index).reset_index()
+
+
+def summarize_margins(margin_df, month=None):
+    """Per-item totals over all months (or one month), costed items only, by gross margin"""
+    rows = margin_df if month is None else margin_df[margin_df['month'] == month]
+    rows = rows.dropna(subset=['Food Cost'])
+    summary = rows.groupby('Category', as_index=False)[['Count', 'Amount', 'Food Cost', 'Gross Margin']].sum()
+    summary = summary[summary['Amount'] > 0]
+    summary['Margin %'] = summary['Gross Margin'] / summary['Amount'] * 100
+    summary['Margin Share %'] = summary['Gross Margin'] / summary['Gross Margin'].sum() * 100
+    return summary.sort_values('Gross Margin', ascending=False)
+
+
+def ingredient_unit_cost(prices_df, month):
+    """Cost per recipe unit in a month, keyed by shipment ingredient name"""
+    names = list(pipeline.INGREDIENT_NAME_MAP)
+    matrix = price_matrix(prices_df, [pipeline.INGREDIENT_NAME_MAP[name] for name in names], [month])
+    return pd.Series(matrix[month].to_numpy(), index=names)
@@ -0,0 +1,376 @@
+"""
+Mai Shan Yun - Live Order Stream
+Tails the POS order log and keeps running per-ingredient usage and on-hand estimates between the
+monthly CSV exports, publishing them to the shared dashboard cache and warning on low stock
+
+Each log line is one JSON order:
+    {"timestamp": "2025-10-03T12:31:00", "order_id": "A17", "lines": [{"item": "Beef Ramen", "count": 2, "amount": 27.5}]}
+or a single order line {"timestamp": ..., "item": ..., "count": ..., "amount": ...}.
+Timestamps with an offset (or Z) are converted to the store's time zone (MSY_TIMEZONE); naive
+ones are taken as store time already. Events without a readable timestamp are rejected.
+On hand starts from OpeningStock.csv (the last physical count), adds deliveries from the shipment
+calendar and subtracts the recipe usage of every streamed order.
+
+Usage:
+    python orderStream.py --log orders.jsonl                 # tail a local append-only log
+    python orderStream.py --port 9009                        # POS stand-in: JSON lines over TCP
+    python orderStream.py --log orders.jsonl --from-start --once   # replay a log and exit
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import inventoryLedger
+import pipeline
+import refresher
+import sharedCache
+import shipmentCalendar
+import stockAlerts
+
+BATCH_SIZE = 500
+BATCH_WAIT = 0.5
+QUEUE_SIZE = 10000
+POLL_SECONDS = 0.2
+LINE_COLS = ['timestamp', 'order_id', 'item', 'count', 'amount']
+# business days and "today" are in the store's wall-clock time
+STORE_TZ = os.environ.get('MSY_TIMEZONE', 'America/Chicago')
+
+
+def live_name(dataDir):
+    """Name a store's live aggregates are published under in the shared cache"""
+    return 'orders-' + hashlib.sha1(os.path.abspath(dataDir).encode()).hexdigest()[:12]
+
+
+# ============================================
+# EVENT PARSING
+# ============================================
+# ids for events that carry no order_id
+_anonymousOrders = itertools.count()
+
+
+def store_time(timestamps, tz=STORE_TZ):
+    """Naive store-local datetimes from ISO strings; NaT where a value cannot be parsed
+
+    Values carrying an offset are converted to tz, naive values are kept as they are.
+    """
+    text = timestamps.astype('string')
+    parsed = pd.to_datetime(text, utc=True, errors='coerce', format='ISO8601')
+    aware = text.str.contains(r'(?:Z|[+-]\d{2}:?\d{2})$', regex=True).fillna(False).to_numpy(dtype=bool)
+    local = parsed.dt.tz_convert(tz).dt.tz_localize(None)
+    return local.where(aware, parsed.dt.tz_localize(None))
+
+
+def order_lines(rawLines, tz=STORE_TZ):
+    """Parse raw JSON log lines into one frame of order lines plus the number rejected
+
+    Events without a parseable timestamp are rejected rather than stamped on arrival, which
+    would move late or malformed orders into today.
+    """
+    rows = []
+    rejected = 0
+    for raw in rawLines:
+        try:
+            event = json.loads(raw)
+            lines = event.get('lines', [event])
+            # events without an order id count as one order each, with an id unique across batches
+            orderId = event.get('order_id')
+            if orderId is None:
+                orderId = f'_anonymous-{next(_anonymousOrders)}'
+            for line in lines:
+                rows.append((event.get('timestamp'), orderId, line['item'],
+                             line.get('count', 1), line.get('amount', 0)))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            rejected += 1
+    lines_df = pd.DataFrame(rows, columns=LINE_COLS)
+    lines_df['timestamp'] = store_time(lines_df['timestamp'], tz)
+    undated = lines_df['timestamp'].isna()
+    rejected += lines_df.loc[undated, 'order_id'].nunique()
+    lines_df = lines_df[~undated].reset_index(drop=True)
+    lines_df['count'] = pd.to_numeric(lines_df['count'], errors='coerce').fillna(0)
+    lines_df['amount'] = pd.to_numeric(lines_df['amount'], errors='coerce').fillna(0)
+    return lines_df, rejected
+
+
+# ============================================
+# RUNNING AGGREGATES
+# ============================================
+class LiveUsage:
+    """Running usage counters per day and on-hand estimates per shipment ingredient"""
+
+    def __init__(self, book, shipments_df, avg_usage, opening=None, holidays=None):
+        self.book = book
+        self.ingredientCols = pipeline.ingredient_columns(book.base)
+        self.shipments = shipments_df['Ingredient'].tolist()
+        # on hand and usage are in recipe units (grams for lbs shipments), not shipment units
+        self.units = pipeline.recipe_unit(shipments_df).tolist()
+        self.calendar = pipeline.shipment_calendar(shipments_df, holidays)
+        # shipment ingredient -> position in the usage vector (-1 when no recipe uses it)
+        self.usagePos = pd.Index(self.ingredientCols).get_indexer(
+            [pipeline.INGREDIENT_NAME_MAP.get(name) for name in self.shipments])
+        self.avgDaily = pd.Series(avg_usage).reindex(
+            [pipeline.INGREDIENT_NAME_MAP.get(name) for name in self.shipments]).fillna(0).to_numpy() / 30
+        self.opening = np.zeros(len(self.shipments)) if opening is None else \
+            pd.Series(opening).reindex(self.shipments).fillna(0).to_numpy(dtype=float)
+        self.start = None
+        self.now = None
+        # date -> usage vector over ingredientCols
+        self.byDay = {}
+        # date -> distinct order ids, so an order split across micro-batches counts once
+        self.orders = {}
+        self.revenue = {}
+        self.lines = 0
+        self.unknown = 0
+        self.rejected = 0
+        self._recipes = {}
+
+    def _recipe(self, date):
+        """Item x ingredient matrix of the recipe version in effect on date, built once per version"""
+        ids = self.book.active_versions(date)
+        recipe = self._recipes.get(ids)
+        if recipe is None:
+            recipe = self.book.matrix_for(date).reindex(columns=self.ingredientCols, fill_value=0)
+            self._recipes[ids] = recipe
+        return recipe
+
+    def apply(self, lines_df):
+        """Fold one micro-batch of order lines into the counters with one matrix product per day"""
+        if lines_df.empty:
+            return
+        dates = lines_df['timestamp'].dt.normalize()
+        self.start = dates.min() if self.start is None else min(self.start, dates.min())
+        self.now = lines_df['timestamp'].max() if self.now is None else max(self.now, lines_df['timestamp'].max())
+        self.lines += len(lines_df)
+
+        counts = lines_df.groupby([dates, 'item'])['count'].sum()
+        for date, dayCounts in counts.groupby(level=0):
+            dayCounts = dayCounts.droplevel(0)
+            recipe = self._recipe(date)
+            known = dayCounts.index.isin(recipe.index)
+            self.unknown += int((~known).sum())
+            usage = dayCounts[known].to_numpy() @ recipe.loc[dayCounts.index[known]].to_numpy()
+            self.byDay[date] = self.byDay.get(date, 0) + usage
+
+        for date, day in lines_df.groupby(dates):
+            self.orders.setdefault(date, set()).update(day['order_id'].dropna())
+            self.revenue[date] = self.revenue.get(date, 0) + day['amount'].sum()
+
+    def aggregates(self):
+        """Per shipment ingredient: usage today / since start, receipts, on hand, days of supply, status"""
+        zeros = np.zeros(len(self.ingredientCols))
+        today = self.now.normalize() if self.now is not None else pd.Timestamp.now(tz=STORE_TZ).tz_localize(None).normalize()
+        usageToday = self.byDay.get(today, zeros)
+        usageTotal = sum(self.byDay.values(), zeros)
+
+        def by_shipment(vector):
+            return np.where(self.usagePos >= 0, np.asarray(vector)[self.usagePos], 0)
+
+        receipts = np.zeros(len(self.shipments))
+        if self.start is not None:
+            receipts = self.calendar.daily_supply(self.start, today).sum().to_numpy()
+        onHand = self.opening + receipts - by_shipment(usageTotal)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            daysOfSupply = np.where(self.avgDaily > 0, onHand / self.avgDaily, 999)
+
+        return pd.DataFrame({
+            'Ingredient': self.shipments,
+            'Unit': self.units,
+            'Usage Today': by_shipment(usageToday),
+            'Usage Since Start': by_shipment(usageTotal),
+            'Receipts': receipts,
+            'On Hand': onHand,
+            'Days of Supply': daysOfSupply,
+            'Status': pipeline.stock_status(daysOfSupply),
+        })
+
+    def totals(self):
+        """JSON-safe stream counters for the dashboard"""
+        today = self.now.normalize() if self.now is not None else None
+        return {
+            'as_of': None if self.now is None else self.now.isoformat(timespec='seconds'),
+            'since': None if self.start is None else self.start.date().isoformat(),
+            'orders_today': len(self.orders.get(today, ())),
+            'revenue_today': float(self.revenue.get(today, 0)),
+            'lines': self.lines,
+            'unknown_items': self.unknown,
+            'rejected_events': self.rejected,
+        }
+
+
+def live_alerts(aggregates_df, previous, store, levels):
+    """Alerts for ingredients whose live status entered levels or got worse since the last batch"""
+    rank = {status: i for i, status in enumerate(pipeline.STATUS_LEVELS)}
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    alerts = []
+    for _, row in aggregates_df[aggregates_df['Status'].isin(levels)].iterrows():
+        before = previous.get(row['Ingredient'])
+        if before is not None and rank[before] <= rank[row['Status']]:
+            continue
+        alerts.append({
+            'timestamp': timestamp,
+            'store': store,
+            'type': 'stock',
+            'source': 'live',
+            'ingredient': row['Ingredient'],
+            'status': row['Status'],
+            'days_of_supply': round(float(row['Days of Supply']), 2),
+            'on_hand': round(float(row['On Hand']), 2),
+            'usage_today': round(float(row['Usage Today']), 2),
+            'unit': row['Unit'],
+        })
+    return alerts
+
+
+# ============================================
+# SOURCES
+# ============================================
+async def tail_file(path, queue, fromStart=False, follow=True):
+    """Queue every line appended to path; reopens from the top if the log is truncated"""
+    with open(path) as f:
+        if not fromStart:
+            f.seek(0, os.SEEK_END)
+        partial = ''
+        while True:
+            line = f.readline()
+            if line.endswith('\n'):
+                await queue.put(partial + line)
+                partial = ''
+                continue
+            # half-written line: keep it until the writer finishes it
+            partial += line
+            if not follow:
+                if partial.strip():
+                    await queue.put(partial)
+                return
+            if os.path.getsize(path) < f.tell():
+                f.seek(0)
+                partial = ''
+            await asyncio.sleep(POLL_SECONDS)
+
+
+async def serve_socket(host, port, queue):
+    """Accept JSON-lines connections from POS terminals"""
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            await queue.put(line.decode())
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+# ============================================
+# MICRO-BATCHING
+# ============================================
+async def next_batch(queue, batchSize, batchWait):
+    """Wait for one line, then take whatever else arrives within batchWait (up to batchSize)"""
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + batchWait
+    while len(batch) < batchSize and batch[-1] is not None:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def consume(queue, state, publish, batchSize=BATCH_SIZE, batchWait=BATCH_WAIT):
+    """Apply micro-batches until a None sentinel arrives
+
+    publish (file writes, webhook calls) runs on a worker thread so the sources keep queueing
+    lines meanwhile; state is not touched again until it returns.
+    """
+    while True:
+        batch = await next_batch(queue, batchSize, batchWait)
+        done = batch[-1] is None
+        lines_df, rejected = order_lines([raw for raw in batch if raw is not None and raw.strip()])
+        state.rejected += rejected
+        state.apply(lines_df)
+        await asyncio.to_thread(publish, state)
+        if done:
+            return
+
+
+# ============================================
+# MAIN
+# ============================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest live POS orders into running usage and on-hand')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR)
+    parser.add_argument('--log', help='Append-only JSON-lines order log to tail')
+    parser.add_argument('--from-start', dest='fromStart', action='store_true', help='Read the log from the top')
+    parser.add_argument('--once', action='store_true', help='Stop at the end of the log instead of following it')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='Also accept JSON lines over TCP on this port')
+    parser.add_argument('--batch-size', dest='batchSize', type=int, default=BATCH_SIZE)
+    parser.add_argument('--batch-wait', dest='batchWait', type=float, default=BATCH_WAIT,
+                        help='Seconds to gather a micro-batch')
+    parser.add_argument('--webhook', help='POST live stock alerts here instead of printing them')
+    parser.add_argument('--cache-dir', dest='cacheDir', default=sharedCache.DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+    if not args.log and not args.port:
+        parser.error('give --log and/or --port')
+    return args
+
+
+async def run(args):
+    cache = sharedCache.SharedCache(args.cacheDir)
+    # the snapshot a dashboard or warmCache.py already published for these files, built only if missing
+    snapshot = refresher.SnapshotBuilder(args.dataDir, cache).build()
+    state = LiveUsage(
+        pipeline.load_recipe_book(args.dataDir), snapshot.shipments_df, snapshot.avg_usage,
+        inventoryLedger.load_opening(args.dataDir), shipmentCalendar.load_holidays(args.dataDir)
+    )
+    name = live_name(args.dataDir)
+    statuses = {}
+
+    def publish(state):
+        aggregates_df = state.aggregates()
+        cache.publish(name, aggregates_df, state.totals())
+        try:
+            stockAlerts.emit(live_alerts(aggregates_df, statuses, args.dataDir, stockAlerts.ALERT_LEVELS), args.webhook)
+        except OSError as e:
+            # an unreachable webhook must not stop ingestion; the alerts fire again if the status stays bad
+            print(f"Alert delivery failed: {e}", file=sys.stderr)
+            return
+        statuses.update(zip(aggregates_df['Ingredient'], aggregates_df['Status']))
+
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async def produce():
+        sources = []
+        if args.log:
+            sources.append(tail_file(args.log, queue, args.fromStart, follow=not args.once))
+        if args.port:
+            sources.append(serve_socket(args.host, args.port, queue))
+        await asyncio.gather(*sources)
+        await queue.put(None)
+
+    # if either side fails, stop the other instead of blocking on a full (or empty) queue
+    tasks = [asyncio.create_task(produce()),
+             asyncio.create_task(consume(queue, state, publish, args.batchSize, args.batchWait))]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    for task in done:
+        task.result()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(run(parse_args()))
+    except KeyboardInterrupt:
+        pass
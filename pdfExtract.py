@@ -0,0 +1,255 @@
+"""
+Mai Shan Yun - POS Report Extraction
+Turns monthly POS sales report PDFs into the csv_files/<month>.csv inputs, page by page across
+a process pool
+
+Each page's content streams and resources are hashed up front (cheap, no layout analysis). Pages whose hash is
+already in the page cache are reused; only new or changed pages are sent to the pool, in runs of
+consecutive pages so a worker opens each PDF once per run. Numbers are normalized while the
+tables are read ("6,921.26" -> 6921.26, "(12.00)" -> -12.0), and every report is written both as
+a typed Parquet file and as the month CSV the pipeline reads.
+
+Requires pdfplumber (pip install pdfplumber).
+
+Usage:
+    python pdfExtract.py reports/may.pdf reports/june.pdf --out .
+    python pdfExtract.py packs/2025-10/*/october.pdf --out stores --store-from-folder --workers 8
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import sharedCache
+
+try:
+    import pdfplumber
+    from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+except ImportError:
+    pdfplumber = None
+
+REPORT_COLS = ['source_page', 'source_table', 'Item Name', 'Count', 'Amount']
+# report columns as they appear in a table header, lower-cased
+HEADER_NAMES = {'item name': 'Item Name', 'item': 'Item Name', 'count': 'Count', 'qty': 'Count', 'amount': 'Amount'}
+PAGE_CACHE_DIR = os.path.join('.cache', 'pdf_pages')
+# part of every page hash; bump it when table parsing changes so cached pages are re-extracted
+CACHE_VERSION = 1
+PAGES_PER_TASK = 16
+EXTRACTED_DIR = 'extracted'
+NUMBER_JUNK = re.compile(r'[,$\s]')
+
+
+# ============================================
+# TABLE PARSING
+# ============================================
+def normalize_number(text):
+    """'6,921.26' -> 6921.26, '(12.00)' -> -12.0, blank or text -> NaN"""
+    if text is None:
+        return np.nan
+    text = NUMBER_JUNK.sub('', str(text))
+    negative = text.startswith('(') and text.endswith(')')
+    try:
+        value = float(text.strip('()'))
+    except ValueError:
+        return np.nan
+    return -value if negative else value
+
+
+def header_positions(row):
+    """{report column: cell index} if row is a table header naming every report column, else None"""
+    positions = {}
+    for i, cell in enumerate(row):
+        name = HEADER_NAMES.get(str(cell or '').strip().lower())
+        if name and name not in positions:
+            positions[name] = i
+    return positions if len(positions) == 3 else None
+
+
+def parse_tables(tables, page):
+    """Report rows from one page's extracted tables; rows without a numeric count and amount are skipped
+
+    A table without its own header (a continuation) is read as Item Name, Count, Amount in order.
+    """
+    rows = []
+    for tableNo, table in enumerate(tables, start=1):
+        positions = {'Item Name': 0, 'Count': 1, 'Amount': 2}
+        for row in table:
+            header = header_positions(row)
+            if header is not None:
+                positions = header
+                continue
+            if len(row) <= max(positions.values()):
+                continue
+            name = str(row[positions['Item Name']] or '').strip()
+            count = normalize_number(row[positions['Count']])
+            amount = normalize_number(row[positions['Amount']])
+            # totals, section titles and wrapped lines have no item name or no numbers
+            if name and not np.isnan(count) and not np.isnan(amount):
+                rows.append((page, tableNo, name, count, amount))
+    return rows
+
+
+def page_frame(rows):
+    df = pd.DataFrame(rows, columns=REPORT_COLS)
+    return df.astype({'source_page': 'int32', 'source_table': 'int32', 'Item Name': 'string',
+                      'Count': 'float64', 'Amount': 'float64'})
+
+
+# ============================================
+# PAGE CACHE
+# ============================================
+def _hash_object(digest, obj, seen):
+    """Feed a PDF object into digest: dicts in key order, streams with their data, references followed once"""
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen:
+            digest.update(f'ref {obj.objid};'.encode())
+            return
+        seen.add(obj.objid)
+        obj = resolve1(obj)
+    if isinstance(obj, PDFStream):
+        _hash_object(digest, obj.attrs, seen)
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=str):
+            digest.update(f'{key}:'.encode())
+            _hash_object(digest, obj[key], seen)
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _hash_object(digest, item, seen)
+        digest.update(b']')
+    else:
+        digest.update(f'{obj!r};'.encode())
+
+
+def page_hashes(pdfPath):
+    """Content hash per page, in page order
+
+    Covers CACHE_VERSION, the page size, the raw content streams and the page resources (fonts
+    and XObjects decide what text the streams draw), without any layout analysis.
+    """
+    hashes = []
+    with pdfplumber.open(pdfPath) as pdf:
+        for page in pdf.pages:
+            digest = hashlib.sha1(repr((CACHE_VERSION, page.width, page.height)).encode())
+            for stream in page.page_obj.contents or []:
+                stream = resolve1(stream)
+                if stream is not None:
+                    digest.update(stream.get_data())
+            _hash_object(digest, page.page_obj.resources or {}, set())
+            hashes.append(digest.hexdigest())
+    return hashes
+
+
+def _cache_path(cacheDir, pageHash):
+    return os.path.join(cacheDir, pageHash[:2], f'{pageHash}.arrow')
+
+
+def _store_page(cacheDir, pageHash, df):
+    path = _cache_path(cacheDir, pageHash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    sharedCache.write_frame(df, tmpPath)
+    os.replace(tmpPath, path)
+
+
+def extract_pages(pdfPath, pageNumbers, pageHashes, cacheDir):
+    """Worker: extract a run of pages from one PDF and cache each page's rows"""
+    with pdfplumber.open(pdfPath) as pdf:
+        for pageNo, pageHash in zip(pageNumbers, pageHashes):
+            page = pdf.pages[pageNo - 1]
+            _store_page(cacheDir, pageHash, page_frame(parse_tables(page.extract_tables(), pageNo)))
+            # layout objects of finished pages are not needed again
+            page.flush_cache()
+    return len(pageNumbers)
+
+
+# ============================================
+# REPORTS
+# ============================================
+def output_dir(pdfPath, outDir, storeFromFolder=False):
+    """Data directory a report is written into (one per store with storeFromFolder)"""
+    if storeFromFolder:
+        return os.path.join(outDir, os.path.basename(os.path.dirname(os.path.abspath(pdfPath))))
+    return outDir
+
+
+def write_report(df, pdfPath, dataDir):
+    """Typed Parquet (or Arrow, without pyarrow.parquet) plus the month CSV for the pipeline"""
+    month = os.path.splitext(os.path.basename(pdfPath))[0].lower()
+    os.makedirs(os.path.join(dataDir, 'csv_files'), exist_ok=True)
+    os.makedirs(os.path.join(dataDir, EXTRACTED_DIR), exist_ok=True)
+    try:
+        df.to_parquet(os.path.join(dataDir, EXTRACTED_DIR, f'{month}.parquet'), index=False)
+    except ImportError:
+        sharedCache.write_frame(df, os.path.join(dataDir, EXTRACTED_DIR, f'{month}.arrow'))
+    df.to_csv(os.path.join(dataDir, 'csv_files', f'{month}.csv'), index=False, float_format='%.2f')
+
+
+def extract_reports(pdfPaths, outDir='.', workers=None, cacheDir=PAGE_CACHE_DIR, storeFromFolder=False):
+    """Extract every report, farming uncached pages of all PDFs out to one pool
+
+    Returns {pdf: (pages, pages extracted rather than read from the cache)}
+    """
+    if pdfplumber is None:
+        raise ImportError("pdfplumber is required for PDF extraction (pip install pdfplumber)")
+    hashes = {path: page_hashes(path) for path in pdfPaths}
+
+    tasks = []
+    for path, pageHashes in hashes.items():
+        missing = [(pageNo, pageHash) for pageNo, pageHash in enumerate(pageHashes, start=1)
+                   if not os.path.exists(_cache_path(cacheDir, pageHash))]
+        for start in range(0, len(missing), PAGES_PER_TASK):
+            run = missing[start:start + PAGES_PER_TASK]
+            tasks.append((path, [pageNo for pageNo, _ in run], [pageHash for _, pageHash in run]))
+
+    extracted = {path: 0 for path in pdfPaths}
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(extract_pages, path, pageNumbers, pageHashes, cacheDir): path
+                       for path, pageNumbers, pageHashes in tasks}
+            for future in as_completed(futures):
+                extracted[futures[future]] += future.result()
+
+    for path, pageHashes in hashes.items():
+        pages = [sharedCache.read_frame(_cache_path(cacheDir, pageHash)) for pageHash in pageHashes]
+        # a page reused from another report keeps that report's page number
+        pages = [page.assign(source_page=pageNo) for pageNo, page in enumerate(pages, start=1)]
+        df = pd.concat(pages, ignore_index=True) if pages else page_frame([])
+        write_report(df.astype(page_frame([]).dtypes.to_dict()), path, output_dir(path, outDir, storeFromFolder))
+    return {path: (len(hashes[path]), extracted[path]) for path in pdfPaths}
+
+
+# ============================================
+# MAIN
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract monthly POS sales report PDFs into csv_files/')
+    parser.add_argument('pdfs', nargs='+', help='Report PDFs named after their month (may.pdf, june.pdf, ...)')
+    parser.add_argument('--out', default='.', help='Data directory to write csv_files/ and extracted/ into')
+    parser.add_argument('--store-from-folder', action='store_true',
+                        help="Write each PDF into <out>/<its folder name>/ (multi-store packs)")
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--cache-dir', default=PAGE_CACHE_DIR, help='Per-page extraction cache')
+    args = parser.parse_args(argv)
+
+    try:
+        extracted = extract_reports(args.pdfs, args.out, args.workers, args.cache_dir, args.store_from_folder)
+    except ImportError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for path, (pages, fresh) in extracted.items():
+        print(f"{path}: {pages} page(s), {fresh} extracted, {pages - fresh} from cache")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
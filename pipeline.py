@@ -0,0 +1,375 @@
+"""
+Mai Shan Yun - Core Data Pipeline
+Plotting-free loading, usage and supply comparison shared by the dashboards and scripts
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+import profiling
+import recipes
+import salesArchive
+import shipmentCalendar
+
+# data directory the dashboards serve (one store per directory)
+DATA_DIR = os.environ.get('MSY_DATA_DIR', '.')
+# legacy csv_files/<month>.csv files carry no year; this one dates them for effective-dated recipes
+DATA_YEAR = int(os.environ.get('MSY_DATA_YEAR', '2025'))
+# archived months the pipeline loads, counting back from the latest (0 = all); older years stay on disk
+HISTORY_MONTHS = int(os.environ.get('MSY_HISTORY_MONTHS', '24'))
+# store partition of a shared archive this process serves (default: every partition)
+STORE = os.environ.get('MSY_STORE') or None
+
+LBS_TO_GRAMS = 453.59237
+
+# handle difference in shipment name vs ingredient name
+INGREDIENT_NAME_MAP = {
+    'Beef': 'braised beef used (g)',
+    'Chicken': 'Braised Chicken(g)',
+    'Ramen': 'Ramen (count)',
+    'Rice Noodles': 'Rice Noodles(g)',
+    'Flour': 'flour (g)',
+    'Tapioca Starch': 'Tapioca Starch',
+    'Rice': 'Rice(g)',
+    'Green Onion': 'Green Onion',
+    'White Onion': 'White onion',
+    'Cilantro': 'Cilantro',
+    'Egg': 'Egg(count)',
+    'Peas + Carrot': 'Peas(g)',
+    'Bokchoy': 'Bokchoy(g)',
+    'Chicken Wings': 'Chicken Wings (pcs)'
+}
+
+STATUS_LEVELS = ['CRITICAL', 'LOW', 'GOOD', 'OVERSTOCKED']
+# cumulative revenue share the Pareto table stops at
+PARETO_SHARE = 80
+# per-item ingredient usage (sparse month x item x ingredient) and its reverse index
+CONTRIBUTION_COLS = ['month', 'Category', 'Ingredient', 'Usage']
+CONTRIBUTOR_COLS = ['Ingredient', 'month', 'Rank', 'Category', 'Usage', 'Share %']
+# month label of the reverse index rows that cover every month
+ALL_MONTHS = 'all'
+
+# ingredient purchase prices, in shipment units (see margins.py)
+PRICE_FILE = 'IngredientPrice.csv'
+# optional opening stock counts for the daily ledger (see inventoryLedger.py)
+OPENING_FILE = 'OpeningStock.csv'
+# optional shelf lives of perishable ingredients (see lotTracking.py)
+SHELF_LIFE_FILE = 'ShelfLife.csv'
+# optional dimension tables for the rollup cube (see rollupCube.py)
+MENU_CATEGORY_FILE = 'MenuCategory.csv'
+STORE_FILE = 'Store.csv'
+
+MONTH_ORDER = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december']
+
+
+# ============================================
+# INPUT FILES
+# ============================================
+def sales_files(dataDir='.'):
+    """Monthly sales files: legacy csv_files/*.csv plus the archive partitions for STORE, with
+    the dated ones together limited to the latest HISTORY_MONTHS months; sorted by path"""
+    paths = glob.glob(os.path.join(dataDir, 'csv_files', '*.csv'))
+    paths += [p.path for p in salesArchive.partitions(salesArchive.archive_dir(dataDir), store=STORE)]
+    starts = {path: period_start(month_from_path(path)) for path in paths}
+    if HISTORY_MONTHS:
+        window = set(sorted({start for start in starts.values() if pd.notna(start)})[-HISTORY_MONTHS:])
+        paths = [path for path in paths if pd.isna(starts[path]) or starts[path] in window]
+    periods = {}
+    for path in paths:
+        start = starts[path]
+        if pd.notna(start) and periods.setdefault(start, path) != path:
+            raise ValueError(f"{periods[start]} and {path} both hold {start:%B %Y} "
+                             f"(archive one of them, or set MSY_STORE for a multi-store archive)")
+    return sorted(paths)
+
+
+def month_label(year, month):
+    """Label of an archived month, e.g. 'may 2025'"""
+    return f"{MONTH_ORDER[month - 1]} {year}"
+
+
+def month_from_path(path):
+    """Month label of a sales file: 'may 2025' for archive partitions, the file name ('may') otherwise"""
+    partition = salesArchive.parse_partition(path)
+    if partition is not None:
+        return month_label(partition.year, partition.month)
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _split_label(month):
+    """('may', 2025) for 'may 2025', ('may', None) for a bare month name"""
+    name, _, year = str(month).lower().partition(' ')
+    return name, int(year) if year.isdigit() else None
+
+
+def month_sort_key(month):
+    """Calendar position of a month label; unknown names sort last alphabetically"""
+    start = period_start(month)
+    if pd.isna(start):
+        return (float('inf'), str(month).lower())
+    return (start.year * 12 + start.month - 1, '')
+
+
+def period_start(month, year=None):
+    """First day of a month label's period (bare names fall in year or DATA_YEAR), NaT for non-months"""
+    name, labelYear = _split_label(month)
+    if name not in MONTH_ORDER:
+        return pd.NaT
+    return pd.Timestamp(year=labelYear or year or DATA_YEAR, month=MONTH_ORDER.index(name) + 1, day=1)
+
+
+def file_fingerprint(path):
+    """Cheap change detector for one input file"""
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def recipe_files(dataDir='.'):
+    """Recipe inputs: the menu table plus the optional sub-recipe and version tables"""
+    return [os.path.join(dataDir, name) for name in ('Ingredient.csv', recipes.SUB_RECIPE_FILE, recipes.VERSIONS_FILE)]
+
+
+def recipe_fingerprint(dataDir='.'):
+    """Change detector for the recipe inputs"""
+    return tuple(file_fingerprint(path) for path in recipe_files(dataDir) if os.path.exists(path))
+
+
+def data_version(dataDir='.'):
+    """Short hash identifying the current state of every input file"""
+    paths = sales_files(dataDir) + recipe_files(dataDir) + [
+        os.path.join(dataDir, 'Shipment.csv'),
+        os.path.join(dataDir, PRICE_FILE),
+        os.path.join(dataDir, OPENING_FILE),
+        os.path.join(dataDir, SHELF_LIFE_FILE),
+        os.path.join(dataDir, shipmentCalendar.HOLIDAY_FILE),
+        os.path.join(dataDir, MENU_CATEGORY_FILE),
+        os.path.join(dataDir, STORE_FILE),
+    ]
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            digest.update(repr(file_fingerprint(path)).encode())
+    return digest.hexdigest()[:16]
+
+
+# ============================================
+# LOADING
+# ============================================
+def load_month_checked(path):
+    """(typed month frame, data-quality issues) for one monthly sales file, in one parse"""
+    df, issues = ingestion.validate_month(ingestion.read_month_raw(path), os.path.basename(path))
+    df['month'] = month_from_path(path)
+    return df, issues
+
+
+def load_month(path):
+    """Load one monthly sales file with only the columns the pipeline uses"""
+    return load_month_checked(path)[0]
+
+
+@profiling.stage('load_sales')
+def load_sales(dataDir='.'):
+    """Load and combine every monthly sales file"""
+    dfs = [load_month(path) for path in sales_files(dataDir)]
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _rename_recipe_columns(ingredients_df):
+    # column name typo for bokchoy
+    if 'Boychoy(g)' in ingredients_df.columns:
+        ingredients_df.rename(columns={'Boychoy(g)': 'Bokchoy(g)'}, inplace=True)
+    ingredients_df.rename(columns={'Item name': 'Category'}, inplace=True)
+    return ingredients_df
+
+
+def load_ingredients_checked(dataDir='.'):
+    """(flattened recipe table with float quantities, data-quality issues)"""
+    recipe_df, issues = recipes.load_recipes_checked(dataDir)
+    return _rename_recipe_columns(recipe_df), issues
+
+
+def load_ingredients(dataDir='.'):
+    """Load the (flattened) recipe table keyed by Category"""
+    return load_ingredients_checked(dataDir)[0]
+
+
+@profiling.stage('load_recipe_book')
+def load_recipe_book(dataDir='.'):
+    """Base recipes plus any effective-dated versions from RecipeVersions.csv, typed once"""
+    base_df, issues = load_ingredients_checked(dataDir)
+    versionsPath = os.path.join(dataDir, recipes.VERSIONS_FILE)
+    if not os.path.exists(versionsPath):
+        return recipes.RecipeBook(base_df, key='Category', issues=issues)
+
+    # typed (and its bad cells reported) before any sub-recipe expansion
+    versions_df, versionIssues = recipes.read_typed(versionsPath, [recipes.RECIPE_KEY] + recipes.VERSION_DATE_COLS)
+    subPath = os.path.join(dataDir, recipes.SUB_RECIPE_FILE)
+    if os.path.exists(subPath):
+        dates = versions_df.reindex(columns=recipes.VERSION_DATE_COLS)
+        quantities = versions_df.drop(columns=recipes.VERSION_DATE_COLS, errors='ignore')
+        # SubRecipe.csv issues are already reported with the base table
+        versions_df = recipes.flatten_recipes(quantities, recipes.read_typed(subPath)[0]).join(dates)
+    return recipes.RecipeBook(base_df, _rename_recipe_columns(versions_df), key='Category',
+                              issues=ingestion.concat_issues([issues, versionIssues]))
+
+
+def delivery_quantity(shipments_df):
+    """Quantity per delivery in recipe units (lbs converted to grams)"""
+    lbs_mask = shipments_df['Unit of shipment'].str.lower().str.strip() == 'lbs'
+    quantity = pd.to_numeric(shipments_df['Quantity per shipment'], errors='coerce').fillna(0)
+    return quantity.astype(float) * np.where(lbs_mask, LBS_TO_GRAMS, 1)
+
+
+def recipe_unit(shipments_df):
+    """Unit of delivery_quantity and usage per shipment ingredient (g for lbs shipments, native otherwise)"""
+    lbs_mask = shipments_df['Unit of shipment'].str.lower().str.strip() == 'lbs'
+    return np.where(lbs_mask, 'g', shipments_df['Unit of shipment'])
+
+
+def shipment_calendar(shipments_df, holidays=None):
+    """Shared delivery calendar for a shipment schedule, phased on DATA_YEAR"""
+    return shipmentCalendar.calendar_for(shipments_df, DATA_YEAR, delivery_quantity(shipments_df), holidays)
+
+
+@profiling.stage('load_shipments')
+def load_shipments(dataDir='.'):
+    """Load shipments and derive monthly supply in grams (or native units)"""
+    shipments_df = pd.read_csv(os.path.join(dataDir, 'Shipment.csv'))
+
+    # average month of DATA_YEAR on the delivery calendar (weekdays, holidays, 4.33 weeks)
+    calendar = shipment_calendar(shipments_df, shipmentCalendar.load_holidays(dataDir))
+    shipments_df['Shipments per Month'] = calendar.shipments_per_month()
+    shipments_df['Monthly Quantity (g)'] = delivery_quantity(shipments_df) * shipments_df['Shipments per Month']
+
+    return shipments_df
+
+
+# ============================================
+# USAGE & COMPARISON
+# ============================================
+def ingredient_columns(ingredients_df):
+    """Ingredient columns of the recipe table"""
+    return [col for col in ingredients_df.columns if col != 'Category']
+
+
+def recipe_matrix(ingredients_df):
+    """Item x ingredient quantities, blanks as 0 (columns are already float from ingestion)"""
+    ingredientCols = ingredient_columns(ingredients_df)
+    return ingredients_df.set_index('Category')[ingredientCols].fillna(0)
+
+
+def calculate_month_usage(month_df, ingredients_df):
+    """Total ingredient usage for the rows of a single sales frame"""
+    recipe = recipe_matrix(ingredients_df)
+    return month_usage(month_df, recipe[~recipe.index.duplicated(keep='last')])
+
+
+def month_usage(month_df, recipe):
+    """Total ingredient usage of a sales frame through an item x ingredient matrix (RecipeBook.matrix_for)"""
+    counts = month_df.groupby('Category')['Count'].sum()
+    counts = counts[counts.index.isin(recipe.index)]
+    return recipe.loc[counts.index].T.dot(counts).reindex(recipe.columns).fillna(0)
+
+
+@profiling.stage('monthly_counts')
+def monthly_counts(sales_df, months):
+    """Dense month x item units sold, months in the given order"""
+    counts = sales_df.pivot_table(index='month', columns='Category', values='Count', aggfunc='sum')
+    return counts.reindex(months).fillna(0).astype(float)
+
+
+def month_contributions(month_df, recipe):
+    """Per-item ingredient usage for one month as sparse (month, Category, Ingredient, Usage) rows
+
+    recipe is the item x ingredient matrix of the month's recipe version (RecipeBook.matrix_for).
+    The month x item x ingredient contribution tensor is stored in coordinate form: only the
+    item / ingredient pairs with non-zero usage get a row.
+    """
+    counts = month_df.groupby('Category')['Count'].sum()
+    counts = counts[counts.index.isin(recipe.index)]
+    quantities = recipe.loc[counts.index].to_numpy(dtype=float) * counts.to_numpy(dtype=float)[:, None]
+    itemPos, ingredientPos = np.nonzero(quantities)
+    return pd.DataFrame({
+        'month': month_df['month'].iat[0] if len(month_df) else None,
+        'Category': counts.index.to_numpy()[itemPos],
+        'Ingredient': recipe.columns.to_numpy()[ingredientPos],
+        'Usage': quantities[itemPos, ingredientPos]
+    }, columns=CONTRIBUTION_COLS)
+
+
+@profiling.stage('contribution_index')
+def contribution_index(contribution_df):
+    """Reverse index ingredient -> contributing items, per month and over all months ('all')
+
+    Rows are sorted by Ingredient, then month, then Usage descending, so every ingredient's
+    contributors are one contiguous, already-ranked block (see ingredient_contributors).
+    """
+    overall = contribution_df.groupby(['Ingredient', 'Category'], as_index=False)['Usage'].sum().assign(month=ALL_MONTHS)
+    index_df = pd.concat([contribution_df, overall], ignore_index=True)
+    total = index_df.groupby(['Ingredient', 'month'])['Usage'].transform('sum')
+    index_df['Share %'] = np.where(total > 0, index_df['Usage'] / total * 100, 0)
+    index_df = index_df.sort_values(['Ingredient', 'month', 'Usage'], ascending=[True, True, False], ignore_index=True)
+    index_df['Rank'] = index_df.groupby(['Ingredient', 'month']).cumcount() + 1
+    return index_df[CONTRIBUTOR_COLS]
+
+
+def ingredient_contributors(index_df, ingredient, month=None):
+    """Ranked items driving one ingredient's usage in a month (default: all months)"""
+    ingredients = index_df['Ingredient'].to_numpy()
+    start, stop = np.searchsorted(ingredients, ingredient, 'left'), np.searchsorted(ingredients, ingredient, 'right')
+    block = index_df.iloc[start:stop]
+    return block[block['month'] == (month or ALL_MONTHS)].reset_index(drop=True)
+
+
+def stock_status(daysOfSupply):
+    """Status label(s) for days of supply, scalar or array"""
+    return np.select(
+        [np.asarray(daysOfSupply) < 5, np.asarray(daysOfSupply) < 10, np.asarray(daysOfSupply) < 45],
+        STATUS_LEVELS[:3],
+        default=STATUS_LEVELS[3]
+    )
+
+
+@profiling.stage('rank_items')
+def rank_items(item_totals):
+    """Items with revenue by revenue, with their revenue share and cumulative share"""
+    ranked = item_totals[item_totals['Amount'] > 0].sort_values('Amount', ascending=False).reset_index(drop=True)
+    ranked['Revenue %'] = ranked['Amount'] / ranked['Amount'].sum() * 100
+    ranked['Cumulative %'] = ranked['Revenue %'].cumsum()
+    return ranked
+
+
+def pareto_items(ranking_df, share=PARETO_SHARE):
+    """Top-ranked items that together make up share % of revenue"""
+    return ranking_df[ranking_df['Cumulative %'] <= share]
+
+
+@profiling.stage('calculate_shipment_comparison')
+def calculate_shipment_comparison(shipments_df, avg_usage):
+    """Calculate supply vs usage comparison"""
+
+    monthlySupply = shipments_df['Monthly Quantity (g)'].to_numpy(dtype=float)
+    usageCols = shipments_df['Ingredient'].map(INGREDIENT_NAME_MAP)
+    avgUsage = usageCols.map(avg_usage).fillna(0).to_numpy(dtype=float)
+
+    used = avgUsage > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        utilization = np.where(used & (monthlySupply > 0), avgUsage / monthlySupply * 100, 0)
+        daysOfSupply = np.where(used, monthlySupply / (avgUsage / 30), 999)
+
+    return pd.DataFrame({
+        'Ingredient': shipments_df['Ingredient'].to_numpy(),
+        'Monthly Supply': monthlySupply,
+        'Unit': shipments_df['Unit of shipment'].to_numpy(),
+        'Avg Monthly Usage': avgUsage,
+        'Difference': monthlySupply - avgUsage,
+        'Utilization %': utilization,
+        'Days of Supply': daysOfSupply,
+        'Status': stock_status(daysOfSupply)
+    })
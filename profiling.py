@@ -0,0 +1,279 @@
+"""
+Mai Shan Yun - Profiling Hooks
+Opt-in capture of one Streamlit rerun or one CLI run, written to disk with the data version it served
+
+Two modes:
+    sample    a background thread samples the profiled thread's stack every MSY_PROFILE_INTERVAL
+              seconds and writes collapsed stacks (<capture>.folded) for speedscope, flamegraph.pl
+              or inferno. Pipeline stages marked with stage() appear as [stage] frames, so the
+              flame graph reads [compute_snapshot] -> [load_months] -> pandas.
+    cprofile  deterministic cProfile of the thread, written as <capture>.prof (pstats / snakeviz).
+
+Each capture also writes <capture>.json: label, mode, data version(s), wall time and the time
+spent in every stage. Nothing is recorded unless a capture is active on the calling thread, so
+stage() costs one dictionary lookup otherwise. A capture whose thread ends before finish() (a
+Streamlit rerun cut short by st.stop or an exception) is finished and written by its watcher.
+
+In the dashboards a rerun only reads the latest snapshot; new data versions are built on the
+refresher thread (or mapped from the shared cache). With MSY_PROFILE set, each of those builds
+gets its own 'build' capture, and a rerun's JSON names the build capture of the version it served.
+
+Enable with MSY_PROFILE=sample|cprofile (every run / rerun and snapshot build), or per rerun with
+?profile=sample on the dashboard URL. Captures go to .cache/profiles/ (MSY_PROFILE_DIR).
+
+Usage:
+    MSY_PROFILE=sample python warmCache.py
+    python profiling.py                       # list captures, newest first
+    python profiling.py --show 20261018-101500-dash2-4f1c2a --top 15
+"""
+
+import argparse
+import collections
+import contextlib
+import cProfile
+import glob
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+
+MODES = ('sample', 'cprofile')
+MODE = os.environ.get('MSY_PROFILE', '').lower()
+PROFILE_DIR = os.environ.get('MSY_PROFILE_DIR', os.path.join('.cache', 'profiles'))
+SAMPLE_INTERVAL = float(os.environ.get('MSY_PROFILE_INTERVAL', '0.005'))
+# how often a cprofile capture checks that its thread is still running
+WATCH_INTERVAL = 0.1
+
+# thread id -> the capture recording on that thread
+_active = {}
+# data version -> name of the capture that built its snapshot
+_builds = {}
+
+
+# ============================================
+# STAGES
+# ============================================
+@contextlib.contextmanager
+def stage(name):
+    """Label a pipeline stage in the active capture; usable as a decorator"""
+    capture = _active.get(threading.get_ident())
+    if capture is None:
+        yield
+        return
+    # frames below the with-statement / decorated call, to place the label in sampled stacks
+    caller = sys._getframe(2)
+    depth = 0
+    while caller is not None:
+        depth += 1
+        caller = caller.f_back
+    capture.stack.append((name, depth))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        capture.stack.pop()
+        capture.stages[' > '.join([label for label, _ in capture.stack] + [name])] += time.perf_counter() - start
+
+
+def note_version(version):
+    """Record the data version the active capture (if any) is serving"""
+    capture = _active.get(threading.get_ident())
+    if capture is not None and version not in capture.versions:
+        capture.versions.append(version)
+
+
+# ============================================
+# CAPTURE
+# ============================================
+def _frame_name(code):
+    # co_qualname is 3.11+; older interpreters only have the bare function name
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}.{name}"
+
+
+class Capture:
+    """One profiled run of a thread; start() / finish() bracket the run"""
+
+    def __init__(self, label, mode, outDir=PROFILE_DIR, interval=SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.label = label
+        self.mode = mode
+        self.outDir = outDir
+        self.interval = interval
+        self.thread = threading.get_ident()
+        self.versions = []
+        self.stack = []
+        self.stages = collections.defaultdict(float)
+        self.samples = collections.Counter()
+        self.path = None
+        self._runThread = threading.current_thread()
+        self._done = threading.Event()
+        self._finishing = threading.Lock()
+        self._watcher = None
+        self._profile = None
+        self._started = None
+
+    def start(self):
+        # an earlier capture on this thread that was never finished is written now
+        stale = _active.pop(self.thread, None)
+        if stale is not None:
+            stale.finish()
+        _active[self.thread] = self
+        self._started = time.time()
+        self._clock = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._watcher = threading.Thread(target=self._watch, name='profile-watcher', daemon=True)
+        self._watcher.start()
+        return self
+
+    def _watch(self):
+        """Sample (in sample mode) until finish(); finish the capture if its thread ends first"""
+        interval = self.interval if self.mode == 'sample' else WATCH_INTERVAL
+        while not self._done.wait(interval):
+            if not self._runThread.is_alive():
+                self.finish()
+                return
+            if self.mode == 'sample':
+                self._sample()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread)
+        if frame is None:
+            return
+        frames = []
+        while frame is not None:
+            frames.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        frames.reverse()
+        # stage labels go right below the frame that opened them, deepest first so indexes hold
+        for name, depth in sorted(list(self.stack), key=lambda entry: -entry[1]):
+            frames.insert(min(depth, len(frames)), f'[{name}]')
+        self.samples[';'.join(frames)] += 1
+
+    def _halt(self):
+        self._done.set()
+        if self._profile is not None:
+            self._profile.disable()
+        if self._watcher is not None and self._watcher is not threading.current_thread():
+            self._watcher.join()
+
+    def finish(self):
+        """Stop recording and write the capture once; returns its path without extension"""
+        with self._finishing:
+            if self.path is not None:
+                return self.path
+            seconds = time.perf_counter() - self._clock
+            self._halt()
+            if _active.get(self.thread) is self:
+                del _active[self.thread]
+
+            os.makedirs(self.outDir, exist_ok=True)
+            version = self.versions[-1][:6] if self.versions else 'noversion'
+            name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))}-{re.sub(r'[^A-Za-z0-9_]+', '_', self.label)}-{version}"
+            path = os.path.join(self.outDir, name)
+            if self._profile is not None:
+                self._profile.dump_stats(path + '.prof')
+            else:
+                with open(path + '.folded', 'w') as f:
+                    for stack, count in self.samples.most_common():
+                        f.write(f"{stack} {count}\n")
+            with open(path + '.json', 'w') as f:
+                json.dump({'label': self.label, 'mode': self.mode, 'versions': self.versions,
+                           'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._started)),
+                           'seconds': round(seconds, 4), 'samples': sum(self.samples.values()),
+                           'stages': {key: round(value, 4) for key, value in self.stages.items()},
+                           'builds': {v: _builds[v] for v in self.versions if v in _builds}}, f, indent=1)
+            self.path = path
+        return path
+
+
+def start(label, mode=None, outDir=PROFILE_DIR):
+    """Begin a capture on this thread when mode (default MSY_PROFILE) is set, else return None"""
+    mode = (mode or MODE).lower()
+    if not mode:
+        return None
+    return Capture(label, mode, outDir).start()
+
+
+@contextlib.contextmanager
+def capture(label, mode=None, outDir=PROFILE_DIR):
+    """Profile the with-block when mode (default MSY_PROFILE) is set; reports where the capture went"""
+    current = start(label, mode, outDir)
+    try:
+        yield current
+    finally:
+        if current is not None:
+            print(f"Profile written to {current.finish()}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def build_capture(version):
+    """Profile one snapshot build under MSY_PROFILE, unless a capture on this thread already records it
+
+    Reruns and CLI runs that build inline keep the stages in their own capture; builds on a
+    background thread get a 'build' capture that later captures serving version point to.
+    """
+    if not MODE or threading.get_ident() in _active:
+        yield
+        return
+    with capture('build') as current:
+        note_version(version)
+        yield
+    _builds[version] = os.path.basename(current.path)
+
+
+# ============================================
+# MAIN
+# ============================================
+def load_meta(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List profiling captures or summarize one')
+    parser.add_argument('--dir', default=PROFILE_DIR, help='Capture directory (MSY_PROFILE_DIR)')
+    parser.add_argument('--show', help='Capture name (or path without extension) to summarize')
+    parser.add_argument('--top', type=int, default=10, help='Hottest functions / stacks to print')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.show is None:
+            for path in sorted(glob.glob(os.path.join(args.dir, '*.json')), reverse=True):
+                meta = load_meta(path)
+                print(f"{os.path.splitext(os.path.basename(path))[0]:<48} {meta['mode']:<9} "
+                      f"{meta['seconds']:>8.3f}s  {','.join(meta['versions']) or '-'}")
+            return 0
+
+        path = args.show if os.path.dirname(args.show) else os.path.join(args.dir, args.show)
+        meta = load_meta(path + '.json')
+        print(f"{meta['label']} ({meta['mode']}) {meta['started']}: {meta['seconds']:.3f}s, "
+              f"data version {', '.join(meta['versions']) or 'unknown'}")
+        for name, seconds in sorted(meta['stages'].items(), key=lambda item: -item[1]):
+            print(f"  {seconds:8.3f}s  {name}")
+        if meta['mode'] == 'cprofile':
+            pstats.Stats(path + '.prof').sort_stats('cumulative').print_stats(args.top)
+        else:
+            # self time per function: the leaf of every sampled stack
+            leaves = collections.Counter()
+            with open(path + '.folded') as f:
+                for line in f:
+                    stack, count = line.rsplit(' ', 1)
+                    leaves[stack.rsplit(';', 1)[-1]] += int(count)
+            total = sum(leaves.values()) or 1
+            for leaf, count in leaves.most_common(args.top):
+                print(f"  {100 * count / total:6.1f}%  {leaf}")
+    except (OSError, ValueError, KeyError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Mai Shan Yun - Recipe BOM Explosion
+Flattens nested recipes (menu items built from prepped components such as braised beef, dough
+or sauces) into the flat item -> raw ingredient table the usage calculation runs on
+
+SubRecipe.csv uses the same layout as Ingredient.csv: one row per prepped component, one column
+per ingredient, quantities per 1 unit of the component. Any column in either file whose name is a
+component's "Item name" is a reference to that component and gets expanded into raw ingredients.
+"""
+
+import functools
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+
+RECIPE_KEY = 'Item name'
+SUB_RECIPE_FILE = 'SubRecipe.csv'
+
+
+class RecipeCycleError(ValueError):
+    """A component (directly or indirectly) contains itself"""
+
+
+def recipe_version(*paths):
+    """Content hash of the recipe files that exist"""
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def read_typed(path, keyCols=(RECIPE_KEY,)):
+    """(recipe file with float quantities, issues for cells that are not numbers)"""
+    return ingestion.type_table(pd.read_csv(path), list(keyCols), os.path.basename(path))
+
+
+def _quantities(df):
+    # typed by ingestion.type_table; blank cells (NaN) are ingredients the recipe does not use
+    return df.set_index(RECIPE_KEY).astype(float).fillna(0)
+
+
+def flatten_recipes(menu_df, sub_df):
+    """Return menu_df with every component column replaced by the raw ingredients it contains
+
+    Both tables must already be typed (read_typed / ingestion.type_table), so malformed quantities
+    are reported there instead of being expanded as 0.
+    """
+    menu = _quantities(menu_df)
+    sub = _quantities(sub_df)
+    components = list(sub.index)
+    rawCols = [col for col in menu.columns if col not in sub.index]
+    rawCols += [col for col in sub.columns if col not in sub.index and col not in rawCols]
+
+    # resolve each component to a raw-ingredient vector once, depth first
+    resolved = {}
+
+    def resolve(name, path):
+        if name in resolved:
+            return resolved[name]
+        if name in path:
+            raise RecipeCycleError('Recipe cycle: ' + ' -> '.join(path + [name]))
+        row = sub.loc[name]
+        total = row.reindex(rawCols, fill_value=0).to_numpy(dtype=float)
+        for child in components:
+            quantity = row.get(child, 0)
+            if quantity:
+                total = total + quantity * resolve(child, path + [name])
+        resolved[name] = total
+        return total
+
+    for name in components:
+        resolve(name, [])
+
+    # one matrix product expands every menu item at once
+    componentMatrix = np.vstack([resolved[name] for name in components]) if components else np.zeros((0, len(rawCols)))
+    menuComponents = menu.reindex(columns=components, fill_value=0).to_numpy(dtype=float)
+    flat = menu.reindex(columns=rawCols, fill_value=0).to_numpy(dtype=float) + menuComponents @ componentMatrix
+
+    return pd.DataFrame(flat, index=menu.index, columns=rawCols).reset_index()
+
+
+@functools.lru_cache(maxsize=8)
+def _flattened(version, menuPath, subPath):
+    menu_df, menuIssues = read_typed(menuPath)
+    sub_df, subIssues = read_typed(subPath)
+    return flatten_recipes(menu_df, sub_df), ingestion.concat_issues([menuIssues, subIssues])
+
+
+def load_recipes_checked(dataDir='.'):
+    """(flat recipe table with float quantities, data-quality issues of the recipe files)
+
+    Exploded once per recipe version when sub-recipes exist.
+    """
+    menuPath = os.path.join(dataDir, 'Ingredient.csv')
+    subPath = os.path.join(dataDir, SUB_RECIPE_FILE)
+    if not os.path.exists(subPath):
+        return read_typed(menuPath)
+    table, issues = _flattened(recipe_version(menuPath, subPath), menuPath, subPath)
+    # callers rename columns in place, so hand out a copy of the memoized table
+    return table.copy(), issues
+
+
+def load_recipes(dataDir='.'):
+    """Flat recipe table for dataDir"""
+    return load_recipes_checked(dataDir)[0]
+
+
+# ============================================
+# EFFECTIVE-DATED VERSIONS
+# ============================================
+VERSIONS_FILE = 'RecipeVersions.csv'
+VERSION_DATE_COLS = ['effective_from', 'effective_to']
+
+
+def check_versions(versions_df, key=RECIPE_KEY):
+    """(version rows with a usable interval, issues for the others)
+
+    A row needs a parseable effective_from, and an effective_to that is blank or not before it.
+    """
+    start = pd.to_datetime(versions_df['effective_from'], errors='coerce')
+    endText = versions_df.get('effective_to', pd.Series(None, index=versions_df.index, dtype=object))
+    end = pd.to_datetime(endText, errors='coerce')
+    found = []
+    checks = [
+        ('effective_from', start.isna(), versions_df['effective_from'], 'missing or unparseable start date'),
+        ('effective_to', end.isna() & endText.notna(), endText, 'unparseable end date'),
+        ('effective_to', end < start, endText, 'ends before it starts'),
+    ]
+    bad = pd.Series(False, index=versions_df.index)
+    for col, mask, values, issue in checks:
+        mask = mask & ~bad
+        if mask.any():
+            found.append(pd.DataFrame({'File': VERSIONS_FILE, 'Item': versions_df[key][mask], 'Column': col,
+                                       'Value': values[mask].fillna('').astype(str), 'Issue': issue},
+                                      columns=ingestion.ISSUE_COLS))
+        bad |= mask
+    return versions_df[~bad], ingestion.concat_issues(found)
+
+
+class RecipeBook:
+    """Base recipe table plus effective-dated overrides looked up through an interval index
+
+    RecipeVersions.csv has the Ingredient.csv columns plus effective_from and an optional
+    effective_to (exclusive, blank = still in effect). Each row replaces that item's base recipe
+    while its interval covers the sales period; the latest effective_from wins on overlap. Rows
+    without a usable interval are reported in issues and skipped.
+    """
+
+    def __init__(self, base_df, versions_df=None, key=RECIPE_KEY, issues=None):
+        self.base = base_df
+        self.key = key
+        # data-quality issues found while the tables were typed (see ingestion.py)
+        self.issues = issues
+        self.versions = None
+        if versions_df is not None and not versions_df.empty:
+            versions_df, dateIssues = check_versions(versions_df, key)
+            if not dateIssues.empty:
+                self.issues = dateIssues if issues is None else ingestion.concat_issues([issues, dateIssues])
+            if not versions_df.empty:
+                start = pd.to_datetime(versions_df['effective_from'])
+                end = pd.to_datetime(versions_df.get('effective_to', pd.Series(pd.NaT, index=versions_df.index)))
+                self.intervals = pd.IntervalIndex.from_arrays(start, end.fillna(pd.Timestamp.max), closed='left')
+                self.versions = versions_df.drop(columns=VERSION_DATE_COLS, errors='ignore').reset_index(drop=True)
+        # active override ids -> recipe table / item x ingredient matrix, so each version is assembled once
+        self._tables = {}
+        self._matrices = {}
+
+    def active_versions(self, date):
+        """Ids of the override rows in effect on date"""
+        if self.versions is None or pd.isna(date):
+            return ()
+        mask = self.intervals.contains(date)
+        if not mask.any():
+            return ()
+        active = self.versions[mask].assign(_start=self.intervals.left[mask])
+        active = active.sort_values('_start', kind='stable').drop_duplicates(self.key, keep='last')
+        return tuple(sorted(active.index))
+
+    def _table(self, ids):
+        table = self._tables.get(ids)
+        if table is None:
+            table = self.base
+            if ids:
+                overrides = self.versions.loc[list(ids)]
+                table = pd.concat(
+                    [self.base[~self.base[self.key].isin(overrides[self.key])], overrides],
+                    ignore_index=True
+                )
+            self._tables[ids] = table
+        return table
+
+    def table_for(self, date):
+        """Recipe table in effect on date"""
+        return self._table(self.active_versions(date))
+
+    def matrix_for(self, date):
+        """Float item x ingredient quantities in effect on date (blanks 0, last row of an item wins)
+
+        Built once per recipe version and shared by every month on it; treat it as read-only.
+        """
+        ids = self.active_versions(date)
+        matrix = self._matrices.get(ids)
+        if matrix is None:
+            table = self._table(ids)
+            matrix = table.set_index(self.key).drop(columns=VERSION_DATE_COLS, errors='ignore').astype(float).fillna(0)
+            matrix = matrix[~matrix.index.duplicated(keep='last')]
+            self._matrices[ids] = matrix
+        return matrix
@@ -0,0 +1,299 @@
+"""
+Mai Shan Yun - Background Data Refresher
+Watches the data directory and swaps in a new immutable snapshot when input files change
+"""
+
+import collections
+import hashlib
+import os
+import sys
+import threading
+
+import pandas as pd
+
+import anomalyDetection
+import demandForecast
+import engines
+import ingestion
+import inventoryLedger
+import lotTracking
+import margins
+import pipeline
+import profiling
+import rollupCube
+import salesArchive
+import shipmentCalendar
+
+Snapshot = collections.namedtuple('Snapshot', [
+    'version', 'months', 'sales_df', 'ingredients_df', 'shipments_df',
+    'avg_usage', 'monthly_usage', 'comparison_df', 'margin_df', 'anomaly_df', 'cube_df',
+    'ranking_df', 'ledger_df', 'spoilage_df', 'quality_df', 'contribution_df', 'contributor_df',
+    'recipe_matrix', 'monthly_counts', 'forecast_df', 'demand_forecast', 'stockout_df'
+])
+# cached snapshots are keyed by data version and field layout, so new fields never read stale entries
+SNAPSHOT_LAYOUT = hashlib.sha1(' '.join(Snapshot._fields).encode()).hexdigest()[:6]
+
+
+def snapshot_settings():
+    """Hash of the environment settings that change a snapshot built from the same files"""
+    settings = (pipeline.DATA_YEAR, pipeline.HISTORY_MONTHS, pipeline.STORE, demandForecast.FORECAST_HORIZON)
+    return hashlib.sha1(repr(settings).encode()).hexdigest()[:6]
+
+
+def cache_key(version):
+    """Shared-cache key of a data version's snapshot under this process's settings"""
+    return f'{version}-{SNAPSHOT_LAYOUT}-{snapshot_settings()}'
+
+
+# ============================================
+# INCREMENTAL SNAPSHOT BUILDER
+# ============================================
+class SnapshotBuilder:
+    """Rebuilds only the aggregates whose input files changed since the last build"""
+
+    def __init__(self, dataDir=None, cache=None, engine=None):
+        self.dataDir = dataDir or pipeline.DATA_DIR
+        self.cache = cache
+        # ingest -> usage backend for new or changed month files (MSY_ENGINE)
+        self.engine = engine or engines.get_engine()
+        self.version = None
+        self._ingredients = (None, None)
+        self._shipments = (None, None)
+        self._prices = (None, None)
+        # path -> (fingerprint, month frame, month usage)
+        self._months = {}
+        # path -> data-quality issues found when the month file was ingested
+        self._monthIssues = {}
+        # (month, fingerprint) pairs already folded into the online anomaly detectors
+        self._scored = ()
+        self._detectors = None
+        self._anomalies = anomalyDetection.empty_anomalies()
+        # rollup cube plus the dimension files and month fingerprints it was built from
+        self._cube = rollupCube.RollupCube()
+        self._cubeDims = None
+        self._cubeMonths = {}
+        # month -> (fingerprint, per-item ingredient usage) for the contribution index
+        self._contributions = {}
+
+    def _load_ingredients(self):
+        key = pipeline.recipe_fingerprint(self.dataDir)
+        if key == self._ingredients[0]:
+            return key, self._ingredients[1]
+        return key, pipeline.load_recipe_book(self.dataDir)
+
+    def _load_shipments(self):
+        holidayPath = os.path.join(self.dataDir, shipmentCalendar.HOLIDAY_FILE)
+        key = (pipeline.file_fingerprint(os.path.join(self.dataDir, 'Shipment.csv')),
+               pipeline.file_fingerprint(holidayPath) if os.path.exists(holidayPath) else None)
+        if key != self._shipments[0]:
+            self._shipments = (key, pipeline.load_shipments(self.dataDir))
+        return self._shipments[1]
+
+    def _load_prices(self):
+        path = os.path.join(self.dataDir, pipeline.PRICE_FILE)
+        key = pipeline.file_fingerprint(path) if os.path.exists(path) else None
+        if key != self._prices[0]:
+            self._prices = (key, margins.load_prices(self.dataDir))
+        return self._prices[1]
+
+    @profiling.stage('load_months')
+    def _load_months(self, book, recipesChanged):
+        months = {}
+        issues = {}
+        changed = []
+        for path in pipeline.sales_files(self.dataDir):
+            key = pipeline.file_fingerprint(path)
+            cached = self._months.get(path)
+            if cached is None or cached[0] != key:
+                changed.append((path, key))
+                continue
+            month_df, usage = cached[1], cached[2]
+            if recipesChanged:
+                # each month joins to the recipe version in effect for its period
+                usage = pipeline.month_usage(month_df, book.matrix_for(pipeline.period_start(pipeline.month_from_path(path))))
+            months[path] = (key, month_df, usage)
+            issues[path] = self._monthIssues[path]
+        # every new or changed file goes to the engine as one batch
+        loaded = self.engine.load_months([path for path, _ in changed], book)
+        for path, key in changed:
+            month_df, usage, issues[path] = loaded[path]
+            months[path] = (key, month_df, usage)
+        if not months:
+            raise ValueError(f"No monthly sales files found in {os.path.join(self.dataDir, 'csv_files')} "
+                             f"or {salesArchive.archive_dir(self.dataDir)}")
+        self._months = months
+        self._monthIssues = issues
+        return sorted(months.values(), key=lambda entry: pipeline.month_sort_key(entry[1]['month'].iat[0]))
+
+    def build(self, force=False):
+        """Return a new Snapshot, or None if the inputs are unchanged"""
+        version = pipeline.data_version(self.dataDir)
+        profiling.note_version(version)
+        if version == self.version and not force:
+            return None
+
+        with profiling.build_capture(version):
+            if self.cache is None:
+                snapshot = self._compute(version)
+            else:
+                # at most one process per host computes a version, the others map its output
+                values = self.cache.get_or_build(cache_key(version), Snapshot._fields,
+                                                 lambda: self._compute(version)._asdict())
+                values['months'] = tuple(values['months'])
+                snapshot = Snapshot(**values)
+
+        self.version = version
+        return snapshot
+
+    @profiling.stage('detect_anomalies')
+    def _detect(self, entries, recipesChanged):
+        """Score only the months the detectors have not seen; replay when earlier history changed"""
+        scored = tuple((month_df['month'].iat[0], key) for key, month_df, _ in entries)
+        done = len(self._scored)
+        if recipesChanged or self._detectors is None or scored[:done] != self._scored:
+            self._detectors = (anomalyDetection.EwmaDetector('item'), anomalyDetection.EwmaDetector('ingredient'))
+            self._anomalies = anomalyDetection.empty_anomalies()
+            done = 0
+        items, ingredients = self._detectors
+        found = [self._anomalies]
+        for _, month_df, usage in entries[done:]:
+            month = month_df['month'].iat[0]
+            found.append(items.update(month, anomalyDetection.item_counts(month_df)))
+            found.append(ingredients.update(month, usage))
+        self._scored = scored
+        self._anomalies = pd.concat([df for df in found if not df.empty], ignore_index=True) \
+            if any(not df.empty for df in found) else anomalyDetection.empty_anomalies()
+        return self._anomalies
+
+    @profiling.stage('update_cube')
+    def _update_cube(self, entries, book, recipesChanged):
+        """Upsert only the month partitions that changed; rebuild when recipes or dimension files change"""
+        dimPaths = [os.path.join(self.dataDir, name) for name in (pipeline.MENU_CATEGORY_FILE, pipeline.STORE_FILE)]
+        dims = tuple(pipeline.file_fingerprint(path) if os.path.exists(path) else None for path in dimPaths)
+        if recipesChanged or dims != self._cubeDims:
+            self._cube = rollupCube.RollupCube()
+            self._cubeDims = dims
+            self._cubeMonths = {}
+        store, region = rollupCube.load_location(self.dataDir)
+        categories = None
+        months = {}
+        for key, month_df, _ in entries:
+            month = month_df['month'].iat[0]
+            months[month] = key
+            if self._cubeMonths.get(month) == key:
+                continue
+            if categories is None:
+                categories = rollupCube.load_menu_categories(self.dataDir)
+            recipe = book.matrix_for(pipeline.period_start(month))
+            self._cube.upsert((store, month), rollupCube.partition_facts(month_df, recipe, categories, store, region, month))
+        for month in set(self._cubeMonths) - set(months):
+            self._cube.remove((store, month))
+        self._cubeMonths = months
+        return self._cube.to_frame()
+
+    @profiling.stage('update_contributions')
+    def _update_contributions(self, entries, book, recipesChanged):
+        """Per-item usage of changed months only, plus the ingredient -> item reverse index over all months"""
+        if recipesChanged:
+            self._contributions = {}
+        contributions = {}
+        for key, month_df, _ in entries:
+            month = month_df['month'].iat[0]
+            cached = self._contributions.get(month)
+            if cached is None or cached[0] != key:
+                cached = (key, pipeline.month_contributions(month_df, book.matrix_for(pipeline.period_start(month))))
+            contributions[month] = cached
+        self._contributions = contributions
+        contribution_df = pd.concat([frame for _, frame in contributions.values()], ignore_index=True)
+        return contribution_df, pipeline.contribution_index(contribution_df)
+
+    @profiling.stage('compute_snapshot')
+    def _compute(self, version):
+        ingredientsKey, book = self._load_ingredients()
+        recipesChanged = ingredientsKey != self._ingredients[0]
+        shipments_df = self._load_shipments()
+        entries = self._load_months(book, recipesChanged)
+        # only commit the recipes once every month has been recomputed against them
+        self._ingredients = (ingredientsKey, book)
+        ingredients_df = book.base
+        monthIssues = sorted(self._monthIssues.items(), key=lambda item: pipeline.month_sort_key(pipeline.month_from_path(item[0])))
+        quality_df = ingestion.concat_issues([book.issues] + [issues for _, issues in monthIssues])
+
+        months = tuple(month_df['month'].iat[0] for _, month_df, _ in entries)
+        sales_df = pd.concat([month_df for _, month_df, _ in entries], ignore_index=True)
+        monthly_usage = pd.DataFrame([usage for _, _, usage in entries], index=pd.Index(months, name='month')).fillna(0)
+        # dense month x item counts and item x ingredient quantities, mapped read-only by every session
+        monthly_counts = pipeline.monthly_counts(sales_df, months)
+        recipe_matrix = pipeline.recipe_matrix(ingredients_df).astype(float)
+        # every item forecast in one solve, then through the recipes in effect for each forecast month
+        forecast_df, demand_forecast = demandForecast.build_forecast(monthly_counts, book)
+        avg_usage = monthly_usage.mean(axis=0)
+        anomaly_df = self._detect(entries, recipesChanged)
+        cube_df = self._update_cube(entries, book, recipesChanged)
+        contribution_df, contributor_df = self._update_contributions(entries, book, recipesChanged)
+        comparison_df = pipeline.calculate_shipment_comparison(shipments_df, avg_usage)
+
+        ranking_df = pipeline.rank_items(
+            self._cube.rollup('item', 'all', 'all').rename(columns={'Menu': 'Item Name'})[['Item Name', 'Count', 'Amount']]
+        )
+
+        prices_df = self._load_prices()
+        margin_df = None if prices_df is None else margins.calculate_margins(sales_df, book, prices_df, months)
+
+        # daily ledger and FIFO spoilage, so no session pays for them on first view
+        opening = inventoryLedger.load_opening(self.dataDir)
+        holidays = shipmentCalendar.load_holidays(self.dataDir)
+        # the ledger runs on through the demand forecast, so stockouts are projected, not only past
+        ledger_df, receipts_df, usage_df = inventoryLedger.build_ledger(shipments_df, monthly_usage, opening, holidays,
+                                                                        demand_forecast)
+        historyEnd = inventoryLedger.history_end(monthly_usage)
+        stockout_df = inventoryLedger.stockout_report(ledger_df, receipts_df, historyEnd)
+        unit_cost = None if prices_df is None else margins.ingredient_unit_cost(prices_df, months[-1])
+        # FIFO lots start from the same opening stock as the ledger (estimated where nothing was counted)
+        spoilage_df = lotTracking.spoilage_report(receipts_df.loc[:historyEnd], usage_df.loc[:historyEnd],
+                                                  lotTracking.load_shelf_life(self.dataDir), unit_cost,
+                                                  inventoryLedger.opening_stock(receipts_df, usage_df, opening))
+
+        return Snapshot(version, months, sales_df, ingredients_df, shipments_df,
+                        avg_usage, monthly_usage, comparison_df, margin_df, anomaly_df, cube_df,
+                        ranking_df, ledger_df, spoilage_df, quality_df, contribution_df, contributor_df,
+                        recipe_matrix, monthly_counts, forecast_df, demand_forecast, stockout_df)
+
+
+# ============================================
+# BACKGROUND REFRESHER
+# ============================================
+class DataRefresher:
+    """Serves the latest snapshot while a daemon thread rebuilds it off the request path"""
+
+    def __init__(self, dataDir=None, interval=5.0, cache=None):
+        self.interval = interval
+        self.builder = SnapshotBuilder(dataDir, cache)
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+
+    def start(self):
+        """Build the first snapshot synchronously, then keep refreshing in the background"""
+        self._snapshot = self.builder.build()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def current(self):
+        """Latest complete snapshot; never waits on a rebuild in progress"""
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                snapshot = self.builder.build()
+            except Exception as e:
+                # keep serving the previous snapshot until the inputs are fixed
+                print(f"Data refresh failed: {e}", file=sys.stderr)
+                continue
+            if snapshot is not None:
+                # a single reference assignment is atomic, readers see old or new, never partial
+                self._snapshot = snapshot
@@ -0,0 +1,249 @@
+"""
+Mai Shan Yun - Rollup Cube
+Materialized revenue, count and ingredient usage at every level of the menu, location and time
+hierarchies, so drill-down and roll-up are lookups instead of fresh groupbys
+
+    menu:      item -> menu category -> all      (MenuCategory.csv: Item name, Menu Category)
+    location:  store -> region -> all            (Store.csv: Store, Region; default: folder name)
+    time:      month -> quarter -> year -> all
+
+Facts arrive in (store, month) partitions. Every cuboid is a sum, so replacing a partition
+subtracts its old contribution and adds the new one; the other partitions are never re-read.
+
+Usage:
+    python rollupCube.py --data-dir store1 --data-dir store2 --menu category --location region --time quarter
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+import pipeline
+
+MENU_LEVELS = ['item', 'category', 'all']
+LOCATION_LEVELS = ['store', 'region', 'all']
+TIME_GRAINS = ['month', 'quarter', 'year', 'all']
+DIMENSIONS = ['Menu', 'Location', 'Period']
+PARENT_COLS = [f'{dimension} Parent' for dimension in DIMENSIONS]
+FRAME_COLS = ['menu_level', 'location_level', 'time_grain']
+# hierarchy attribute each level reads from the partition facts
+LEVEL_COLS = {
+    'item': 'Item', 'category': 'Menu Category',
+    'store': 'Store', 'region': 'Region',
+    'month': 'Month', 'quarter': 'Quarter', 'year': 'Year',
+}
+ALL = 'All'
+UNCATEGORIZED = 'Uncategorized'
+UNASSIGNED = 'Unassigned'
+BASE_MEASURES = ['Count', 'Amount']
+
+
+# ============================================
+# DIMENSIONS
+# ============================================
+def load_menu_categories(dataDir='.'):
+    """Menu category per item name (empty if the store has no MenuCategory.csv)"""
+    path = os.path.join(dataDir, pipeline.MENU_CATEGORY_FILE)
+    if not os.path.exists(path):
+        return pd.Series(dtype=object)
+    categories = pd.read_csv(path)
+    return categories.drop_duplicates('Item name', keep='last').set_index('Item name')['Menu Category']
+
+
+def load_location(dataDir='.'):
+    """(store, region) of a data directory"""
+    path = os.path.join(dataDir, pipeline.STORE_FILE)
+    if os.path.exists(path):
+        row = pd.read_csv(path).iloc[0]
+        return str(row['Store']), str(row.get('Region', UNASSIGNED))
+    return os.path.basename(os.path.abspath(dataDir)), UNASSIGNED
+
+
+def time_keys(month):
+    """Sortable month / quarter / year keys for a month name"""
+    start = pipeline.period_start(month)
+    if pd.isna(start):
+        return str(month), 'Unknown', 'Unknown'
+    return f"{start:%Y-%m}", f"{start.year}-Q{start.quarter}", str(start.year)
+
+
+def partition_facts(month_df, recipe, categories, store, region, month):
+    """Item-grain facts for one (store, month): Count, Amount and ingredient usage plus every hierarchy attribute
+
+    recipe is the item x ingredient matrix of the month's recipe version (RecipeBook.matrix_for).
+    """
+    facts = month_df.groupby('Category')[BASE_MEASURES].sum()
+    usage = recipe.reindex(facts.index, fill_value=0).mul(facts['Count'], axis=0)
+    facts = facts.join(usage)
+
+    monthKey, quarterKey, yearKey = time_keys(month)
+    facts.index.name = 'Item'
+    facts = facts.reset_index()
+    facts['Menu Category'] = facts['Item'].map(categories).fillna(UNCATEGORIZED)
+    facts['Store'] = store
+    facts['Region'] = region
+    facts['Month'] = monthKey
+    facts['Quarter'] = quarterKey
+    facts['Year'] = yearKey
+    return facts
+
+
+# ============================================
+# CUBE
+# ============================================
+class RollupCube:
+    """One summed frame (Menu, Location, Period) x measures per menu / location / time level combination"""
+
+    def __init__(self):
+        self.cuboids = {}
+        self.measures = list(BASE_MEASURES)
+        # partition key -> item-grain facts, kept to subtract when the partition is replaced
+        self._partitions = {}
+        # combo -> fact rows behind each cuboid member; a member exists while it has any
+        self._rows = {}
+        # child -> parent per hierarchy step, for drill-down filters
+        self.parents = {'item': {}, 'store': {}, 'month': {}, 'quarter': {}}
+
+    @staticmethod
+    def combinations():
+        return [(m, l, t) for m in MENU_LEVELS for l in LOCATION_LEVELS for t in TIME_GRAINS]
+
+    @staticmethod
+    def _aggregate(facts, combo, measures):
+        keys = [LEVEL_COLS.get(level, ALL) for level in combo]
+        summed = facts.groupby(keys, sort=False)[measures].sum()
+        summed.index.names = DIMENSIONS
+        return summed
+
+    def _apply(self, facts, sign):
+        # 'all' levels group on a constant column; _rows counts the facts behind each member
+        facts = facts.reindex(columns=list(LEVEL_COLS.values()) + self.measures, fill_value=0).assign(**{ALL: ALL, '_rows': 1})
+        for combo in self.combinations():
+            delta = self._aggregate(facts, combo, self.measures + ['_rows']) * sign
+            rows = delta.pop('_rows')
+            current = self.cuboids.get(combo)
+            self.cuboids[combo] = delta if current is None else current.add(delta, fill_value=0)
+            counts = self._rows.get(combo)
+            self._rows[combo] = rows if counts is None else counts.add(rows, fill_value=0)
+
+    def upsert(self, key, facts):
+        """Replace one partition's contribution to every cuboid"""
+        newMeasures = [col for col in facts.columns
+                       if col not in self.measures and col not in LEVEL_COLS.values() and col != 'Item']
+        if newMeasures:
+            self.measures += newMeasures
+            self.cuboids = {combo: df.reindex(columns=self.measures, fill_value=0) for combo, df in self.cuboids.items()}
+        self.remove(key)
+        self._apply(facts, 1)
+        self._partitions[key] = facts
+        self.parents['item'].update(zip(facts['Item'], facts['Menu Category']))
+        self.parents['store'].update(zip(facts['Store'], facts['Region']))
+        self.parents['month'].update(zip(facts['Month'], facts['Quarter']))
+        self.parents['quarter'].update(zip(facts['Quarter'], facts['Year']))
+
+    def remove(self, key):
+        """Take a partition out of every cuboid (no-op if it was never added)"""
+        old = self._partitions.pop(key, None)
+        if old is None:
+            return
+        self._apply(old, -1)
+        # members left without fact rows no longer exist; zero-valued members of other partitions stay
+        for combo, counts in self._rows.items():
+            alive = counts[counts > 0]
+            self._rows[combo] = alive
+            self.cuboids[combo] = self.cuboids[combo].loc[alive.index]
+
+    def rollup(self, menu='category', location='store', time='month', within=None):
+        """Cuboid for one level combination, optionally restricted to the children of parent members
+
+        within: {level: member} of a coarser level, e.g. {'category': 'Rice Dishes', 'quarter': '2025-Q3'}
+        """
+        df = self.cuboids.get((menu, location, time))
+        if df is None:
+            return pd.DataFrame(columns=DIMENSIONS + self.measures)
+        df = df.reset_index()
+        for parent, member in (within or {}).items():
+            level, dimension = next(((level, dimension) for level, dimension in
+                                     ((menu, 'Menu'), (location, 'Location'), (time, 'Period'))
+                                     if self.is_above(parent, level)), (None, None))
+            if level is None:
+                raise ValueError(f"within level {parent!r} is not above any of {menu!r}, {location!r}, {time!r}")
+            df = df[df[dimension].map(lambda child: self.ancestor(level, child, parent)) == member]
+        return df
+
+    @staticmethod
+    def is_above(target, level):
+        """True when target is a coarser level of the same hierarchy as level"""
+        return any(level in hierarchy and target in hierarchy and hierarchy.index(target) > hierarchy.index(level)
+                   for hierarchy in (MENU_LEVELS, LOCATION_LEVELS, TIME_GRAINS))
+
+    def ancestor(self, level, member, target):
+        """Walk member up the hierarchy from level until target level (None if target is not above level)"""
+        for hierarchy in (MENU_LEVELS, LOCATION_LEVELS, TIME_GRAINS):
+            if level in hierarchy and target in hierarchy and hierarchy.index(target) > hierarchy.index(level):
+                for step in hierarchy[hierarchy.index(level):hierarchy.index(target)]:
+                    member = self.parents.get(step, {}).get(member)
+                return member
+        return None
+
+    def to_frame(self):
+        """All cuboids as one long frame: level columns, dimensions, each dimension's parent member, measures"""
+        frames = []
+        for (m, l, t), df in self.cuboids.items():
+            df = df.reset_index()
+            for level, dimension in ((m, 'Menu'), (l, 'Location'), (t, 'Period')):
+                df[f'{dimension} Parent'] = df[dimension].map(self.parents.get(level, {}))
+            frames.append(df.assign(menu_level=m, location_level=l, time_grain=t))
+        if not frames:
+            return pd.DataFrame(columns=FRAME_COLS + DIMENSIONS + PARENT_COLS + self.measures)
+        return pd.concat(frames, ignore_index=True)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Rebuild the lookups from to_frame output (e.g. a snapshot loaded from the shared cache)"""
+        cube = cls()
+        cube.measures = [col for col in df.columns if col not in FRAME_COLS + DIMENSIONS + PARENT_COLS]
+        for combo, group in df.groupby(FRAME_COLS, sort=False):
+            cube.cuboids[combo] = group.set_index(DIMENSIONS)[cube.measures].astype(float)
+            for level, dimension in zip(combo, DIMENSIONS):
+                if level in cube.parents:
+                    links = group[group[f'{dimension} Parent'].notna()]
+                    cube.parents[level].update(zip(links[dimension], links[f'{dimension} Parent']))
+        return cube
+
+
+def build_cube(dataDirs):
+    """Cube over several store directories (one partition per store x month)"""
+    cube = RollupCube()
+    for dataDir in dataDirs:
+        store, region = load_location(dataDir)
+        categories = load_menu_categories(dataDir)
+        book = pipeline.load_recipe_book(dataDir)
+        for path in pipeline.sales_files(dataDir):
+            month_df = pipeline.load_month(path)
+            month = month_df['month'].iat[0]
+            recipe = book.matrix_for(pipeline.period_start(month))
+            cube.upsert((store, month), partition_facts(month_df, recipe, categories, store, region, month))
+    return cube
+
+
+# ============================================
+# MAIN
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Roll up revenue, count and ingredient usage')
+    parser.add_argument('--data-dir', action='append', dest='dataDirs', help='Store data directory (repeatable)')
+    parser.add_argument('--menu', choices=MENU_LEVELS, default='category')
+    parser.add_argument('--location', choices=LOCATION_LEVELS, default='store')
+    parser.add_argument('--time', choices=TIME_GRAINS, default='month')
+    parser.add_argument('--measure', action='append', dest='measures', help='Measure column(s) to print')
+    args = parser.parse_args(argv)
+
+    cube = build_cube(args.dataDirs or ['.'])
+    rollup = cube.rollup(args.menu, args.location, args.time)
+    print(rollup[DIMENSIONS + (args.measures or BASE_MEASURES)].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
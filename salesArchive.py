@@ -0,0 +1,221 @@
+"""
+Mai Shan Yun - Partitioned Sales Archive
+Multi-year home for the monthly sales files: archive/year=YYYY/month=MM[/store=NAME]/sales.csv
+plus a manifest.json listing every partition, so loaders pick the partitions a query needs from
+the manifest (partition pruning) without walking or opening the rest
+
+Month identity comes from the partition path, not the filename, so several years of the same
+month can sit side by side. Old years stay on disk; pipeline.sales_files only reads the latest
+MSY_HISTORY_MONTHS months of legacy files and partitions together, and read_sales reads any
+explicit range.
+
+Usage:
+    python salesArchive.py import csv_files/*.csv --year 2025          # move legacy month files in
+    python salesArchive.py import exports/*.csv --year 2024 --store Downtown --copy
+    python salesArchive.py list --from 2024-01 --to 2024-12
+    python salesArchive.py rebuild                                     # re-scan after manual changes
+"""
+
+import argparse
+import collections
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+# pipeline imports this module too; only main() reads pipeline.DATA_DIR, after both are loaded
+import pipeline
+
+ARCHIVE_DIR = 'archive'
+MANIFEST = 'manifest.json'
+PARTITION_FILE = 'sales.csv'
+PARTITION_RE = re.compile(r'year=(\d{4})[\\/]month=(\d{2})(?:[\\/]store=([^\\/]+))?[\\/]' + re.escape(PARTITION_FILE) + '$')
+MONTH_NAMES = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+               'august', 'september', 'october', 'november', 'december']
+
+Partition = collections.namedtuple('Partition', ['year', 'month', 'store', 'path'])
+
+
+# ============================================
+# LAYOUT
+# ============================================
+def archive_dir(dataDir='.'):
+    return os.path.join(dataDir, ARCHIVE_DIR)
+
+
+def partition_path(archiveDir, year, month, store=None):
+    parts = [archiveDir, f'year={int(year):04d}', f'month={int(month):02d}']
+    if store:
+        parts.append(f'store={store}')
+    return os.path.join(*parts, PARTITION_FILE)
+
+
+def parse_partition(path):
+    """Partition of an archive file path, or None for any other file"""
+    match = PARTITION_RE.search(path)
+    if match is None:
+        return None
+    return Partition(int(match.group(1)), int(match.group(2)), match.group(3), path)
+
+
+def period_index(year, month):
+    """Months since year 0, for range comparisons"""
+    return int(year) * 12 + int(month) - 1
+
+
+def parse_period(text):
+    """'2025-05' -> (2025, 5)"""
+    year, month = str(text).split('-')
+    return int(year), int(month)
+
+
+# ============================================
+# MANIFEST
+# ============================================
+def scan(archiveDir):
+    """Partitions found on disk, in period order"""
+    found = [parse_partition(path) for path in glob.glob(os.path.join(archiveDir, 'year=*', 'month=*', '**', PARTITION_FILE),
+                                                         recursive=True)]
+    return sorted((p for p in found if p is not None), key=lambda p: (p.year, p.month, p.store or ''))
+
+
+def write_manifest(archiveDir, partitions):
+    """Replace manifest.json atomically; paths are stored relative to the archive"""
+    entries = [{'year': p.year, 'month': p.month, 'store': p.store, 'path': os.path.relpath(p.path, archiveDir),
+                'size': os.path.getsize(p.path)} for p in partitions]
+    os.makedirs(archiveDir, exist_ok=True)
+    fd, tmpPath = tempfile.mkstemp(dir=archiveDir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'partitions': entries}, f, indent=1)
+    os.replace(tmpPath, os.path.join(archiveDir, MANIFEST))
+
+
+def load_manifest(archiveDir):
+    """Partitions listed in the manifest (built from a scan the first time); [] without an archive
+
+    Entries whose file has since been deleted are skipped with a warning to run `rebuild`.
+    """
+    path = os.path.join(archiveDir, MANIFEST)
+    if not os.path.exists(path):
+        if not os.path.isdir(archiveDir):
+            return []
+        write_manifest(archiveDir, scan(archiveDir))
+    with open(path) as f:
+        entries = json.load(f)['partitions']
+    listed = [Partition(e['year'], e['month'], e['store'], os.path.join(archiveDir, e['path'])) for e in entries]
+    found = [p for p in listed if os.path.exists(p.path)]
+    if len(found) < len(listed):
+        missing = ', '.join(p.path for p in listed if p not in found)
+        print(f"warning: {path} lists missing partition(s) {missing}; run 'python salesArchive.py rebuild'",
+              file=sys.stderr)
+    return found
+
+
+# ============================================
+# PRUNING
+# ============================================
+def partitions(archiveDir, start=None, end=None, store=None, lastMonths=None):
+    """Manifest partitions within [start, end] ((year, month) pairs, inclusive) for store
+
+    store=None keeps every partition; a named store keeps its own partitions plus store-less ones.
+    lastMonths keeps only the latest lastMonths periods that remain.
+    """
+    selected = load_manifest(archiveDir)
+    if start is not None:
+        selected = [p for p in selected if period_index(p.year, p.month) >= period_index(*start)]
+    if end is not None:
+        selected = [p for p in selected if period_index(p.year, p.month) <= period_index(*end)]
+    if store is not None:
+        selected = [p for p in selected if p.store in (None, store)]
+    if lastMonths:
+        periods = sorted({period_index(p.year, p.month) for p in selected})[-lastMonths:]
+        selected = [p for p in selected if period_index(p.year, p.month) in set(periods)]
+    return selected
+
+
+def read_sales(dataDir, start=None, end=None, store=None, columns=None):
+    """Raw sales rows of the pruned partitions, with year / month / store columns"""
+    frames = [pd.read_csv(p.path, usecols=columns, thousands=',').assign(year=p.year, month=p.month, store=p.store)
+              for p in partitions(archive_dir(dataDir), start, end, store)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=(columns or []) + ['year', 'month', 'store'])
+
+
+# ============================================
+# IMPORT
+# ============================================
+def month_of_file(path):
+    """Month number from a legacy month filename (may.csv -> 5)"""
+    name = os.path.splitext(os.path.basename(path))[0].lower()
+    if name not in MONTH_NAMES:
+        raise ValueError(f"{path} is not named after a month")
+    return MONTH_NAMES.index(name) + 1
+
+
+def import_files(paths, year, dataDir='.', store=None, copy=False, force=False):
+    """Move (or copy) legacy month files into the archive and rewrite the manifest once
+
+    Refuses (ValueError, before touching anything) to replace a partition already on disk
+    unless force. The manifest is rebuilt from a scan, so manual changes since it was written
+    are not lost.
+    """
+    archiveDir = archive_dir(dataDir)
+    targets = [partition_path(archiveDir, year, month_of_file(path), store) for path in paths]
+    if len(set(targets)) < len(targets):
+        raise ValueError(f"several files map to the same {year} partition")
+    taken = [target for target in targets if os.path.exists(target)]
+    if taken and not force:
+        raise ValueError(f"{', '.join(taken)} already archived (use --force to replace)")
+    for path, target in zip(paths, targets):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        (shutil.copy2 if copy else shutil.move)(path, target)
+    write_manifest(archiveDir, scan(archiveDir))
+    return len(paths)
+
+
+# ============================================
+# MAIN
+# ============================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage the partitioned multi-year sales archive')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help='Move month files (may.csv, ...) into year=/month= partitions')
+    importer.add_argument('files', nargs='+')
+    importer.add_argument('--year', type=int, required=True)
+    importer.add_argument('--store', help='Partition under store=NAME (shared multi-store archives)')
+    importer.add_argument('--copy', action='store_true', help='Copy instead of move')
+    importer.add_argument('--force', action='store_true', help='Replace partitions that are already archived')
+
+    lister = commands.add_parser('list', help='Print the partitions a range prunes to')
+    lister.add_argument('--from', dest='start', type=parse_period, metavar='YYYY-MM')
+    lister.add_argument('--to', dest='end', type=parse_period, metavar='YYYY-MM')
+    lister.add_argument('--store')
+
+    commands.add_parser('rebuild', help='Re-scan the archive and rewrite manifest.json')
+    args = parser.parse_args(argv)
+
+    archiveDir = archive_dir(args.dataDir)
+    try:
+        if args.command == 'import':
+            print(f"{import_files(args.files, args.year, args.dataDir, args.store, args.copy, args.force)} file(s) archived")
+        elif args.command == 'rebuild':
+            found = scan(archiveDir)
+            write_manifest(archiveDir, found)
+            print(f"{len(found)} partition(s) in {os.path.join(archiveDir, MANIFEST)}")
+        else:
+            for p in partitions(archiveDir, args.start, args.end, args.store):
+                print(f"{p.year}-{p.month:02d} {p.store or '-':<12} {p.path}")
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Mai Shan Yun - Cross-Process Snapshot Cache
+Disk-backed cache of pipeline outputs keyed by data version, shared by every replica on a host
+
+Frames are written once as uncompressed Arrow IPC files and read back through memory maps,
+so numeric columns in every replica point at the same page-cache pages instead of private copies.
+Dense float matrices (recipe matrix, monthly counts and usage) are written as a single .npy block
+instead and mapped read-only, so every session and worker process gets one zero-copy 2-D view.
+Without pyarrow the cache falls back to pickle files (still computed once, but not shared in memory).
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: replicas may occasionally build the same version twice
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# next to the data it caches, so every replica finds it whatever its working directory
+DEFAULT_CACHE_DIR = os.environ.get('MSY_CACHE_DIR', os.path.join(pipeline.DATA_DIR, '.cache', 'snapshots'))
+KEEP_VERSIONS = 3
+# intraday aggregates published between snapshot versions (see orderStream.py)
+LIVE_DIR = 'live'
+
+
+# ============================================
+# FRAME SERIALIZATION
+# ============================================
+def write_frame(df, path):
+    """Write one frame to path (Arrow IPC if available, pickle otherwise)"""
+    if pa is None:
+        with open(path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_frame(path):
+    """Memory-map a frame written by write_frame"""
+    if pa is None:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    # split_blocks keeps single-chunk numeric columns as views over the mapped file
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def is_matrix(df):
+    """Float-only frame with string labels, stored as one .npy block"""
+    return (len(df.columns) > 0 and (df.dtypes == np.float64).all()
+            and df.index.inferred_type in ('string', 'empty') and df.columns.inferred_type == 'string')
+
+
+def write_matrix(df, path):
+    """Write a matrix frame's values to path; returns its labels for the metadata"""
+    np.save(path, np.ascontiguousarray(df.to_numpy(dtype=np.float64)))
+    return {'index': list(df.index), 'index_name': df.index.name,
+            'columns': list(df.columns), 'columns_name': df.columns.name}
+
+
+def read_matrix(path, labels):
+    """Read-only memory-mapped frame over a matrix written by write_matrix (no copy)"""
+    values = np.load(path, mmap_mode='r')
+    return pd.DataFrame(values, index=pd.Index(labels['index'], name=labels['index_name'], dtype=object),
+                        columns=pd.Index(labels['columns'], name=labels['columns_name'], dtype=object), copy=False)
+
+
+# ============================================
+# SHARED CACHE
+# ============================================
+class SharedCache:
+    """Version-keyed snapshot store; the first process to need a version builds it, the rest map it"""
+
+    def __init__(self, cacheDir=DEFAULT_CACHE_DIR):
+        self.cacheDir = cacheDir
+        os.makedirs(cacheDir, exist_ok=True)
+
+    def _version_dir(self, version):
+        return os.path.join(self.cacheDir, version)
+
+    def _lock_path(self, version):
+        return os.path.join(self.cacheDir, f'{version}.lock')
+
+    def load(self, version, fields):
+        """Return {field: value} for a cached version, or None if it has not been built"""
+        # a shared lock while mapping keeps _prune from deleting files under the reader
+        with open(self._lock_path(version), 'a') as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_SH)
+            return self._read(version, fields)
+
+    def _read(self, version, fields):
+        versionDir = self._version_dir(version)
+        metaPath = os.path.join(versionDir, 'meta.json')
+        if not os.path.exists(metaPath):
+            return None
+        with open(metaPath) as f:
+            meta = json.load(f)
+        values = {}
+        for field in fields:
+            if field in meta['scalars']:
+                values[field] = meta['scalars'][field]
+                continue
+            if field in meta.get('matrices', {}):
+                value = read_matrix(os.path.join(versionDir, f'{field}.npy'), meta['matrices'][field])
+            else:
+                value = read_frame(os.path.join(versionDir, f'{field}.arrow'))
+            if field in meta['series']:
+                # naming in place keeps the column a view (rename would copy it)
+                value = value.iloc[:, 0]
+                value.name = meta['series'][field]
+            values[field] = value
+        return values
+
+    def store(self, version, values):
+        """Write every value of a snapshot, then publish it with an atomic rename"""
+        with open(self._lock_path(version), 'a') as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            self._store(version, values)
+
+    def _store(self, version, values):
+        # the caller holds the version's exclusive lock, which marks tmpDir as in progress for _prune
+        tmpDir = tempfile.mkdtemp(prefix=f'.{version}-', dir=self.cacheDir)
+        meta = {'scalars': {}, 'series': {}, 'matrices': {}}
+        for field, value in values.items():
+            if isinstance(value, pd.Series):
+                meta['series'][field] = value.name
+                value = value.to_frame(name='value')
+            if isinstance(value, pd.DataFrame) and is_matrix(value):
+                meta['matrices'][field] = write_matrix(value, os.path.join(tmpDir, f'{field}.npy'))
+            elif isinstance(value, pd.DataFrame):
+                write_frame(value, os.path.join(tmpDir, f'{field}.arrow'))
+            else:
+                meta['scalars'][field] = value
+        with open(os.path.join(tmpDir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmpDir, self._version_dir(version))
+        except OSError:
+            # another replica published the same version first
+            shutil.rmtree(tmpDir, ignore_errors=True)
+        self._prune(keep=version)
+
+    def get_or_build(self, version, fields, build):
+        """Load a version if cached, otherwise build it under a host-wide lock"""
+        values = self.load(version, fields)
+        if values is not None:
+            return values
+        with open(self._lock_path(version), 'a') as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            # re-check: whoever held the lock may have just built it
+            values = self._read(version, fields)
+            if values is None:
+                self._store(version, build())
+                values = self._read(version, fields)
+        return values
+
+    def publish(self, name, frame, scalars=None):
+        """Replace a live frame (plus JSON scalars) in one atomic rename; readers see old or new"""
+        liveDir = os.path.join(self.cacheDir, LIVE_DIR)
+        os.makedirs(liveDir, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(prefix=f'.{name}-', dir=liveDir)
+        os.close(fd)
+        if pa is None:
+            with open(tmpPath, 'wb') as f:
+                pickle.dump((frame, scalars or {}), f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            table = table.replace_schema_metadata({**table.schema.metadata, b'scalars': json.dumps(scalars or {})})
+            with pa.OSFile(tmpPath, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmpPath, os.path.join(liveDir, f'{name}.arrow'))
+
+    def read_published(self, name):
+        """(frame, scalars) last published under name, or None"""
+        path = os.path.join(self.cacheDir, LIVE_DIR, f'{name}.arrow')
+        if not os.path.exists(path):
+            return None
+        if pa is None:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        scalars = json.loads(table.schema.metadata.get(b'scalars', b'{}'))
+        return table.to_pandas(split_blocks=True, self_destruct=True), scalars
+
+    def _prune(self, keep):
+        """Drop all but the newest cached versions that no process is building or reading
+
+        Also drops the temporary directories ('.<version>-*') of builds that died before their
+        rename (POSIX only: without flock a live build cannot be told from a dead one). Lock files are never removed: a process waiting on one would lock an unlinked inode.
+        """
+        entries = []
+        orphans = []
+        for name in os.listdir(self.cacheDir):
+            path = os.path.join(self.cacheDir, name)
+            if fcntl is not None and name.startswith('.') and '-' in name and os.path.isdir(path):
+                # mkdtemp('.<version>-') adds a suffix without dashes
+                version = name[1:].rsplit('-', 1)[0]
+                if version != keep:
+                    orphans.append((path, version))
+            elif not name.startswith('.') and not name.endswith('.lock') and name != LIVE_DIR:
+                entries.append((path, name))
+        entries.sort(key=lambda entry: os.path.getmtime(entry[0]), reverse=True)
+        for path, version in entries[KEEP_VERSIONS:] + orphans:
+            if version == keep:
+                continue
+            with open(self._lock_path(version), 'a') as lockFile:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        # still being built or mapped; a later store prunes it
+                        continue
+                # replicas that already mapped these files keep their pages until they unmap
+                shutil.rmtree(path, ignore_errors=True)
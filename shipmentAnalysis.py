@@ -5,68 +5,27 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import glob
 
+import pipeline
+
 ######################################## load shipment data ########################################
 # print("Loading shipment data...")
-shipments = pd.read_csv('Shipment.csv')
+# total amount of shipments per month (quantity * deliveries in an average month, lbs -> g)
+# comes from the delivery calendar: weekdays, holidays and 4.33 weeks per month
+shipments = pipeline.load_shipments('.')
 # shipments.head()
 # print(f"✓ Loaded {len(shipments)} ingredients")
 
-######################################## find total amount of shipments per month ########################################
-# quantity * shipment number * frequency
-# standardize freqency for all ingredients
-def monthlyFreq(freqType):
-    if pd.isna(freqType):
-        return np.nan
-    freqType = str(freqType).lower().strip()
-    if freqType == "weekly":
-        return 4
-    elif freqType == "biweekly":
-        return 2
-    elif freqType == "monthly":
-        return 1
-    else:
-        return np.nan
-
-# calculate and store total shipment
-shipments['Shipments per Month'] = shipments['frequency'].apply(monthlyFreq) * shipments['Number of shipments']
-shipments['Monthly Quantity (g)'] = shipments['Quantity per shipment'] * shipments['Shipments per Month']
-
-lbs_mask = shipments['Unit of shipment'].str.lower().str.strip() == 'lbs'
-shipments.loc[lbs_mask, 'Monthly Quantity (g)'] = shipments.loc[lbs_mask, 'Monthly Quantity (g)'] * 453.59237
-
 ######################################## find monthly ingredient usage ########################################
 # combine all monthly data into one dataframe
-monthlySalesFiles = glob.glob('csv_files/*.csv')
-dfs = []
-for file in monthlySalesFiles:
-    df = pd.read_csv(file)
-    # get month name from filename
-    monthName = file.split('/')[-1].replace('.csv', '')
-    monthName = monthName[10:]
-    # print(monthName)
-    df['month'] = monthName
-    dfs.append(df)
-
-orders = pd.concat(dfs, ignore_index=True)
-orders.rename(columns={'Item Name': 'Category'}, inplace=True)
-
-# clean data
-# remove commas, convert all to numeric types 
-# replace NaN with 0
-orders['Count'] = pd.to_numeric(orders['Count'], errors='coerce').fillna(0)
-orders['Amount'] = orders['Amount'].astype(str).str.replace(',', '').astype(float)
+# Count / Amount are parsed, validated and typed once at ingestion (see ingestion.py)
+orders = pipeline.load_sales('.')
 
 # print(f"\n✓ Combined data: {len(orders)} total orders across {orders['month'].nunique()} months")
 
 # ######################################## load ingredient data ########################################
 # print("\nLoading ingredient mapping...")
-ingredients = pd.read_csv('Ingredient.csv')
-
-# column name type for bokchoy
-if 'Boychoy(g)' in ingredients.columns:
-    ingredients.rename(columns={'Boychoy(g)': 'Bokchoy(g)'}, inplace=True)
-
-ingredients.rename(columns={'Item name': 'Category'}, inplace=True)
+# recipe quantities arrive as floats, with the bokchoy column name typo fixed
+ingredients = pipeline.load_ingredients('.')
 # print(f"✓ Loaded {len(ingredients)} ingredient recipes")
 
 ######################################## calculate ingredient usage for each month ########################################
@@ -77,9 +36,8 @@ usage = orders.merge(ingredients, on='Category', how='left')
 
 # find ingredient usage based on number of times category item was ordered 
 ingredientCols = [col for col in ingredients.columns if col != 'Category']
-# make sure values are numeric 
-for col in ingredientCols:
-    usage[col] = pd.to_numeric(usage[col], errors='coerce').fillna(0)
+# items without a recipe use nothing
+usage[ingredientCols] = usage[ingredientCols].fillna(0)
 for col in ingredientCols:
     usage[col] = usage[col] * usage['Count']
 
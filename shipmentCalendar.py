@@ -0,0 +1,187 @@
+"""
+Mai Shan Yun - Shipment Calendar
+Dated delivery schedule per Shipment.csv row: daily supply arrays for any date range and
+calendar-accurate shipments per month (a month holds 4.33 weeks, not 4)
+
+Shipment.csv columns used:
+    frequency          weekly, biweekly, monthly, daily, "every N days" or "every N weeks"
+    Number of shipments deliveries per cycle, spread evenly over it (Mon/Wed/Fri for 3 weekly)
+    delivery_days      optional, e.g. "Mon;Thu": fixed weekdays for weekly-multiple cadences
+Holidays.csv (optional, one Date column) moves deliveries that fall on a holiday to the next open day.
+Cycles are phased from the Monday on or before January 1 of the data year, so biweekly weeks
+stay the same whichever date range is asked for.
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+HOLIDAY_FILE = 'Holidays.csv'
+CADENCE_DAYS = {'daily': 1, 'weekly': 7, 'biweekly': 14}
+MONTHLY = 'monthly'
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+SCHEDULE_COLS = ['Ingredient', 'Quantity per shipment', 'Unit of shipment', 'Number of shipments',
+                 'frequency', 'delivery_days']
+# deliveries rolled forward from before a range can still land in it
+HOLIDAY_PAD_DAYS = 14
+MAX_CALENDARS = 8
+
+
+# ============================================
+# SCHEDULE PARSING
+# ============================================
+def cadence_days(freq):
+    """Cycle length in days, 0 for calendar-monthly, NaN for an unknown label"""
+    if pd.isna(freq):
+        return np.nan
+    freq = str(freq).lower().strip()
+    if freq == MONTHLY:
+        return 0
+    if freq in CADENCE_DAYS:
+        return CADENCE_DAYS[freq]
+    match = re.fullmatch(r'every\s+(\d+)\s+(day|week)s?', freq)
+    if match:
+        return int(match.group(1)) * (7 if match.group(2) == 'week' else 1)
+    return np.nan
+
+
+def parse_weekdays(text):
+    """'Mon;Thu' -> (0, 3); blank -> ()"""
+    if pd.isna(text) or not str(text).strip():
+        return ()
+    days = []
+    for part in re.split(r'[;,/\s]+', str(text).strip().lower()):
+        if part[:3] not in WEEKDAYS:
+            raise ValueError(f"Unknown delivery day: {part!r}")
+        days.append(WEEKDAYS.index(part[:3]))
+    return tuple(sorted(set(days)))
+
+
+def load_holidays(dataDir='.'):
+    """Closed days from Holidays.csv, empty if the store has none"""
+    path = os.path.join(dataDir, HOLIDAY_FILE)
+    if not os.path.exists(path):
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(pd.to_datetime(pd.read_csv(path)['Date'])).normalize().unique()
+
+
+def schedule_key(shipments_df, year, holidays=None):
+    """Hash of the schedule columns, year and holidays, so equal schedules share one calendar"""
+    digest = hashlib.sha1(str(year).encode())
+    schedule = shipments_df.reindex(columns=SCHEDULE_COLS)
+    digest.update(pd.util.hash_pandas_object(schedule.astype(str), index=False).to_numpy().tobytes())
+    if holidays is not None:
+        digest.update(pd.DatetimeIndex(holidays).asi8.tobytes())
+    return digest.hexdigest()[:16]
+
+
+# ============================================
+# CALENDAR
+# ============================================
+class ShipmentCalendar:
+    """Delivery counts per day x shipment row, built from per-cadence phase tables"""
+
+    def __init__(self, shipments_df, year, quantity=None, holidays=None):
+        self.ingredients = shipments_df['Ingredient'].tolist()
+        self.cycles = shipments_df['frequency'].map(cadence_days).to_numpy(dtype=float)
+        self.counts = pd.to_numeric(shipments_df['Number of shipments'], errors='coerce').fillna(0).astype(int).to_numpy()
+        weekdays = shipments_df['delivery_days'] if 'delivery_days' in shipments_df.columns else pd.Series(np.nan, index=shipments_df.index)
+        self.weekdays = [parse_weekdays(days) for days in weekdays]
+        # per-delivery quantity in recipe units; without one, supply is counted in deliveries
+        self.quantity = np.ones(len(self.ingredients)) if quantity is None else np.asarray(quantity, dtype=float)
+        self.holidays = pd.DatetimeIndex([]) if holidays is None else pd.DatetimeIndex(holidays)
+        self.year = year
+        start = pd.Timestamp(year, 1, 1)
+        self.anchor = start - pd.Timedelta(days=start.weekday())
+        # (start, end) -> delivery counts, so each range is generated once per schedule
+        self._deliveries = {}
+
+    def _phase_table(self, row, cycle):
+        """Deliveries on each day of one cycle"""
+        table = np.zeros(cycle)
+        if self.weekdays[row] and cycle % 7 == 0:
+            table[list(self.weekdays[row])] = 1
+        elif self.counts[row] > 0:
+            n = self.counts[row]
+            table += np.bincount((np.arange(n) * cycle) // n, minlength=cycle)
+        return table
+
+    def _raw_deliveries(self, dates):
+        counts = np.zeros((len(dates), len(self.ingredients)))
+        offset = (dates - self.anchor).days.to_numpy()
+
+        # fixed cycles: one phase lookup per cycle length covers all its rows
+        for cycle in np.unique(self.cycles[self.cycles > 0]).astype(int):
+            rows = np.flatnonzero(self.cycles == cycle)
+            tables = np.vstack([self._phase_table(row, cycle) for row in rows])
+            counts[:, rows] = tables[:, offset % cycle].T
+
+        # calendar-monthly: n deliveries spread over each month's own length
+        rows = np.flatnonzero(self.cycles == 0)
+        if len(rows):
+            n = np.maximum(self.counts[rows], 0)
+            tables = np.zeros((len(rows), 4, 31))
+            for k, monthDays in enumerate(range(28, 32)):
+                for i, count in enumerate(n):
+                    tables[i, k] += np.bincount((np.arange(count) * monthDays) // max(count, 1), minlength=31)
+            counts[:, rows] = tables[:, dates.days_in_month.to_numpy() - 28, dates.day.to_numpy() - 1].T
+        return counts
+
+    def deliveries(self, start, end):
+        """Delivery counts as a (days x shipment rows) array over [start, end] plus its dates"""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        cached = self._deliveries.get((start, end))
+        if cached is not None:
+            return cached
+
+        dates = pd.date_range(start, end, freq='D')
+        if len(self.holidays):
+            padded = pd.date_range(start - pd.Timedelta(days=HOLIDAY_PAD_DAYS), end, freq='D')
+            raw = self._raw_deliveries(padded)
+            # each day maps to the first non-holiday on or after it
+            closed = padded.isin(self.holidays)
+            nextOpen = np.where(closed, len(padded), np.arange(len(padded)))
+            nextOpen = np.minimum.accumulate(nextOpen[::-1])[::-1]
+            moved = np.zeros((len(padded) + 1, raw.shape[1]))
+            np.add.at(moved, nextOpen, raw)
+            counts = moved[HOLIDAY_PAD_DAYS:len(padded)]
+        else:
+            counts = self._raw_deliveries(dates)
+
+        self._deliveries[(start, end)] = (dates, counts)
+        return dates, counts
+
+    def daily_supply(self, start, end):
+        """Supply per day in recipe units, date x shipment ingredient"""
+        dates, counts = self.deliveries(start, end)
+        return pd.DataFrame(counts * self.quantity, index=dates, columns=self.ingredients)
+
+    def monthly_supply(self, start, end):
+        """Supply per calendar month in recipe units, month start x shipment ingredient"""
+        return self.daily_supply(start, end).resample('MS').sum()
+
+    def shipments_per_month(self, year=None):
+        """Average deliveries per month over a calendar year, NaN for unknown cadences"""
+        year = year or self.year
+        _, counts = self.deliveries(pd.Timestamp(year, 1, 1), pd.Timestamp(year, 12, 31))
+        return np.where(np.isnan(self.cycles), np.nan, counts.sum(axis=0) / 12)
+
+
+_calendars = {}
+_calendarsLock = threading.Lock()
+
+
+def calendar_for(shipments_df, year, quantity=None, holidays=None):
+    """Shared calendar for a schedule; rebuilt only when the schedule or holidays change"""
+    key = schedule_key(shipments_df, year, holidays)
+    with _calendarsLock:
+        calendar = _calendars.get(key)
+        if calendar is None:
+            if len(_calendars) >= MAX_CALENDARS:
+                _calendars.pop(next(iter(_calendars)))
+            calendar = _calendars[key] = ShipmentCalendar(shipments_df, year, quantity, holidays)
+    return calendar
@@ -0,0 +1,204 @@
+"""
+Mai Shan Yun - Headless Stock Alerts
+Evaluates CRITICAL/LOW stock status and sales/usage anomalies in the latest month without
+Streamlit or plotting and emits JSON lines
+
+Cheap enough to run every few minutes: it computes only monthly usage, the supply comparison
+and the anomaly detectors (no forecast, cube, ledger or margins, and no snapshot cache), and
+re-reads only the month files that changed since the last tick.
+
+Usage:
+    python stockAlerts.py                              # current directory, print alerts once
+    python stockAlerts.py --data-dir store1 --data-dir store2
+    python stockAlerts.py --watch 300                  # re-evaluate when inputs change
+    python stockAlerts.py --webhook http://localhost:8080/alerts
+
+Every JSON line carries timestamp, store and a 'type' telling consumers which record it is:
+    stock      ingredient, status, days_of_supply, monthly_supply, avg_monthly_usage,
+               utilization_pct, unit, data_version (orderStream.py live alerts add
+               source='live', on_hand and usage_today instead of the monthly fields)
+    anomaly    series, name, period, direction, value, expected, z_score, data_version
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import anomalyDetection
+import pipeline
+
+ALERT_LEVELS = ['CRITICAL', 'LOW']
+
+
+# ============================================
+# EVALUATION
+# ============================================
+class StoreAlerts:
+    """Alert inputs for one store directory, recomputed only when its input files change"""
+
+    def __init__(self, dataDir):
+        self.dataDir = dataDir
+        self.version = None
+        self._book = (None, None)
+        # path -> (fingerprint, month label, month usage, item counts)
+        self._months = {}
+
+    def _month(self, path, book):
+        key = pipeline.file_fingerprint(path)
+        cached = self._months.get(path)
+        if cached is None or cached[0] != key:
+            month_df = pipeline.load_month(path)
+            month = pipeline.month_from_path(path)
+            usage = pipeline.month_usage(month_df, book.matrix_for(pipeline.period_start(month)))
+            cached = (key, month, usage, anomalyDetection.item_counts(month_df))
+        return cached
+
+    def evaluate(self):
+        """(version, comparison_df, latest month's anomaly_df, latest month), or None if nothing changed"""
+        version = pipeline.data_version(self.dataDir)
+        if version == self.version:
+            return None
+        recipeKey = pipeline.recipe_fingerprint(self.dataDir)
+        if recipeKey != self._book[0]:
+            # every month's usage depends on the recipes
+            self._book = (recipeKey, pipeline.load_recipe_book(self.dataDir))
+            self._months = {}
+        self._months = {path: self._month(path, self._book[1]) for path in pipeline.sales_files(self.dataDir)}
+        if not self._months:
+            raise ValueError(f"No monthly sales files found for {self.dataDir}")
+        entries = sorted(self._months.values(), key=lambda entry: pipeline.month_sort_key(entry[1]))
+
+        monthly_usage = pd.DataFrame([usage for _, _, usage, _ in entries],
+                                     index=[month for _, month, _, _ in entries]).fillna(0)
+        comparison_df = pipeline.calculate_shipment_comparison(pipeline.load_shipments(self.dataDir),
+                                                               monthly_usage.mean(axis=0))
+        # the detectors keep no history, so replaying the few months costs O(months x series)
+        items, ingredients = anomalyDetection.EwmaDetector('item'), anomalyDetection.EwmaDetector('ingredient')
+        for _, month, usage, counts in entries:
+            latest = [items.update(month, counts), ingredients.update(month, usage)]
+        anomaly_df = pd.concat(latest, ignore_index=True)
+        self.version = version
+        return version, comparison_df, anomaly_df, entries[-1][1]
+
+
+# ============================================
+# OUTPUT
+# ============================================
+def build_alerts(comparison_df, store, version, levels):
+    """One alert dict per ingredient whose status is in levels"""
+    flagged = comparison_df[comparison_df['Status'].isin(levels)].sort_values('Days of Supply')
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return [
+        {
+            'timestamp': timestamp,
+            'store': store,
+            'data_version': version,
+            'type': 'stock',
+            'ingredient': row['Ingredient'],
+            'status': row['Status'],
+            'days_of_supply': round(float(row['Days of Supply']), 2),
+            'monthly_supply': round(float(row['Monthly Supply']), 2),
+            'avg_monthly_usage': round(float(row['Avg Monthly Usage']), 2),
+            'utilization_pct': round(float(row['Utilization %']), 2),
+            'unit': row['Unit'],
+        }
+        for _, row in flagged.iterrows()
+    ]
+
+
+def build_anomaly_alerts(anomaly_df, store, version, period):
+    """One alert dict per series flagged by the anomaly detector in period"""
+    flagged = anomaly_df[anomaly_df['Period'] == period]
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    return [
+        {
+            'timestamp': timestamp,
+            'store': store,
+            'data_version': version,
+            'type': 'anomaly',
+            'series': row['Series'],
+            'name': row['Name'],
+            'period': row['Period'],
+            'direction': row['Direction'],
+            'value': round(float(row['Value']), 2),
+            'expected': round(float(row['Expected']), 2),
+            'z_score': round(float(row['Z-Score']), 2),
+        }
+        for _, row in flagged.iterrows()
+    ]
+
+
+def emit(alerts, webhook=None):
+    """Write alerts as JSON lines to stdout, or POST them to a webhook"""
+    if not alerts:
+        return
+    lines = '\n'.join(json.dumps(alert) for alert in alerts) + '\n'
+    if webhook:
+        request = urllib.request.Request(
+            webhook,
+            data=lines.encode(),
+            headers={'Content-Type': 'application/x-ndjson'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=10):
+            pass
+    else:
+        sys.stdout.write(lines)
+        sys.stdout.flush()
+
+
+# ============================================
+# MAIN
+# ============================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Emit low-stock alerts as JSON lines')
+    parser.add_argument('--data-dir', action='append', dest='dataDirs',
+                        help='Store data directory (repeatable, default: current directory)')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Poll interval; re-evaluate only when input files change')
+    parser.add_argument('--webhook', help='POST alerts to this URL instead of printing them')
+    parser.add_argument('--all', action='store_true', help='Emit every status, not just CRITICAL/LOW')
+    return parser.parse_args(argv)
+
+
+def run_once(stores, levels, webhook=None):
+    for store in stores:
+        try:
+            result = store.evaluate()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error evaluating {store.dataDir}: {e}", file=sys.stderr)
+            continue
+        if result is None:
+            continue
+        version, comparison_df, anomaly_df, month = result
+        try:
+            emit(build_alerts(comparison_df, store.dataDir, version, levels)
+                 + build_anomaly_alerts(anomaly_df, store.dataDir, version, month), webhook)
+        except OSError as e:
+            # an unreachable webhook must not stop --watch; the store is re-evaluated next tick
+            print(f"Error delivering alerts for {store.dataDir}: {e}", file=sys.stderr)
+            store.version = None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = pipeline.STATUS_LEVELS if args.all else ALERT_LEVELS
+    # each store keeps per-file state so only changed inputs are re-read
+    stores = [StoreAlerts(dataDir) for dataDir in (args.dataDirs or ['.'])]
+
+    run_once(stores, levels, args.webhook)
+    while args.watch:
+        time.sleep(args.watch)
+        run_once(stores, levels, args.webhook)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,373 @@
+"""
+Mai Shan Yun - Store Database Loader
+Keeps store.db in sync with the CSV inputs: month sales files, recipes and the shipment schedule
+
+Every input file is one load unit keyed by its path. A file whose size and mtime are unchanged is
+skipped without being read; a touched file whose content hash is unchanged only has its stat
+refreshed. Changed files are replaced in a single transaction (delete the file's rows, batched
+executemany insert), so a rerun is idempotent and a new month costs one month of inserts.
+The database runs in WAL mode, so dashboards and reports can read while a load is writing.
+
+Usage:
+    python storeDb.py                                  # sync ./store.db with the current directory
+    python storeDb.py --data-dir store1 --db store1/store.db --watch 60
+"""
+
+import argparse
+import contextlib
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+import recipes
+
+DB_FILE = 'store.db'
+SCHEMA_VERSION = 2
+BATCH_ROWS = 5000
+BUSY_TIMEOUT_MS = 30000
+# the one-off TEXT copies of Shipment.csv / Ingredient.csv this schema replaces
+LEGACY_TABLES = ['shipments', 'ingredients']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_files (
+    path        TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sha1        TEXT NOT NULL,
+    rows        INTEGER NOT NULL,
+    loaded_at   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    source      TEXT NOT NULL,
+    month       TEXT NOT NULL,
+    period      TEXT,
+    item        TEXT NOT NULL,
+    count       REAL NOT NULL,
+    amount      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_source ON sales (source);
+CREATE INDEX IF NOT EXISTS sales_period_item ON sales (period, item);
+CREATE TABLE IF NOT EXISTS recipe_lines (
+    source          TEXT NOT NULL,
+    item            TEXT NOT NULL,
+    ingredient      TEXT NOT NULL,
+    quantity        REAL NOT NULL,
+    effective_from  TEXT,
+    effective_to    TEXT
+);
+CREATE INDEX IF NOT EXISTS recipe_lines_source ON recipe_lines (source);
+CREATE TABLE IF NOT EXISTS quality_issues (
+    source      TEXT NOT NULL,
+    item        TEXT,
+    col         TEXT NOT NULL,
+    value       TEXT,
+    issue       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS quality_issues_source ON quality_issues (source);
+CREATE TABLE IF NOT EXISTS shipments (
+    ingredient              TEXT PRIMARY KEY,
+    quantity_per_shipment   REAL,
+    unit                    TEXT,
+    number_of_shipments     INTEGER,
+    frequency               TEXT,
+    delivery_days           TEXT,
+    source                  TEXT NOT NULL
+);
+"""
+
+
+# ============================================
+# CONNECTION
+# ============================================
+def connect(dbPath):
+    """Writer connection in WAL mode with the current schema (legacy TEXT tables are replaced)"""
+    conn = sqlite3.connect(dbPath, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # WAL + NORMAL only fsyncs at checkpoints; a crash can lose the last load, never corrupt the file
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        with transaction(conn):
+            for table in LEGACY_TABLES:
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    return conn
+
+
+def connect_reader(dbPath):
+    """Read-only connection; in WAL mode it sees the last committed load and never blocks the loader"""
+    if not os.path.exists(dbPath):
+        # nothing synced yet: an empty database with the current schema
+        connect(dbPath).close()
+    conn = sqlite3.connect(f'file:{os.path.abspath(dbPath)}?mode=ro', uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on any error"""
+    # IMMEDIATE takes the write lock up front, so two loaders queue instead of deadlocking
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def insert_batched(conn, sql, rows):
+    """executemany in BATCH_ROWS chunks (bounded memory for multi-year files)"""
+    for start in range(0, len(rows), BATCH_ROWS):
+        conn.executemany(sql, rows[start:start + BATCH_ROWS])
+
+
+# ============================================
+# FILE ROWS
+# ============================================
+def _none_if_nan(values):
+    return [None if pd.isna(value) else value for value in values]
+
+
+def issue_rows(issues, source):
+    """quality_issues rows for an ingestion issues frame"""
+    return list(zip(
+        [source] * len(issues), _none_if_nan(issues['Item']), issues['Column'].astype(str),
+        _none_if_nan(issues['Value']), issues['Issue'].astype(str)
+    ))
+
+
+def sales_rows(path, source):
+    """(sales rows, issues) for one month file, typed by pipeline.load_month_checked"""
+    month_df, issues = pipeline.load_month_checked(path)
+    month = month_df['month'].iat[0]
+    start = pipeline.period_start(month)
+    period = None if pd.isna(start) else f"{start:%Y-%m-%d}"
+    return list(zip(
+        [source] * len(month_df), [month] * len(month_df), [period] * len(month_df),
+        month_df['Category'].astype(str), month_df['Count'].astype(float), month_df['Amount'].astype(float)
+    )), issues
+
+
+def recipe_rows(path, source):
+    """(long (item, ingredient, quantity) rows, issues) for a menu, sub-recipe or version table
+
+    Typed by recipes.read_typed like the dashboard's recipe book: blank cells are unused
+    ingredients, and cells that are not numbers are reported instead of loaded.
+    """
+    columns = pd.read_csv(path, nrows=0).columns
+    dateCols = [col for col in recipes.VERSION_DATE_COLS if col in columns]
+    df, issues = recipes.read_typed(path, [recipes.RECIPE_KEY] + dateCols)
+    dates = df.reindex(columns=recipes.VERSION_DATE_COLS)
+    quantities = df.drop(columns=[recipes.RECIPE_KEY] + dateCols)
+    values = quantities.to_numpy(dtype=float)
+    rowIdx, colIdx = np.nonzero(~np.isnan(values))
+    return list(zip(
+        [source] * len(rowIdx),
+        df[recipes.RECIPE_KEY].astype(str).to_numpy()[rowIdx],
+        quantities.columns.to_numpy()[colIdx],
+        values[rowIdx, colIdx],
+        _none_if_nan(dates['effective_from'].to_numpy()[rowIdx]),
+        _none_if_nan(dates['effective_to'].to_numpy()[rowIdx]),
+    )), issues
+
+
+def shipment_rows(path, source):
+    df = pd.read_csv(path).reindex(columns=[
+        'Ingredient', 'Quantity per shipment', 'Unit of shipment', 'Number of shipments', 'frequency', 'delivery_days'])
+    quantity = pd.to_numeric(df['Quantity per shipment'], errors='coerce')
+    count = pd.to_numeric(df['Number of shipments'], errors='coerce')
+    return list(zip(
+        df['Ingredient'].astype(str),
+        _none_if_nan(quantity), _none_if_nan(df['Unit of shipment']),
+        [None if pd.isna(n) else int(n) for n in count],
+        _none_if_nan(df['frequency']), _none_if_nan(df['delivery_days']),
+        [source] * len(df)
+    ))
+
+
+# ============================================
+# LOADERS
+# ============================================
+def _replace_issues(conn, issues, source):
+    conn.execute('DELETE FROM quality_issues WHERE source = ?', (source,))
+    insert_batched(conn, 'INSERT INTO quality_issues VALUES (?, ?, ?, ?, ?)', issue_rows(issues, source))
+
+
+def _replace_sales(conn, path, source):
+    rows, issues = sales_rows(path, source)
+    conn.execute('DELETE FROM sales WHERE source = ?', (source,))
+    insert_batched(conn, 'INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?)', rows)
+    _replace_issues(conn, issues, source)
+    return len(rows)
+
+
+def _replace_recipes(conn, path, source):
+    rows, issues = recipe_rows(path, source)
+    conn.execute('DELETE FROM recipe_lines WHERE source = ?', (source,))
+    insert_batched(conn, 'INSERT INTO recipe_lines VALUES (?, ?, ?, ?, ?, ?)', rows)
+    _replace_issues(conn, issues, source)
+    return len(rows)
+
+
+def _upsert_shipments(conn, path, source):
+    rows = shipment_rows(path, source)
+    insert_batched(conn, """
+        INSERT INTO shipments VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (ingredient) DO UPDATE SET
+            quantity_per_shipment = excluded.quantity_per_shipment,
+            unit = excluded.unit,
+            number_of_shipments = excluded.number_of_shipments,
+            frequency = excluded.frequency,
+            delivery_days = excluded.delivery_days,
+            source = excluded.source
+    """, rows)
+    # ingredients dropped from the schedule
+    current = [row[0] for row in rows]
+    conn.execute(f"DELETE FROM shipments WHERE ingredient NOT IN ({', '.join('?' * len(current))})", current)
+    return len(rows)
+
+
+LOADERS = {'sales': _replace_sales, 'recipes': _replace_recipes, 'shipments': _upsert_shipments}
+CLEANUP = {
+    'sales': 'DELETE FROM sales WHERE source = ?',
+    'recipes': 'DELETE FROM recipe_lines WHERE source = ?',
+    'shipments': 'DELETE FROM shipments WHERE source = ?',
+}
+
+
+def source_files(dataDir='.'):
+    """(kind, path) of every input the database mirrors"""
+    sources = [('sales', path) for path in pipeline.sales_files(dataDir)]
+    sources += [('recipes', path) for path in pipeline.recipe_files(dataDir) if os.path.exists(path)]
+    shipmentPath = os.path.join(dataDir, 'Shipment.csv')
+    if os.path.exists(shipmentPath):
+        sources.append(('shipments', shipmentPath))
+    return sources
+
+
+def _sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sync(conn, dataDir='.'):
+    """Load new or changed input files and drop rows of deleted ones; returns {source: rows loaded}"""
+    known = {path: (size, mtime, sha1) for path, size, mtime, sha1
+             in conn.execute('SELECT path, size, mtime_ns, sha1 FROM source_files')}
+    loaded = {}
+    seen = set()
+    for kind, path in source_files(dataDir):
+        # sources are stored relative to the data directory, so the database can move with it
+        source = os.path.relpath(path, dataDir)
+        seen.add(source)
+        stat = os.stat(path)
+        previous = known.get(source)
+        if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            continue
+        sha1 = _sha1(path)
+        now = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with transaction(conn):
+            if previous is not None and previous[2] == sha1:
+                # touched but identical: remember the new stat so the next run skips it cheaply
+                conn.execute('UPDATE source_files SET size = ?, mtime_ns = ? WHERE path = ?',
+                             (stat.st_size, stat.st_mtime_ns, source))
+                continue
+            rows = LOADERS[kind](conn, path, source)
+            conn.execute('INSERT OR REPLACE INTO source_files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (source, kind, stat.st_size, stat.st_mtime_ns, sha1, rows, now))
+        loaded[source] = rows
+
+    for source in set(known) - seen:
+        with transaction(conn):
+            kind = conn.execute('SELECT kind FROM source_files WHERE path = ?', (source,)).fetchone()[0]
+            conn.execute(CLEANUP[kind], (source,))
+            conn.execute('DELETE FROM quality_issues WHERE source = ?', (source,))
+            conn.execute('DELETE FROM source_files WHERE path = ?', (source,))
+        loaded[source] = 0
+    if loaded:
+        # fold the WAL back into the main file when no reader is in the way
+        conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+    return loaded
+
+
+# ============================================
+# READERS
+# ============================================
+def read_sales(dbPath):
+    """All loaded sales in the pipeline.load_sales layout (Category, Count, Amount, month)"""
+    conn = connect_reader(dbPath)
+    try:
+        return pd.read_sql_query(
+            'SELECT item AS Category, count AS Count, amount AS Amount, month FROM sales ORDER BY period, rowid', conn)
+    finally:
+        conn.close()
+
+
+def read_issues(dbPath):
+    """Data-quality issues of the loaded files, in the ingestion.ISSUE_COLS layout"""
+    conn = connect_reader(dbPath)
+    try:
+        return pd.read_sql_query(
+            'SELECT source AS File, item AS Item, col AS "Column", value AS Value, issue AS Issue '
+            'FROM quality_issues ORDER BY source, rowid', conn)
+    finally:
+        conn.close()
+
+
+# ============================================
+# MAIN
+# ============================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Sync store.db with the sales, recipe and shipment files')
+    parser.add_argument('--data-dir', dest='dataDir', default=pipeline.DATA_DIR, help='Store data directory')
+    parser.add_argument('--db', help=f'Database path (default: <data-dir>/{DB_FILE})')
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help='Poll interval; load files as they change')
+    return parser.parse_args(argv)
+
+
+def run_once(conn, dataDir):
+    try:
+        loaded = sync(conn, dataDir)
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        print(f"Error loading {dataDir}: {e}", file=sys.stderr)
+        return
+    for source, rows in sorted(loaded.items()):
+        print(f"{source}: {rows} row(s)" if rows else f"{source}: removed")
+        for col, issue, count in conn.execute(
+                'SELECT col, issue, COUNT(*) FROM quality_issues WHERE source = ? GROUP BY col, issue', (source,)):
+            print(f"  warning: {col}: {count} row(s) {issue}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect(args.db or os.path.join(args.dataDir, DB_FILE))
+    try:
+        run_once(conn, args.dataDir)
+        while args.watch:
+            time.sleep(args.watch)
+            run_once(conn, args.dataDir)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        pass
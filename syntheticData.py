@@ -0,0 +1,64 @@
+"""
+Mai Shan Yun - Synthetic Scale Datasets
+Generates a data directory shaped like the real one (csv_files/, Ingredient.csv, Shipment.csv)
+with many more menu items, for load and performance testing
+
+Usage:
+    python syntheticData.py synthetic/ --items 2000 --months 12
+"""
+
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+
+
+def generate(outDir, items=1000, months=12, seed=0, baseDir='.'):
+    """Write a synthetic dataset to outDir and return its path"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(outDir, 'csv_files'), exist_ok=True)
+
+    # recipes: the real menu plus synthetic items using 2-6 of the real ingredient columns
+    recipes = pd.read_csv(os.path.join(baseDir, 'Ingredient.csv'))
+    ingredientCols = [col for col in recipes.columns if col != 'Item name']
+    extra = max(items - len(recipes), 0)
+    quantities = np.zeros((extra, len(ingredientCols)))
+    for row in range(extra):
+        cols = rng.choice(len(ingredientCols), size=rng.integers(2, 7), replace=False)
+        quantities[row, cols] = rng.choice([0.5, 1, 10, 20, 50, 100, 140, 300, 350], size=len(cols))
+    synthetic = pd.DataFrame(quantities, columns=ingredientCols).replace(0, np.nan)
+    synthetic.insert(0, 'Item name', [f'Synthetic Item {i:05d}' for i in range(extra)])
+    recipes = pd.concat([recipes, synthetic], ignore_index=True)
+    recipes.to_csv(os.path.join(outDir, 'Ingredient.csv'), index=False)
+
+    shutil.copy(os.path.join(baseDir, 'Shipment.csv'), os.path.join(outDir, 'Shipment.csv'))
+
+    # sales: one row per item per month, in the PDF-extracted string format of the real files
+    names = recipes['Item name'].to_numpy()
+    prices = rng.uniform(3, 20, size=len(names)).round(2)
+    popularity = rng.gamma(1.5, 40, size=len(names))
+    for month in pipeline.MONTH_ORDER[:months]:
+        counts = rng.poisson(popularity * rng.uniform(0.8, 1.2))
+        pd.DataFrame({
+            'source_page': np.arange(len(names)) // 40 + 1,
+            'source_table': 1,
+            'Item Name': names,
+            'Count': [f'{c:,.2f}' for c in counts],
+            'Amount': [f'{a:,.2f}' for a in counts * prices],
+        }).to_csv(os.path.join(outDir, 'csv_files', f'{month}.csv'), index=False)
+
+    return outDir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic-scale dataset')
+    parser.add_argument('outDir')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--months', type=int, default=12, choices=range(1, 13))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.outDir, args.items, args.months, args.seed))
@@ -0,0 +1,38 @@
+import os
+import shutil
+
+import pytest
+
+import analyticsExport
+import refresher
+
+pytest.importorskip('pyarrow')
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def copy_store(tmp_path, months):
+    for name in ('Ingredient.csv', 'Shipment.csv'):
+        shutil.copy(os.path.join(HERE, name), tmp_path / name)
+    (tmp_path / 'csv_files').mkdir(exist_ok=True)
+    for month in months:
+        shutil.copy(os.path.join(HERE, 'csv_files', f'{month}.csv'), tmp_path / 'csv_files' / f'{month}.csv')
+
+
+def test_only_changed_partitions_are_rewritten(tmp_path):
+    copy_store(tmp_path, ['may', 'june'])
+    outDir = str(tmp_path / 'export')
+    builder = refresher.SnapshotBuilder(str(tmp_path))
+    first = analyticsExport.export_snapshot(builder.build(), outDir)
+    assert ('monthly_usage', '2025-05') in first and ('comparison', 'all') in first
+    assert analyticsExport.export_snapshot(builder.build(force=True), outDir) == []
+
+    copy_store(tmp_path, ['july'])
+    snapshot = builder.build()
+    written = analyticsExport.export_snapshot(snapshot, outDir)
+    # a new month adds its own partitions; the average-based comparison changes with it
+    assert sorted(written) == [('comparison', 'all'), ('item_summary', '2025-07'), ('monthly_usage', '2025-07')]
+
+    usage = analyticsExport.read_dataset(outDir, 'monthly_usage').to_pandas()
+    assert sorted(set(usage['month'])) == sorted(snapshot.months)
+    assert usage['Usage'].sum() == pytest.approx(snapshot.monthly_usage.to_numpy().sum())
@@ -0,0 +1,40 @@
+import pandas as pd
+
+import anomalyDetection
+
+
+def feed(detector, periods):
+    """Update the detector with one {name: value} dict per period; returns every flagged row"""
+    flagged = [detector.update(f'p{i}', pd.Series(values, dtype=float)) for i, values in enumerate(periods)]
+    return pd.concat(flagged, ignore_index=True)
+
+
+def test_collapse_and_spike_are_flagged_against_the_previous_state():
+    history = [{'Ramen': 100, 'Tea': 50}, {'Ramen': 104, 'Tea': 52}, {'Ramen': 98, 'Tea': 49}, {'Ramen': 101, 'Tea': 51}]
+    # Ramen collapses and Tea vanishes from the month file, which counts as 0
+    flagged = feed(anomalyDetection.EwmaDetector('item'), history + [{'Ramen': 300}])
+    assert flagged[['Name', 'Period', 'Direction']].values.tolist() == [['Ramen', 'p4', 'spike'], ['Tea', 'p4', 'drop']]
+    assert flagged['Expected'].iat[0] == pd.Series([h['Ramen'] for h in history]).ewm(alpha=0.3, adjust=False).mean().iat[-1]
+
+
+def test_young_and_low_volume_series_are_not_scored():
+    assert feed(anomalyDetection.EwmaDetector('item'), [{'Ramen': 100}, {'Ramen': 100}, {'Ramen': 900}]).empty
+    # a spike from 2 to 12 units is noise, not an anomaly
+    assert feed(anomalyDetection.EwmaDetector('item'), [{'Tea': 2}] * 4 + [{'Tea': 12}]).empty
+
+
+def test_zero_level_series_never_flags():
+    # level and deviation stay 0, so the scale is 0 and every z-score is 0
+    detector = anomalyDetection.EwmaDetector('ingredient')
+    assert feed(detector, [{'Beef': 0}] * 5 + [{'Beef': 500}]).empty
+    assert detector.state().loc['Beef', 'seen'] == 6
+
+
+def test_an_outlier_is_clipped_before_it_updates_the_level():
+    detector = anomalyDetection.EwmaDetector('item')
+    feed(detector, [{'Ramen': 100}] * 4 + [{'Ramen': 10000}])
+    state = detector.state().loc['Ramen']
+    # one clipped step of at most threshold x scale (scale floor = 25% of the level)
+    assert state['level'] <= 100 + 0.3 * 3.5 * 25
+    # so the return to normal is not flagged as a drop
+    assert feed(detector, [{'Ramen': 100}]).empty
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import demandForecast
+import pipeline
+import refresher
+
+
+def counts(months, items=('Ramen', 'Tea')):
+    rows = np.arange(len(months) * len(items), dtype=float).reshape(len(months), len(items)) + 1
+    return pd.DataFrame(rows, index=pd.Index(months, name='month'), columns=list(items))
+
+
+def test_forecast_covers_every_item_and_period():
+    forecast_df, starts = demandForecast.forecast_items(counts(['may', 'june', 'july', 'august']), horizon=2)
+    assert forecast_df['Period'].unique().tolist() == ['september 2025', 'october 2025']
+    assert len(forecast_df) == 4
+    assert (forecast_df['Lower'] <= forecast_df['Forecast']).all()
+    assert (forecast_df['Forecast'] <= forecast_df['Upper']).all()
+    assert starts['october 2025'] == pd.Timestamp('2025-10-01')
+
+
+def test_horizon_crosses_the_year():
+    forecast_df, _ = demandForecast.forecast_items(counts(['october', 'november', 'december']), horizon=14)
+    assert forecast_df['Period'].iloc[-1] == 'february 2027'
+
+
+def test_undatable_month_does_not_change_the_regressors():
+    # 2 dated months fit a level only, although the undatable one makes 3 rows (a trend's worth)
+    history = counts(['june', 'extra', 'july'])
+    forecast_df, _ = demandForecast.forecast_items(history, horizon=1)
+    dated, _ = demandForecast.forecast_items(history.drop(index='extra'), horizon=1)
+    np.testing.assert_allclose(forecast_df['Forecast'], dated['Forecast'])
+    with pytest.raises(ValueError):
+        demandForecast.forecast_items(history, horizon=0)
+
+
+def test_no_dated_months_gives_an_empty_forecast():
+    book = pipeline.recipes.RecipeBook(pd.DataFrame({'Category': ['Ramen'], 'Beef(g)': [100.0]}), key='Category')
+    forecast_df, demand = demandForecast.build_forecast(counts(['extra', 'specials']), book)
+    assert forecast_df.empty and list(forecast_df.columns) == demandForecast.FORECAST_COLS
+    assert demand.empty
+
+
+def write_dataset(tmp_path, months):
+    (tmp_path / 'csv_files').mkdir()
+    for month in months:
+        (tmp_path / 'csv_files' / f'{month}.csv').write_text('Item Name,Count,Amount\nBeef Ramen,4,40\n')
+    (tmp_path / 'Ingredient.csv').write_text('Item name,braised beef used (g)\nBeef Ramen,100\n')
+    (tmp_path / 'Shipment.csv').write_text('Ingredient,Quantity per shipment,Unit of shipment,Number of shipments,frequency\n'
+                                           'Beef,40,lbs,1,weekly\n')
+    return refresher.SnapshotBuilder(str(tmp_path)).build()
+
+
+def test_snapshot_builds_with_an_undatable_month_file(tmp_path):
+    snapshot = write_dataset(tmp_path, ('june', 'july', 'extra'))
+    assert 'extra' in snapshot.months
+    assert not snapshot.forecast_df.empty
+
+
+def test_snapshot_builds_when_no_month_can_be_dated(tmp_path):
+    snapshot = write_dataset(tmp_path, ('extra',))
+    assert snapshot.forecast_df.empty
+    assert snapshot.ledger_df.empty and snapshot.stockout_df.empty
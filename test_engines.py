@@ -0,0 +1,37 @@
+import pytest
+
+import engines
+import pipeline
+
+pytest.importorskip('duckdb')
+
+
+def write_store(tmp_path):
+    (tmp_path / 'Ingredient.csv').write_text('Item name,Beef (g),Rice (g)\nBeef Ramen,100,\nFried Rice,20,"1,500"\n')
+    (tmp_path / 'RecipeVersions.csv').write_text('Item name,Beef (g),Rice (g),effective_from,effective_to\n'
+                                                 'Beef Ramen,80,,2025-06-01,\n')
+    months = tmp_path / 'csv_files'
+    months.mkdir()
+    (months / 'may.csv').write_text('Item Name,Count,Amount\nBeef Ramen,"1,200","6,921.26"\nFried Rice,n/a,9\n'
+                                    'Tea,2,\n,1,3\n')
+    (months / 'june.csv').write_text('Item Name,Count,Amount\nBeef Ramen,10,100\nFried Rice,-1.5,12\nBeef Ramen,5,50\n')
+    (months / 'july.csv').write_text('Item Name,Count,Amount\n')
+
+
+def test_duckdb_matches_the_pandas_engine(tmp_path):
+    write_store(tmp_path)
+    assert engines.compare_engines(str(tmp_path), engines.get_engine('duckdb')) == []
+
+    book = pipeline.load_recipe_book(str(tmp_path))
+    months = engines.get_engine('duckdb').load_months(pipeline.sales_files(str(tmp_path)), book)
+    may, june = (months[str(tmp_path / 'csv_files' / f'{name}.csv')] for name in ('may', 'june'))
+    assert may[1]['Beef (g)'] == 120000
+    # June is on the 80 g version; the negative fractional count is reported and kept
+    assert june[1]['Beef (g)'] == 15 * 80 - 1.5 * 20
+    assert set(may[2]['Issue']) == {'unparseable', 'missing', 'missing item name'}
+    assert set(june[2]['Issue']) == {'negative', 'fractional count'}
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        engines.get_engine('spark')
@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+import plotly.express as px
+import plotly.tools
+import pandas as pd
+
+import figures
+
+
+def test_hover_data_is_compacted_and_the_spec_is_served_as_is():
+    df = pd.DataFrame({'Item Name': ['Ramen', 'Tea'], 'Gross Margin': [10.123456, 2.5],
+                       'Food Cost': [3.333333, 1.0], 'Rank': [1, 2]})
+    fig = px.bar(df, x='Item Name', y='Gross Margin', hover_data={'Food Cost': ':.2f', 'Rank': True})
+    spec = figures.to_spec(fig)
+    trace = figures.SpecFigure(spec).to_dict()['data'][0]
+    assert trace is spec['data'][0]
+    # compacted in place before serializing
+    np.testing.assert_allclose(np.asarray(fig.data[0].customdata, dtype=float)[:, 0], [3.33, 1.0])
+    # st.plotly_chart's conversion keeps the cached spec instead of rebuilding a Figure
+    assert plotly.tools.return_figure_from_figure_or_data(figures.SpecFigure(spec), True) is spec
+    json.dumps(spec)
+
+
+def test_mixed_customdata_rounds_only_numeric_columns():
+    values = np.array([['Ramen', 1.23456], ['Tea', 2.0]], dtype=object)
+    compacted = figures.compact_values(values)
+    assert compacted[:, 0].tolist() == ['Ramen', 'Tea']
+    assert compacted[:, 1].tolist() == [1.23, 2.0]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+import ingestion
+
+
+def test_month_numbers_are_typed_in_one_pass(tmp_path):
+    path = tmp_path / 'may.csv'
+    path.write_text('Item Name,Count,Amount\nBeef Ramen,"1,234","6,921.26"\nTea,n/a,4.5\nFried Rice,,-3\n')
+    raw = ingestion.read_month_raw(str(path))
+    month_df, issues = ingestion.validate_month(raw, 'may.csv')
+    assert month_df['Count'].tolist() == [1234, 0, 0]
+    assert month_df['Amount'].tolist() == [6921.26, 4.5, -3]
+    assert set(zip(issues['Item'], issues['Column'], issues['Value'], issues['Issue'])) == {
+        ('Tea', 'Count', 'n/a', 'unparseable'), ('Fried Rice', 'Count', '', 'missing'),
+        ('Fried Rice', 'Amount', '-3.0', 'negative')}
+
+
+def test_clean_numeric_month_keeps_its_dtype_and_reports_nothing(tmp_path):
+    path = tmp_path / 'june.csv'
+    path.write_text('Item Name,Count,Amount\nBeef Ramen,"1,200",10\nTea,2,"1,000.50"\n')
+    month_df, issues = ingestion.validate_month(ingestion.read_month_raw(str(path)), 'june.csv')
+    assert issues.empty and list(issues.columns) == ingestion.ISSUE_COLS
+    assert month_df['Count'].tolist() == [1200, 2] and month_df['Amount'].tolist() == [10, 1000.5]
+
+
+def test_type_table_reports_text_and_keeps_blanks_unused():
+    df = pd.DataFrame({'Item name': ['Beef Ramen', 'Tea'], 'Beef (g)': ['1,200', None], 'Egg': ['n/a', '2']})
+    typed, issues = ingestion.type_table(df, ['Item name'], 'Ingredient.csv')
+    assert typed['Beef (g)'].tolist()[0] == 1200 and pd.isna(typed['Beef (g)'].iat[1])
+    assert typed['Egg'].dtype == float
+    assert issues[['Item', 'Column', 'Value', 'Issue']].values.tolist() == [['Beef Ramen', 'Egg', 'n/a', 'unparseable']]
+    summary = ingestion.summarize_issues(issues)
+    assert summary.values.tolist() == [['Ingredient.csv', 'Egg', 'unparseable', 1]]
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+import inventoryLedger
+
+
+def test_estimated_opening_covers_usage_until_first_receipt():
+    receipts = np.array([[0, 5], [0, 0], [10, 0], [0, 0]], dtype=float)
+    usage = np.array([[1, 2], [1, 2], [1, 2], [1, 2]], dtype=float)
+    opening = inventoryLedger.estimate_opening(receipts, usage)
+    assert opening.tolist() == [2, 0]
+    level = inventoryLedger.on_hand(receipts, usage, opening)
+    assert level[:, 0].tolist() == [1, 0, 9, 8]
+
+
+def test_stockouts_only_count_after_first_receipt():
+    dates = pd.date_range('2025-05-01', periods=4)
+    ledger_df = pd.DataFrame({'Ramen': [-1.0, -2.0, 3.0, -1.0], 'Egg': [-1.0, 1.0, 1.0, 1.0]}, index=dates)
+    receipts_df = pd.DataFrame({'Ramen': [0.0, 0.0, 5.0, 0.0], 'Egg': [1.0, 0.0, 0.0, 0.0]}, index=dates)
+    stockouts = inventoryLedger.stockout_dates(ledger_df, receipts_df)
+    assert stockouts['Ramen'] == dates[3]
+    assert stockouts['Egg'] == dates[0]
+    report = inventoryLedger.stockout_report(ledger_df, receipts_df, dates[1])
+    assert report['Ingredient'].tolist() == ['Egg', 'Ramen']
+    assert report['Projected'].tolist() == [False, True]
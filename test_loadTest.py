@@ -0,0 +1,47 @@
+import loadTest
+
+
+class Radio:
+    label = 'Select Analysis:'
+    options = ['Overview', 'Inventory Analysis']
+
+    def __init__(self, app):
+        self.app = app
+        self.value = 'Overview'
+
+    def set_value(self, value):
+        if self.app.failures.pop(0):
+            raise KeyError('$$ID-widget-None')
+        self.value = value
+
+
+class FlakyApp:
+    """AppTest stand-in whose widget changes raise on the listed actions"""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.radio = []
+        self.selectbox = []
+        self.slider = []
+        self.exception = []
+
+    def run(self):
+        if not self.radio:
+            self.radio = [Radio(self)]
+
+
+def test_raising_session_is_counted_not_fatal(monkeypatch):
+    apps = []
+
+    def from_file(path, default_timeout):
+        apps.append(FlakyApp([True, False] if not apps else [False] * 10))
+        return apps[-1]
+
+    monkeypatch.setattr(loadTest.AppTest, 'from_file', staticmethod(from_file))
+    samples = loadTest.run_session('dash2.py', actions=4, seed=0, timeout=1)
+    errors = [error for _, _, error in samples if error is not None]
+    assert errors == ["KeyError: '$$ID-widget-None'"]
+    # the broken session was reloaded and the remaining actions still ran
+    assert len(apps) == 2 and len(samples) == 5
+    report = loadTest.summarize(samples)
+    assert sum(stats['errors'] for stats in report.values()) == 1
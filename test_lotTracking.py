@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import inventoryLedger
+import lotTracking
+
+
+def test_lot_expires_after_its_shelf_life():
+    receipts = np.array([[10.0], [0], [0], [0], [0]])
+    usage = np.full((5, 1), 2.0)
+    result = lotTracking.simulate_fifo(receipts, usage, [3])
+    # received day 0, usable days 0-2: 6 used, the other 4 spoil on day 3
+    assert result['spoiled'][:, 0].tolist() == [0, 0, 0, 4, 0]
+    assert result['unmet'][:, 0].tolist() == [0, 0, 0, 2, 2]
+    # a fractional shelf life rounds up, not down
+    np.testing.assert_array_equal(lotTracking.simulate_fifo(receipts, usage, [2.5])['spoiled'], result['spoiled'])
+    with pytest.raises(ValueError):
+        lotTracking.simulate_fifo(receipts, usage, [0])
+
+
+def test_spoilage_starts_from_the_ledger_opening():
+    dates = pd.date_range('2025-05-01', periods=4)
+    receipts_df = pd.DataFrame({'Cilantro': [0.0, 0.0, 5.0, 0.0]}, index=dates)
+    usage_df = pd.DataFrame({'Cilantro': [1.0, 1.0, 1.0, 1.0]}, index=dates)
+    opening = inventoryLedger.opening_stock(receipts_df, usage_df)
+    assert opening['Cilantro'] == 2
+    report = lotTracking.spoilage_report(receipts_df, usage_df, pd.Series({'Cilantro': 5.0}), opening=opening)
+    assert report['Unmet Demand'].iloc[0] == 0
+    assert report['Used'].iloc[0] == 4
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import margins
+import recipes
+
+PRICES = pd.DataFrame({
+    'Ingredient': ['Ramen', 'Egg', 'Egg', 'Beef'],
+    'Price per unit': [0.5, 0.2, 0.3, 4.5359237],
+    'Unit': ['count', 'count', 'count', 'lbs'],
+    'Supplier': ['', '', '', ''],
+    'effective_from': [None, None, '2025-06-01', None],
+})
+
+
+def test_item_margins_use_the_recipe_and_price_in_effect_each_month():
+    base = pd.DataFrame({'Category': ['Ramen Bowl', 'Tea'], 'Ramen (count)': [1.0, np.nan],
+                         'Egg(count)': [2.0, np.nan], 'braised beef used (g)': [100.0, np.nan]})
+    versions = pd.DataFrame({'Category': ['Ramen Bowl'], 'Ramen (count)': [1.0], 'Egg(count)': [1.0],
+                             'braised beef used (g)': [100.0], 'effective_from': ['2025-06-01'], 'effective_to': [None]})
+    book = recipes.RecipeBook(base, versions, key='Category')
+    sales = pd.DataFrame({'Category': ['Ramen Bowl', 'Ramen Bowl', 'Tea'], 'Count': [10.0, 4.0, 3.0],
+                          'Amount': [100.0, 40.0, 9.0], 'month': ['May', 'June', 'May']})
+    margin_df = margins.calculate_margins(sales, book, PRICES, ['May', 'June']).set_index(['Category', 'month'])
+
+    # May: 1 x 0.5 + 2 x 0.2 + 100 g beef at 1 cent per gram; June: one egg at the new 0.3 price
+    assert margin_df.loc[('Ramen Bowl', 'May'), 'Food Cost'] == pytest.approx(10 * 1.9)
+    assert margin_df.loc[('Ramen Bowl', 'June'), 'Food Cost'] == pytest.approx(4 * 1.8)
+    assert margin_df.loc[('Ramen Bowl', 'May'), 'Margin %'] == pytest.approx(81)
+    # an item whose recipe row is blank costs nothing and takes the rest of the margin share
+    assert margin_df.loc[('Tea', 'May'), 'Food Cost'] == 0
+    assert margin_df.xs('May', level='month')['Margin Share %'].sum() == pytest.approx(100)
+
+    summary = margins.summarize_margins(margin_df.reset_index())
+    assert summary['Category'].tolist() == ['Ramen Bowl', 'Tea']
+    assert summary['Gross Margin'].iat[0] == pytest.approx(140 - 19 - 7.2)
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import threading
+
+import pandas as pd
+
+import orderStream
+import pipeline
+
+
+def events(*rows):
+    return [json.dumps(row) for row in rows]
+
+
+def live_usage(tmp_path):
+    (tmp_path / 'Ingredient.csv').write_text('Item name,braised beef used (g)\nBeef Ramen,100\n')
+    (tmp_path / 'Shipment.csv').write_text('Ingredient,Quantity per shipment,Unit of shipment,Number of shipments,frequency\n'
+                                           'Beef,40,lbs,1,weekly\n')
+    shipments_df = pipeline.load_shipments(str(tmp_path))
+    return orderStream.LiveUsage(pipeline.load_recipe_book(str(tmp_path)), shipments_df,
+                                 pd.Series({'braised beef used (g)': 3000.0}))
+
+
+def test_naive_timestamps_are_store_time():
+    lines_df, rejected = orderStream.order_lines(events(
+        {'timestamp': '2025-10-03T23:30:00', 'order_id': 'A', 'item': 'Beef Ramen', 'count': 2},
+        {'timestamp': 'soon', 'order_id': 'B', 'item': 'Beef Ramen'},
+        {'order_id': 'C', 'item': 'Beef Ramen'},
+    ), tz='America/Chicago')
+    assert lines_df['timestamp'].tolist() == [pd.Timestamp('2025-10-03 23:30')]
+    assert rejected == 2
+
+
+def test_utc_timestamps_convert_to_store_time_alone_and_mixed():
+    utc = {'timestamp': '2025-10-04T03:30:00Z', 'order_id': 'A', 'item': 'Beef Ramen'}
+    naive = {'timestamp': '2025-10-03T12:00:00', 'order_id': 'B', 'item': 'Beef Ramen'}
+    only, _ = orderStream.order_lines(events(utc), tz='America/Chicago')
+    mixed, rejected = orderStream.order_lines(events(utc, naive), tz='America/Chicago')
+    assert only['timestamp'].dtype == 'datetime64[ns]'
+    # 03:30 UTC is still the evening before in Chicago
+    assert only['timestamp'].tolist() == [pd.Timestamp('2025-10-03 22:30')]
+    assert mixed['timestamp'].tolist() == [pd.Timestamp('2025-10-03 22:30'), pd.Timestamp('2025-10-03 12:00')]
+    assert rejected == 0
+
+
+def test_batches_fold_usage_and_count_split_orders_once(tmp_path):
+    state = live_usage(tmp_path)
+    first = {'timestamp': '2025-10-03T12:00:00', 'order_id': 'A', 'lines': [{'item': 'Beef Ramen', 'count': 2, 'amount': 20}]}
+    split = {'timestamp': '2025-10-03T12:00:05', 'order_id': 'A', 'lines': [{'item': 'Beef Ramen', 'count': 1, 'amount': 10}]}
+    for batch in (events(first), events(split, {'timestamp': '2025-10-03T13:00:00', 'item': 'Tea'})):
+        state.apply(orderStream.order_lines(batch)[0])
+    totals = state.totals()
+    assert totals['orders_today'] == 2
+    assert totals['revenue_today'] == 30
+    assert totals['unknown_items'] == 1
+    beef = state.aggregates().set_index('Ingredient').loc['Beef']
+    assert beef['Usage Today'] == 300
+    assert beef['Unit'] == 'g'
+
+
+def test_consume_publishes_each_batch_off_the_event_loop(tmp_path):
+    state = live_usage(tmp_path)
+    published = []
+
+    def publish(state):
+        published.append((state.lines, threading.current_thread() is threading.main_thread()))
+
+    async def replay():
+        queue = asyncio.Queue()
+        for raw in events({'timestamp': '2025-10-03T12:00:00', 'item': 'Beef Ramen'}):
+            await queue.put(raw)
+        await queue.put(None)
+        await orderStream.consume(queue, state, publish, batchWait=0.01)
+
+    asyncio.run(replay())
+    assert published == [(1, False)]
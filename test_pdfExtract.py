@@ -0,0 +1,35 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip('pdfplumber')
+
+import pdfExtract
+from pdfminer.pdftypes import PDFStream
+
+
+def resources_hash(fontData):
+    digest = hashlib.sha1()
+    font = {'Subtype': 'Type1', 'FontFile': PDFStream({'Length': len(fontData)}, fontData)}
+    pdfExtract._hash_object(digest, {'Font': {'F1': font}, 'XObject': {}}, set())
+    return digest.hexdigest()
+
+
+def test_resources_are_part_of_the_page_hash():
+    assert resources_hash(b'glyphs') == resources_hash(b'glyphs')
+    assert resources_hash(b'glyphs') != resources_hash(b'other glyphs')
+
+
+def test_cache_version_changes_every_page_hash(tmp_path, monkeypatch):
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig = plt.figure()
+    fig.text(0.1, 0.5, 'Beef Ramen 12 180.00')
+    fig.savefig(tmp_path / 'may.pdf')
+    plt.close(fig)
+
+    before = pdfExtract.page_hashes(str(tmp_path / 'may.pdf'))
+    assert pdfExtract.page_hashes(str(tmp_path / 'may.pdf')) == before
+    monkeypatch.setattr(pdfExtract, 'CACHE_VERSION', pdfExtract.CACHE_VERSION + 1)
+    assert pdfExtract.page_hashes(str(tmp_path / 'may.pdf')) != before
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pipeline
+
+
+def recipe():
+    return pd.DataFrame({'Beef (g)': [100.0, 20.0, 0.0], 'Egg': [1.0, 0.0, 0.0]},
+                        index=pd.Index(['Beef Ramen', 'Fried Rice', 'Tea'], name='Category'))
+
+
+def month(name, **counts):
+    return pd.DataFrame({'Category': list(counts), 'Count': list(counts.values()), 'month': name})
+
+
+def test_contributions_are_sparse_and_add_up_to_month_usage():
+    may = month('May', **{'Beef Ramen': 2.0, 'Fried Rice': 10.0, 'Tea': 5.0, 'Boba': 1.0})
+    rows = pipeline.month_contributions(may, recipe())
+    # zero-usage pairs (Tea, Fried Rice x Egg) and items without a recipe get no row
+    assert sorted(zip(rows['Category'], rows['Ingredient'])) == [
+        ('Beef Ramen', 'Beef (g)'), ('Beef Ramen', 'Egg'), ('Fried Rice', 'Beef (g)')]
+    totals = rows.groupby('Ingredient')['Usage'].sum()
+    pd.testing.assert_series_equal(totals, pipeline.month_usage(may, recipe()).rename_axis('Ingredient'),
+                                   check_names=False)
+
+
+def test_index_ranks_items_per_ingredient_and_month():
+    contribution_df = pd.concat([
+        pipeline.month_contributions(month('May', **{'Beef Ramen': 2.0, 'Fried Rice': 20.0}), recipe()),
+        pipeline.month_contributions(month('June', **{'Beef Ramen': 9.0, 'Fried Rice': 5.0}), recipe()),
+    ], ignore_index=True)
+    index_df = pipeline.contribution_index(contribution_df)
+
+    may = pipeline.ingredient_contributors(index_df, 'Beef (g)', 'May')
+    assert may['Category'].tolist() == ['Fried Rice', 'Beef Ramen'] and may['Rank'].tolist() == [1, 2]
+    assert may['Share %'].tolist() == pytest.approx([400 / 6, 200 / 6])
+    overall = pipeline.ingredient_contributors(index_df, 'Beef (g)')
+    assert overall['Category'].tolist() == ['Beef Ramen', 'Fried Rice']
+    assert overall['Usage'].tolist() == [1100, 500]
+    assert pipeline.ingredient_contributors(index_df, 'Rice (g)').empty
+    assert np.isclose(pipeline.ingredient_contributors(index_df, 'Egg', 'June')['Share %'], 100).all()
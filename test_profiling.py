@@ -0,0 +1,28 @@
+import os
+import threading
+import time
+
+import profiling
+
+
+def test_capture_is_written_when_its_thread_ends_unfinished(tmp_path):
+    captures = []
+
+    def rerun():
+        captures.append(profiling.start('rerun', 'cprofile', str(tmp_path)))
+        with profiling.stage('compute_snapshot'):
+            time.sleep(0.01)
+        # like st.stop: the thread ends without reaching finish()
+
+    thread = threading.Thread(target=rerun)
+    thread.start()
+    thread.join()
+    for _ in range(50):
+        if captures[0].path is not None:
+            break
+        time.sleep(0.05)
+    assert os.path.exists(captures[0].path + '.json')
+    assert os.path.exists(captures[0].path + '.prof')
+    # finishing again returns the same capture instead of writing a second one
+    assert captures[0].finish() == captures[0].path
+    assert not profiling._active
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+import pipeline
+import recipes
+
+
+def write(path, text):
+    path.write_text(text)
+    return path
+
+
+def test_flatten_expands_nested_components():
+    menu = pd.DataFrame({'Item name': ['Beef Ramen'], 'Noodles(g)': [100.0], 'Braised Beef': [2.0]})
+    sub = pd.DataFrame({'Item name': ['Braised Beef', 'Sauce'], 'Beef(g)': [50.0, float('nan')],
+                        'Sauce': [0.5, float('nan')], 'Soy(g)': [float('nan'), 10.0]})
+    flat = recipes.flatten_recipes(menu, sub).set_index('Item name')
+    assert flat.loc['Beef Ramen', 'Noodles(g)'] == 100
+    assert flat.loc['Beef Ramen', 'Beef(g)'] == 100
+    assert flat.loc['Beef Ramen', 'Soy(g)'] == 10
+    assert 'Braised Beef' not in flat.columns
+
+
+def test_flatten_rejects_cycles():
+    menu = pd.DataFrame({'Item name': ['Bowl'], 'Dough': [1.0]})
+    sub = pd.DataFrame({'Item name': ['Dough', 'Starter'], 'Starter': [1.0, float('nan')],
+                        'Dough': [float('nan'), 1.0]})
+    with pytest.raises(recipes.RecipeCycleError):
+        recipes.flatten_recipes(menu, sub)
+
+
+def test_malformed_quantities_are_reported_with_sub_recipes(tmp_path):
+    write(tmp_path / 'Ingredient.csv', 'Item name,Noodles(g),Braised Beef\nBeef Ramen,abc,1\n')
+    write(tmp_path / 'SubRecipe.csv', 'Item name,Beef(g)\nBraised Beef,5O\n')
+    table, issues = pipeline.load_ingredients_checked(str(tmp_path))
+    assert set(zip(issues['File'], issues['Column'], issues['Value'])) == {
+        ('Ingredient.csv', 'Noodles(g)', 'abc'), ('SubRecipe.csv', 'Beef(g)', '5O')}
+    assert table.set_index('Category').loc['Beef Ramen'].fillna(0).sum() == 0
+
+
+def test_recipe_versions_apply_by_period(tmp_path):
+    write(tmp_path / 'Ingredient.csv', 'Item name,Beef(g)\nBeef Ramen,100\nTea,\n')
+    write(tmp_path / 'RecipeVersions.csv', 'Item name,Beef(g),effective_from,effective_to\n'
+                                           'Beef Ramen,80,2025-08-01,2025-10-01\nBeef Ramen,70,2025-09-01,\n')
+    book = pipeline.load_recipe_book(str(tmp_path))
+
+    def beef(date):
+        return book.table_for(pd.Timestamp(date)).set_index('Category').loc['Beef Ramen', 'Beef(g)']
+
+    assert beef('2025-07-01') == 100
+    assert beef('2025-08-01') == 80
+    # the later effective_from wins while both are in effect
+    assert beef('2025-09-01') == 70
+    assert beef('2025-11-01') == 70
+    assert book.table_for(pd.Timestamp('2025-07-01')) is book.table_for(pd.Timestamp('2025-06-01'))
+
+
+def test_unusable_version_dates_are_reported_and_skipped(tmp_path):
+    write(tmp_path / 'Ingredient.csv', 'Item name,Beef(g)\nBeef Ramen,100\n')
+    write(tmp_path / 'RecipeVersions.csv', 'Item name,Beef(g),effective_from,effective_to\n'
+                                           'Beef Ramen,10,,\nBeef Ramen,20,2025-09-01,2025-08-01\n'
+                                           'Beef Ramen,30,2025-08-01,soon\nBeef Ramen,80,2025-08-01,\n')
+    book = pipeline.load_recipe_book(str(tmp_path))
+    assert book.matrix_for(pd.Timestamp('2025-09-15')).loc['Beef Ramen', 'Beef(g)'] == 80
+    assert set(zip(book.issues['Column'], book.issues['Value'], book.issues['Issue'])) == {
+        ('effective_from', '', 'missing or unparseable start date'),
+        ('effective_to', '2025-08-01', 'ends before it starts'),
+        ('effective_to', 'soon', 'unparseable end date')}
+
+
+def test_matrix_is_built_once_per_version(tmp_path):
+    write(tmp_path / 'Ingredient.csv', 'Item name,Beef(g)\nBeef Ramen,100\nBeef Ramen,90\n')
+    write(tmp_path / 'RecipeVersions.csv', 'Item name,Beef(g),effective_from,effective_to\nBeef Ramen,80,2025-08-01,\n')
+    book = pipeline.load_recipe_book(str(tmp_path))
+    july = book.matrix_for(pd.Timestamp('2025-07-01'))
+    # the last row of a duplicated item wins, as in the usage calculation
+    assert july.loc['Beef Ramen', 'Beef(g)'] == 90
+    assert book.matrix_for(pd.Timestamp('2025-06-01')) is july
+    assert book.matrix_for(pd.Timestamp('2025-09-01')) is book.matrix_for(pd.Timestamp('2025-08-01'))
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import rollupCube
+
+
+def facts(month, quarter, rows):
+    """Item-grain facts for one month of store S1 from (item, category, count, amount) rows"""
+    df = pd.DataFrame(rows, columns=['Item', 'Menu Category', 'Count', 'Amount'])
+    return df.assign(Store='S1', Region='R1', Month=month, Quarter=quarter, Year='2025')
+
+
+PARTITIONS = {
+    'may': facts('2025-05', '2025-Q2', [('Ramen', 'Noodles', 3.0, 30.0), ('Tea', 'Drinks', 0.0, 0.0)]),
+    'june': facts('2025-06', '2025-Q2', [('Ramen', 'Noodles', 2.0, 20.0), ('Tea', 'Drinks', 1.0, 4.0)]),
+    'july': facts('2025-07', '2025-Q3', [('Ramen', 'Noodles', 5.0, 50.0), ('Rice', 'Rice Dishes', 1.0, 9.0)]),
+}
+
+
+def build(keys):
+    cube = rollupCube.RollupCube()
+    for key in keys:
+        cube.upsert(key, PARTITIONS[key])
+    return cube
+
+
+def assert_same_cube(left, right):
+    assert left.cuboids.keys() == right.cuboids.keys()
+    for combo in left.cuboids:
+        a = left.cuboids[combo].sort_index()
+        b = right.cuboids[combo].reindex(columns=a.columns).sort_index()
+        assert a.index.equals(b.index), combo
+        np.testing.assert_allclose(a.to_numpy(), b.to_numpy(), atol=1e-9)
+
+
+def test_incremental_upsert_and_remove_match_rebuild():
+    cube = build(['may', 'june', 'july'])
+    cube.upsert('june', PARTITIONS['june'].assign(Count=lambda df: df['Count'] * 2))
+    cube.remove('july')
+    rebuilt = build(['may'])
+    rebuilt.upsert('june', PARTITIONS['june'].assign(Count=lambda df: df['Count'] * 2))
+    assert_same_cube(cube, rebuilt)
+    # Tea sold nothing in May but is still a member of that month, as in a full rebuild
+    assert ('Tea', 'S1', '2025-05') in cube.cuboids[('item', 'store', 'month')].index
+    assert 'Rice Dishes' not in cube.rollup('category', 'all', 'all')['Menu'].tolist()
+
+
+def test_rollup_within_filters_children_and_rejects_other_levels():
+    cube = build(['may', 'june', 'july'])
+    items = cube.rollup('item', 'all', 'quarter', within={'category': 'Noodles', 'year': '2025'})
+    assert set(items['Menu']) == {'Ramen'}
+    assert items['Count'].sum() == 10
+    with pytest.raises(ValueError):
+        cube.rollup('category', 'all', 'month', within={'item': 'Ramen'})
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import pipeline
+import salesArchive
+
+ROWS = 'Item Name,Count,Amount\nBeef Ramen,1,10\n'
+
+
+def legacy(tmp_path, *months):
+    folder = tmp_path / 'csv_files'
+    folder.mkdir(exist_ok=True)
+    for month in months:
+        (folder / f'{month}.csv').write_text(ROWS)
+    return [str(folder / f'{month}.csv') for month in months]
+
+
+def test_partitions_prune_by_range_and_store(tmp_path):
+    archiveDir = salesArchive.archive_dir(str(tmp_path))
+    salesArchive.import_files(legacy(tmp_path, 'november', 'december'), 2024, str(tmp_path), copy=True)
+    salesArchive.import_files(legacy(tmp_path, 'january'), 2025, str(tmp_path), store='Downtown')
+    selected = salesArchive.partitions(archiveDir, start=(2024, 12), store='Downtown')
+    assert [(p.year, p.month, p.store) for p in selected] == [(2024, 12, None), (2025, 1, 'Downtown')]
+    assert salesArchive.partitions(archiveDir, store='Uptown', lastMonths=1)[0].month == 12
+
+
+def test_import_refuses_to_overwrite_and_rescans(tmp_path):
+    salesArchive.import_files(legacy(tmp_path, 'may'), 2025, str(tmp_path))
+    # a partition added by hand after the manifest was written
+    manual = salesArchive.partition_path(salesArchive.archive_dir(str(tmp_path)), 2025, 4)
+    (tmp_path / 'archive' / 'year=2025' / 'month=04').mkdir()
+    (tmp_path / 'archive' / 'year=2025' / 'month=04' / 'sales.csv').write_text(ROWS)
+    again = legacy(tmp_path, 'may')
+    with pytest.raises(ValueError):
+        salesArchive.import_files(again, 2025, str(tmp_path))
+    salesArchive.import_files(again, 2025, str(tmp_path), force=True)
+    listed = salesArchive.load_manifest(salesArchive.archive_dir(str(tmp_path)))
+    assert [p.path for p in listed] == [manual, salesArchive.partition_path(salesArchive.archive_dir(str(tmp_path)), 2025, 5)]
+
+
+def test_history_window_spans_legacy_files_and_archive(tmp_path, monkeypatch):
+    salesArchive.import_files(legacy(tmp_path, 'may', 'june'), 2024, str(tmp_path))
+    legacy(tmp_path, 'july', 'extra')
+    monkeypatch.setattr(pipeline, 'DATA_YEAR', 2025)
+    monkeypatch.setattr(pipeline, 'HISTORY_MONTHS', 2)
+    months = [pipeline.month_from_path(path) for path in pipeline.sales_files(str(tmp_path))]
+    assert sorted(months) == ['extra', 'july', 'june 2024']
+
+
+def test_deleted_partitions_are_skipped_until_rebuild(tmp_path, capsys):
+    salesArchive.import_files(legacy(tmp_path, 'may', 'june'), 2025, str(tmp_path))
+    os.remove(salesArchive.partition_path(salesArchive.archive_dir(str(tmp_path)), 2025, 5))
+    sales = salesArchive.read_sales(str(tmp_path))
+    assert sales['month'].tolist() == [6]
+    assert 'rebuild' in capsys.readouterr().err
+    assert salesArchive.main(['--data-dir', str(tmp_path), 'rebuild']) == 0
+    salesArchive.read_sales(str(tmp_path))
+    assert 'missing' not in capsys.readouterr().err
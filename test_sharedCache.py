@@ -0,0 +1,72 @@
+import fcntl
+import os
+
+import numpy as np
+import pandas as pd
+
+import sharedCache
+
+
+def store_versions(cache, versions):
+    for version in versions:
+        cache.store(version, {'version': version, 'frame': pd.DataFrame({'a': [1.0]})})
+        # v<n> gets mtime n, so pruning order is deterministic
+        stamp = int(version[1:])
+        os.utime(os.path.join(cache.cacheDir, version), (stamp, stamp))
+
+
+def test_round_trip(tmp_path):
+    cache = sharedCache.SharedCache(str(tmp_path))
+    values = cache.get_or_build('v1', ['version', 'frame'], lambda: {'version': 'v1', 'frame': pd.DataFrame({'a': [1.0]})})
+    assert values['version'] == 'v1'
+    assert values['frame']['a'].tolist() == [1.0]
+
+
+def test_prune_keeps_locked_versions_and_lock_files(tmp_path):
+    cache = sharedCache.SharedCache(str(tmp_path))
+    store_versions(cache, ['v0', 'v1', 'v2'])
+    # another process is still reading v0
+    with open(tmp_path / 'v0.lock', 'a') as reader:
+        fcntl.flock(reader, fcntl.LOCK_SH)
+        store_versions(cache, ['v3', 'v4'])
+        assert (tmp_path / 'v0').exists()
+        assert not (tmp_path / 'v1').exists()
+    store_versions(cache, ['v5'])
+    assert not (tmp_path / 'v0').exists()
+    assert (tmp_path / 'v0.lock').exists()
+    assert (tmp_path / 'v1.lock').exists()
+
+
+def test_prune_drops_orphaned_builds_only(tmp_path):
+    cache = sharedCache.SharedCache(str(tmp_path))
+    # a build that died before its rename, and one still running under its lock
+    (tmp_path / '.v7-abc123').mkdir()
+    (tmp_path / '.v8-def456').mkdir()
+    with open(tmp_path / 'v8.lock', 'a') as builder:
+        fcntl.flock(builder, fcntl.LOCK_EX)
+        store_versions(cache, ['v1'])
+        assert not (tmp_path / '.v7-abc123').exists()
+        assert (tmp_path / '.v8-def456').exists()
+    assert (tmp_path / 'v1').exists()
+
+
+
+def test_matrices_round_trip_as_read_only_maps(tmp_path):
+    matrix = pd.DataFrame([[1.0, 0.0], [2.5, 4.0]], index=pd.Index(['Beef Ramen', 'Tea'], name='Category'),
+                          columns=pd.Index(['Beef (g)', 'Egg'], name='Ingredient'))
+    assert sharedCache.is_matrix(matrix)
+    assert not sharedCache.is_matrix(matrix.assign(Egg=[1, 2]))
+    assert not sharedCache.is_matrix(matrix.reset_index())
+
+    cache = sharedCache.SharedCache(str(tmp_path))
+    cache.store('v1', {'recipe_matrix': matrix, 'avg_usage': matrix['Egg'].rename('Avg'), 'frame': matrix.reset_index()})
+    values = cache.load('v1', ['recipe_matrix', 'avg_usage', 'frame'])
+    pd.testing.assert_frame_equal(values['recipe_matrix'], matrix)
+    pd.testing.assert_series_equal(values['avg_usage'], matrix['Egg'].rename('Avg'))
+    pd.testing.assert_frame_equal(values['frame'], matrix.reset_index())
+    # a view over the mapped .npy file, not a private copy
+    mapped = values['recipe_matrix'].to_numpy()
+    assert not mapped.flags.writeable
+    while not isinstance(mapped, np.memmap):
+        mapped = mapped.base
+        assert mapped is not None
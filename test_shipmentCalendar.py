@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import shipmentCalendar
+
+
+def schedule(**rows):
+    """One shipment row per ingredient: name=(frequency, number of shipments[, delivery_days])"""
+    return pd.DataFrame([{'Ingredient': name, 'Quantity per shipment': 1, 'Unit of shipment': 'units',
+                          'Number of shipments': spec[1], 'frequency': spec[0],
+                          'delivery_days': spec[2] if len(spec) > 2 else np.nan}
+                         for name, spec in rows.items()])
+
+
+def test_cadences_and_delivery_days():
+    assert shipmentCalendar.cadence_days('Every 3 weeks') == 21
+    assert shipmentCalendar.cadence_days('monthly') == 0
+    assert np.isnan(shipmentCalendar.cadence_days('sometimes'))
+    assert shipmentCalendar.parse_weekdays('Thu; mon') == (0, 3)
+    with pytest.raises(ValueError):
+        shipmentCalendar.parse_weekdays('Funday')
+
+
+def test_holiday_deliveries_roll_forward_to_the_next_open_day():
+    holidays = pd.to_datetime(['2025-01-06', '2025-01-07'])
+    calendar = shipmentCalendar.ShipmentCalendar(schedule(Beef=('weekly', 1)), 2025, holidays=holidays)
+    # Monday 6th and Tuesday 7th are closed; the range starts after the Monday delivery was due
+    supply = calendar.daily_supply('2025-01-07', '2025-01-14')['Beef']
+    assert supply[supply > 0].index.strftime('%Y-%m-%d').tolist() == ['2025-01-08', '2025-01-13']
+    assert supply.sum() == 2
+
+
+def test_weekly_multiples_and_calendar_months():
+    calendar = shipmentCalendar.ShipmentCalendar(
+        schedule(Beef=('weekly', 3), Rice=('weekly', 2, 'Tue;Fri'), Tea=('monthly', 2)), 2025)
+    week = calendar.daily_supply('2025-01-06', '2025-01-12')
+    assert week.index[week['Beef'] > 0].day_name().tolist() == ['Monday', 'Wednesday', 'Friday']
+    assert week.index[week['Rice'] > 0].day_name().tolist() == ['Tuesday', 'Friday']
+    # a month holds 4.33 weeks, not 4
+    perMonth = calendar.shipments_per_month()
+    assert perMonth[0] == pytest.approx(3 * 365 / 7 / 12, abs=0.1)
+    assert perMonth[2] == 2
+    assert calendar.monthly_supply('2025-02-01', '2025-02-28')['Tea'].iat[0] == 2
+
+
+def test_biweekly_phase_does_not_depend_on_the_range():
+    calendar = shipmentCalendar.ShipmentCalendar(schedule(Beef=('biweekly', 1)), 2025)
+    full = calendar.daily_supply('2025-01-01', '2025-03-31')['Beef']
+    part = calendar.daily_supply('2025-02-10', '2025-03-31')['Beef']
+    pd.testing.assert_series_equal(full['2025-02-10':], part)
@@ -0,0 +1,26 @@
+import pandas as pd
+
+import refresher
+import stockAlerts
+
+
+def test_fast_path_matches_the_snapshot_and_skips_unchanged_inputs():
+    store = stockAlerts.StoreAlerts('.')
+    version, comparison_df, anomaly_df, month = store.evaluate()
+    snapshot = refresher.SnapshotBuilder('.').build()
+    assert (version, month) == (snapshot.version, snapshot.months[-1])
+    pd.testing.assert_frame_equal(comparison_df, snapshot.comparison_df)
+    latest = snapshot.anomaly_df[snapshot.anomaly_df['Period'] == month].reset_index(drop=True)
+    pd.testing.assert_frame_equal(anomaly_df, latest, check_dtype=False)
+    assert store.evaluate() is None
+
+
+def test_failed_delivery_is_logged_and_retried(monkeypatch, capsys):
+    def unreachable(alerts, webhook=None):
+        raise OSError('connection refused')
+
+    monkeypatch.setattr(stockAlerts, 'emit', unreachable)
+    store = stockAlerts.StoreAlerts('.')
+    stockAlerts.run_once([store], stockAlerts.ALERT_LEVELS + ['GOOD', 'OVERSTOCKED'], 'http://127.0.0.1:9/')
+    assert 'connection refused' in capsys.readouterr().err
+    assert store.version is None
@@ -0,0 +1,38 @@
+import sqlite3
+
+import storeDb
+
+
+def test_recipe_rows_match_the_typed_recipes_and_report_bad_cells(tmp_path):
+    (tmp_path / 'Ingredient.csv').write_text('Item name,Beef (g),Egg (count)\nBeef Ramen,"1,200",1\nFried Rice,,two\n')
+    conn = storeDb.connect(str(tmp_path / storeDb.DB_FILE))
+    storeDb.sync(conn, str(tmp_path))
+    lines = conn.execute('SELECT item, ingredient, quantity FROM recipe_lines ORDER BY item, ingredient').fetchall()
+    assert lines == [('Beef Ramen', 'Beef (g)', 1200.0), ('Beef Ramen', 'Egg (count)', 1.0)]
+    conn.close()
+
+    issues = storeDb.read_issues(str(tmp_path / storeDb.DB_FILE))
+    assert issues[['File', 'Item', 'Column', 'Value', 'Issue']].values.tolist() == [
+        ['Ingredient.csv', 'Fried Rice', 'Egg (count)', 'two', 'unparseable']]
+
+
+def test_removed_file_drops_its_issues(tmp_path):
+    path = tmp_path / 'Ingredient.csv'
+    path.write_text('Item name,Egg (count)\nFried Rice,n/a\n')
+    conn = storeDb.connect(str(tmp_path / storeDb.DB_FILE))
+    storeDb.sync(conn, str(tmp_path))
+    path.unlink()
+    assert storeDb.sync(conn, str(tmp_path)) == {'Ingredient.csv': 0}
+    assert conn.execute('SELECT COUNT(*) FROM quality_issues').fetchone()[0] == 0
+    conn.close()
+
+
+def test_old_schema_is_upgraded(tmp_path):
+    dbPath = str(tmp_path / storeDb.DB_FILE)
+    legacy = sqlite3.connect(dbPath)
+    legacy.execute('PRAGMA user_version=1')
+    legacy.close()
+    conn = storeDb.connect(dbPath)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == storeDb.SCHEMA_VERSION
+    assert conn.execute('SELECT COUNT(*) FROM quality_issues').fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,38 @@
+import os
+import shutil
+
+import refresher
+import sharedCache
+import warmCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def copy_store(tmp_path):
+    for name in ('Ingredient.csv', 'Shipment.csv'):
+        shutil.copy(os.path.join(HERE, name), tmp_path / name)
+    (tmp_path / 'csv_files').mkdir()
+    for month in ('may', 'june'):
+        shutil.copy(os.path.join(HERE, 'csv_files', f'{month}.csv'), tmp_path / 'csv_files' / f'{month}.csv')
+    return str(tmp_path)
+
+
+def test_warm_publishes_a_valid_snapshot(tmp_path, capsys):
+    dataDir = copy_store(tmp_path)
+    cache = sharedCache.SharedCache(str(tmp_path / 'cache'))
+    assert warmCache.warm(dataDir, cache)
+    snapshot = refresher.SnapshotBuilder(dataDir).build()
+    assert cache.load(refresher.cache_key(snapshot.version), ['version']) == {'version': snapshot.version}
+    # the sample menu sells items without recipes: a warning, an error only under --strict
+    assert 'no recipe' in capsys.readouterr().err
+    assert warmCache.main(['--data-dir', dataDir, '--cache-dir', str(tmp_path / 'cache'), '--strict']) == 1
+
+
+def test_invalid_inputs_publish_nothing(tmp_path, capsys):
+    dataDir = copy_store(tmp_path)
+    with open(tmp_path / 'csv_files' / 'june.csv', 'a') as f:
+        f.write('\n1,1,Beef Ramen,-3,10\n')
+    cache = sharedCache.SharedCache(str(tmp_path / 'cache'))
+    assert not warmCache.warm(dataDir, cache)
+    assert 'negative Count or Amount' in capsys.readouterr().err
+    assert [name for name in os.listdir(tmp_path / 'cache') if not name.endswith('.lock')] == []
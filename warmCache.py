@@ -0,0 +1,132 @@
+"""
+Mai Shan Yun - Deploy-Time Warm Build
+Runs the whole pipeline ahead of time, validates the result and publishes it to the shared
+snapshot cache, so the dashboards and scripts start by mapping artifacts instead of recomputing
+
+A snapshot holds every intermediate the pages read: cleaned sales, recipes, shipments with
+calendar supply, monthly usage, the supply comparison, margins, anomalies, the rollup cube,
+the item ranking / Pareto table, the daily ledger, FIFO spoilage and the per-item ingredient
+contributions with their ingredient -> item index. Nothing is published when the inputs fail to
+load or validate, and the command exits non-zero.
+
+Usage:
+    python warmCache.py                                # current directory, default cache dir
+    python warmCache.py --data-dir store1 --data-dir store2 --strict
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingestion
+import pipeline
+import profiling
+import refresher
+import sharedCache
+
+
+# ============================================
+# VALIDATION
+# ============================================
+def validate_snapshot(snapshot):
+    """(errors, warnings) found in a freshly built snapshot"""
+    errors, warnings = [], []
+
+    unknownMonths = [month for month in snapshot.months if pd.isna(pipeline.period_start(month))]
+    if unknownMonths:
+        errors.append(f"Month files not named after a month (cannot be dated): {', '.join(unknownMonths)}")
+
+    sales_df = snapshot.sales_df
+    negative = sales_df[(sales_df['Count'] < 0) | (sales_df['Amount'] < 0)]
+    if not negative.empty:
+        errors.append(f"{len(negative)} sales rows with negative Count or Amount, e.g. "
+                      f"{negative['Category'].iat[0]} in {negative['month'].iat[0]}")
+
+    unknownCadence = snapshot.shipments_df.loc[snapshot.shipments_df['Shipments per Month'].isna(), 'Ingredient']
+    if not unknownCadence.empty:
+        errors.append(f"Unknown shipment frequency for: {', '.join(unknownCadence)}")
+
+    numeric = snapshot.comparison_df.select_dtypes('number')
+    if not np.isfinite(numeric.to_numpy()).all():
+        bad = snapshot.comparison_df.loc[~np.isfinite(numeric.to_numpy()).all(axis=1), 'Ingredient']
+        errors.append(f"Non-finite supply comparison values for: {', '.join(bad)}")
+
+    if not np.isfinite(snapshot.monthly_usage.to_numpy()).all():
+        errors.append("Non-finite values in monthly ingredient usage")
+
+    # the per-item contributions behind the drill-down must add back up to monthly usage
+    contributed = snapshot.contribution_df.pivot_table(index='month', columns='Ingredient', values='Usage', aggfunc='sum')
+    contributed = contributed.reindex_like(snapshot.monthly_usage).fillna(0)
+    if not np.allclose(contributed.to_numpy(), snapshot.monthly_usage.to_numpy()):
+        errors.append("Per-item ingredient contributions do not add up to monthly usage")
+
+    recipeItems = set(snapshot.ingredients_df['Category'])
+    unmapped = sorted(set(sales_df['Category'].dropna()) - recipeItems)
+    if unmapped:
+        warnings.append(f"{len(unmapped)} sold items have no recipe and use no ingredients, e.g. {', '.join(unmapped[:5])}")
+
+    duplicated = snapshot.ingredients_df['Category'][snapshot.ingredients_df['Category'].duplicated()]
+    if not duplicated.empty:
+        warnings.append(f"Recipes listed more than once (last row wins): {', '.join(sorted(set(duplicated)))}")
+
+    untracked = [name for name in snapshot.shipments_df['Ingredient'] if name not in pipeline.INGREDIENT_NAME_MAP]
+    if untracked:
+        warnings.append(f"Shipped ingredients with no usage column: {', '.join(untracked)}")
+
+    for _, row in ingestion.summarize_issues(snapshot.quality_df).iterrows():
+        warnings.append(f"{row['File']} {row['Column']}: {row['Rows']} row(s) {row['Issue']}")
+
+    return errors, warnings
+
+
+# ============================================
+# BUILD
+# ============================================
+def warm(dataDir, cache, strict=False):
+    """Build, validate and publish one store's snapshot; returns True when its artifacts are in the cache"""
+    start = time.perf_counter()
+    try:
+        snapshot = refresher.SnapshotBuilder(dataDir).build(force=True)
+    # recipe cycles and unknown delivery days surface as ValueError
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[{dataDir}] FAILED to build: {e}", file=sys.stderr)
+        return False
+
+    errors, warnings = validate_snapshot(snapshot)
+    for warning in warnings:
+        print(f"[{dataDir}] warning: {warning}", file=sys.stderr)
+    if strict:
+        errors += warnings
+    if errors:
+        for error in errors:
+            print(f"[{dataDir}] error: {error}", file=sys.stderr)
+        return False
+
+    key = refresher.cache_key(snapshot.version)
+    if cache.load(key, refresher.Snapshot._fields) is None:
+        cache.store(key, snapshot._asdict())
+    print(f"[{dataDir}] {snapshot.version}: {len(snapshot.months)} months warmed in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build, validate and cache every aggregate ahead of time')
+    parser.add_argument('--data-dir', action='append', dest='dataDirs',
+                        help=f'Store data directory (repeatable, default: {pipeline.DATA_DIR})')
+    parser.add_argument('--cache-dir', default=sharedCache.DEFAULT_CACHE_DIR,
+                        help='Shared snapshot cache the dashboards read (MSY_CACHE_DIR)')
+    parser.add_argument('--strict', action='store_true', help='Treat warnings as errors')
+    args = parser.parse_args(argv)
+
+    cache = sharedCache.SharedCache(args.cache_dir)
+    # MSY_PROFILE=sample|cprofile captures the whole run under .cache/profiles/
+    with profiling.capture('warmCache'):
+        results = [warm(dataDir, cache, args.strict) for dataDir in (args.dataDirs or [pipeline.DATA_DIR])]
+    return 0 if all(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())